@@ -0,0 +1,119 @@
+"""
+Concurrent device polling: sync gunicorn worker vs Uvicorn (ASGI) worker.
+
+Starts one single-worker server per mode against the same throwaway SQLite
+database and polls GET /api/v1/device/customer/ with an increasing number
+of concurrent keep-alive connections, reporting throughput, p95 latency
+and failures.
+
+Notes for reading the numbers: Django's async ORM still runs queries on one
+thread per worker, so the ASGI worker gains from holding many idle/slow
+connections cheaply rather than from overlapping queries. Run the load
+generator on a different core or machine than the server; on a single core
+the two compete for CPU.
+
+    python benchmarks/bench_async_views.py --requests 2000 --concurrency 1 10 50 200
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import common
+
+MODES = {
+    "sync (gunicorn sync)": ["emibackend.wsgi:application", "-k", "sync"],
+    "async (uvicorn worker)": ["emibackend.asgi:application", "-k", "uvicorn_worker.UvicornWorker"],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(target, port, timeout):
+    cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}",
+           "--timeout", str(timeout), "--backlog", "2048", *target]
+    proc = subprocess.Popen(cmd, cwd=common.ROOT, env=os.environ.copy(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def hammer(url, token, total, concurrency):
+    import httpx
+
+    latencies, failures = [], 0
+    queue = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal failures
+            for _ in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, headers={"Authorization": f"Device {token}"})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                failures += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+
+    common.setup()
+    from emiapp.models import Customer, Device
+
+    dealer = common.make_dealer()
+    customer = Customer.objects.create(user=dealer, name="Bench Customer", mobile="9000000000",
+                                       emi_per_month="1250.00", total_months=12, remaining_months=12)
+    device = common.make_devices(dealer, 1)[0]
+    Device.objects.filter(pk=device.pk).update(customer=customer)
+    token = str(Device.objects.get(pk=device.pk).device_token)
+
+    print(f"{args.requests} requests per run, 1 worker per server\n")
+    rows = []
+    for label, target in MODES.items():
+        port = free_port()
+        proc = start_server(target, port, timeout=30)
+        try:
+            url = f"http://127.0.0.1:{port}/api/v1/device/customer/"
+            for concurrency in args.concurrency:
+                elapsed, latencies, failures = asyncio.run(hammer(url, token, args.requests, concurrency))
+                p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+                rows.append(f"{label:<24} {concurrency:>5} {args.requests / elapsed:>9,.0f} {p95:>9.1f} {failures:>7}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{'mode':<24} {'conc':>5} {'req/s':>9} {'p95 ms':>9} {'failed':>7}")
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
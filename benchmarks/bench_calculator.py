@@ -0,0 +1,77 @@
+"""
+EMI calculator (emiapp/calculator.py): batches of quotes through
+POST /emi/quote/, with and without full schedules, next to the same quotes
+computed one at a time in plain Python.
+
+    python benchmarks/bench_calculator.py --quotes 1000,5000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import common
+
+
+def python_quotes(principal, down_payment, rate, months, schedules):
+    """One quote and one installment at a time."""
+    quotes = []
+    for p, d, annual, n in zip(principal, down_payment, rate, months):
+        loan, r = p - d, annual / 1200
+        emi = round(loan / n if r == 0 else loan * r * (1 + r) ** n / ((1 + r) ** n - 1), 2)
+        balance, total, rows = loan, 0.0, []
+        for k in range(n):
+            interest = round(balance * r, 2)
+            principal_part = balance if k == n - 1 else round(emi - interest, 2)
+            balance = round(balance - principal_part, 2)
+            total += principal_part + interest
+            rows.append((interest, principal_part, balance))
+        quote = {"loan": loan, "emi": emi, "total_payable": round(total, 2), "total_interest": round(total - loan, 2)}
+        if schedules:
+            quote["schedule"] = rows
+        quotes.append(quote)
+    return quotes
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", default="1000,5000", help="quotes per request, comma-separated")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    common.setup()
+    from rest_framework.test import APIClient
+    from emiapp.calculator import amortize, parse_quotes
+
+    client = APIClient()
+    client.force_authenticate(common.make_dealer())
+    rng = random.Random(45)
+
+    print(f"{'quotes':>7} {'schedule':>8} | {'python':>9} {'numpy':>9} {'endpoint':>9}   (median ms)")
+    for count in (int(q) for q in args.quotes.split(",")):
+        body = {
+            "principal": [rng.choice((8999, 12999, 15999, 24999, 54999)) for _ in range(count)],
+            "down_payment": [rng.choice((0, 1000, 2000)) for _ in range(count)],
+            "rate": [rng.choice((0, 12, 14, 18, 24)) for _ in range(count)],
+            "months": [rng.choice((3, 6, 9, 12, 18, 24)) for _ in range(count)],
+        }
+        for schedule in (False, True):
+            arrays = parse_quotes(body)
+            py = timed(lambda: python_quotes(*body.values(), schedule), args.repeat)
+            vec = timed(lambda: amortize(*arrays, schedules=schedule), args.repeat)
+            api = timed(lambda: client.post("/api/v1/emi/quote/", {**body, "schedule": schedule}, format="json"),
+                        args.repeat)
+            print(f"{count:>7} {str(schedule):>8} | {py:>9.2f} {vec:>9.2f} {api:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
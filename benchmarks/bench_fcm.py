@@ -0,0 +1,156 @@
+"""
+FCM delivery throughput against a local HTTP/2 stub of the v1 send endpoint
+(no Google credentials or network needed):
+
+- one connection per send (what an unpooled client does),
+- sequential sends on the pooled client (send_command in a loop),
+- send_many(): concurrent sends multiplexed on FCM_MAX_CONNECTIONS connections.
+
+    python benchmarks/bench_fcm.py --messages 500 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import common
+
+import h2.config
+import h2.connection
+import h2.events
+
+
+class StubFCM:
+    """Minimal h2c server answering every POST like messages:send, after ``latency`` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.max_streams = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        open_streams = set()
+
+        async def respond(stream_id):
+            await asyncio.sleep(self.latency)
+            body = json.dumps({"name": f"projects/stub/messages/{stream_id}"}).encode()
+            conn.send_headers(stream_id, [(":status", "200"), ("content-type", "application/json"),
+                                          ("content-length", str(len(body)))])
+            conn.send_data(stream_id, body, end_stream=True)
+            open_streams.discard(stream_id)
+            writer.write(conn.data_to_send())
+
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    open_streams.add(event.stream_id)
+                    self.max_streams = max(self.max_streams, len(open_streams))
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    self.requests += 1
+                    asyncio.ensure_future(respond(event.stream_id))
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    writer.close()
+                    return
+            writer.write(conn.data_to_send())
+        writer.close()
+
+
+class StubCredentials:
+    """Stands in for google-auth service account credentials; counts token refreshes."""
+
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.token = None
+        self.expires = 0
+        self.refreshes = 0
+
+    @property
+    def valid(self):
+        return self.token is not None and time.monotonic() < self.expires
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"stub-token-{self.refreshes}"
+        self.expires = time.monotonic() + self.lifetime
+
+
+def run(label, stub, count, fn):
+    before_conns = stub.connections
+    stub.max_streams = 0
+    with common.timer() as t:
+        results = fn()
+    assert all("success" in r for r in results), results[:3]
+    rate = common.report(label, count, t["seconds"], "msgs")
+    print(f"{'':<44} {stub.connections - before_conns} new connection(s), "
+          f"up to {stub.max_streams} concurrent stream(s)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub response delay in seconds")
+    args = parser.parse_args()
+
+    common.setup(migrate=False)
+    from emiapp.fcm_server import FCMClient
+
+    stub = StubFCM(args.latency)
+    base_url = stub.start()
+    tokens = [f"token-{i}" for i in range(args.messages)]
+    data = {"command": "LOCK"}
+
+    # fewer messages for the slow baseline; rates are comparable
+    unpooled_count = min(args.messages, 100)
+
+    def unpooled():
+        results = []
+        for token in tokens[:unpooled_count]:
+            client = FCMClient(StubCredentials(3600), "stub", base_url=base_url)
+            results.append(client.send(token, data))
+            client.close()
+        return results
+
+    credentials = StubCredentials(3600)
+    client = FCMClient(credentials, "stub", base_url=base_url)
+
+    baseline = run("new connection per send", stub, unpooled_count, unpooled)
+    sequential = run("pooled client, sequential", stub, args.messages,
+                     lambda: [client.send(token, data) for token in tokens])
+    multiplexed = run("pooled client, send_many (multiplexed)", stub, args.messages,
+                      lambda: client.send_many([(token, data) for token in tokens]))
+    client.close()
+
+    print(f"\nsend_many: {multiplexed / sequential:.1f}x sequential, {multiplexed / baseline:.1f}x unpooled; "
+          f"{credentials.refreshes} token refresh(es) for {2 * args.messages} sends")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Sustained device heartbeat ingestion per worker.
+
+Compares one UPDATE per heartbeat against the coalescing HeartbeatBuffer
+(emiapp/heartbeat.py), then measures the full endpoint (auth + view +
+buffering) through Django's test client, all in a single process.
+
+    python benchmarks/bench_heartbeat.py --devices 5000 --seconds 5
+"""
+import argparse
+import random
+
+import common
+
+
+def heartbeat_values(rng):
+    from django.utils import timezone
+    return {
+        "last_seen": timezone.now(),
+        "applied_lock_state": rng.random() < 0.1,
+        "battery_level": rng.randint(1, 100),
+        "app_version": "2.4.1",
+    }
+
+
+def run_for(seconds, step):
+    """Call ``step()`` repeatedly for ``seconds``; returns (calls, elapsed)."""
+    import time
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        step()
+        calls += 1
+    return calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    common.setup()
+    from django.test import Client
+    from emiapp.heartbeat import HeartbeatBuffer
+    from emiapp.models import Device
+    import emiapp.views
+
+    dealer = common.make_dealer()
+    devices = common.make_devices(dealer, args.devices)
+    ids = [d.id for d in devices]
+    rng = random.Random(42)
+    print(f"{args.devices} devices, {args.seconds:.0f}s per run\n")
+
+    # 1) one UPDATE per heartbeat (what a naive endpoint would do)
+    def direct():
+        Device.objects.filter(id=rng.choice(ids)).update(**heartbeat_values(rng))
+    calls, elapsed = run_for(args.seconds, direct)
+    common.report("direct UPDATE per heartbeat", calls, elapsed, "hb")
+
+    # 2) buffered: the same heartbeats coalesced and flushed by the background thread
+    buffer = HeartbeatBuffer(interval=args.flush_interval)
+    def buffered():
+        buffer.add((rng.choice(ids), heartbeat_values(rng)))
+    calls, elapsed = run_for(args.seconds, buffered)
+    with common.timer() as final:
+        buffer.flush()
+    common.report("buffered + bulk flush", calls, elapsed + final["seconds"], "hb")
+
+    # 3) full endpoint through the Django stack, buffered
+    emiapp.views.record_heartbeat = lambda device_id, **values: buffer.add((device_id, values))
+    client = Client()
+    tokens = [str(t) for t in Device.objects.values_list("device_token", flat=True)]
+    def endpoint():
+        response = client.post(
+            "/api/v1/device/heartbeat/",
+            {"is_locked": False, "battery_level": rng.randint(1, 100), "app_version": "2.4.1"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Device {rng.choice(tokens)}",
+        )
+        assert response.status_code == 202, response.content
+    calls, elapsed = run_for(args.seconds, endpoint)
+    with common.timer() as final:
+        buffer.flush()
+    common.report("POST /device/heartbeat/ (1 worker)", calls, elapsed + final["seconds"], "hb")
+
+
+if __name__ == "__main__":
+    main()
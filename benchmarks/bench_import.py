@@ -0,0 +1,72 @@
+"""
+Worker boot cost: wall time and peak RSS of a fresh interpreter doing
+``django.setup(); import emibackend.urls`` (what every gunicorn worker and
+manage.py command pays), plus the heaviest imports from ``-X importtime``.
+
+    python benchmarks/bench_import.py --runs 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emibackend.settings")
+import django
+django.setup()
+import emibackend.urls
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+HEAVY = ("firebase_admin", "google.cloud", "grpc", "qrcode", "PIL")
+
+
+def boot(importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", BOOT % (HEAVY,)]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout), proc.stderr
+
+
+def slowest(stderr, count):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    boot()  # warm the filesystem / bytecode caches
+    results = [boot()[0] for _ in range(args.runs)]
+    seconds = [r["seconds"] * 1000 for r in results]
+    print(f"boot (setup + urls)  median {statistics.median(seconds):7.1f} ms   "
+          f"min {min(seconds):7.1f} ms   over {args.runs} runs")
+    print(f"peak RSS             {max(r['rss_mb'] for r in results):7.1f} MB")
+    print(f"modules loaded       {results[0]['modules']:7d}")
+    print(f"heavy modules        {', '.join(results[0]['heavy']) or 'none'}\n")
+
+    print("slowest imports (-X importtime, cumulative):")
+    for micros, name in slowest(boot(importtime=True)[1], args.top):
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
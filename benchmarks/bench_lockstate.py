@@ -0,0 +1,113 @@
+"""
+Lock/unlock delivery under bursts of toggles and an unreliable push channel:
+a simulated fleet of phones receives FCM data messages with a drop rate and
+random reordering.
+
+- fire-and-forget: one command push per toggle, applied in arrival order
+  (the old lock_device / unlock_device behaviour),
+- versioned desired state: toggles coalesce in the push buffer, phones
+  apply only newer versions and report applied_version, and
+  reconcile() re-pushes the devices that lag.
+
+    python benchmarks/bench_lockstate.py --devices 2000 --toggles 5 --drop 0.2
+"""
+import argparse
+import random
+
+import common
+
+
+class Fleet:
+    """Stands in for the FCM client: 'delivers' data messages to simulated phones."""
+
+    def __init__(self, drop, rng):
+        self.drop = drop
+        self.rng = rng
+        self.sent = 0
+        self.inbox = []
+        self.locked = {}   # token -> lock state the phone is in
+        self.applied = {}  # token -> applied version (versioned phones only)
+
+    def send_many(self, messages):
+        self.sent += len(messages)
+        self.inbox.extend(m for m in messages if self.rng.random() >= self.drop)
+        return [{"success": "projects/sim/messages/1"} for _ in messages]
+
+    def deliver(self, versioned):
+        self.rng.shuffle(self.inbox)  # FCM does not preserve order
+        for token, data in self.inbox:
+            if versioned:
+                version = int(data["version"])
+                if version <= self.applied.get(token, 0):
+                    continue  # stale or duplicate
+                self.applied[token] = version
+            self.locked[token] = data["command"] == "LOCK"
+        self.inbox = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--toggles", type=int, default=5, help="lock/unlock toggles per device in one burst")
+    parser.add_argument("--drop", type=float, default=0.2, help="fraction of pushes lost")
+    args = parser.parse_args()
+
+    common.setup()
+    import os
+    from django.test.utils import override_settings
+    from emiapp import fcm_server
+    from emiapp.lockstate import lock_pushes, reconcile, set_lock_state
+    from emiapp.models import FCM, Device
+
+    user = common.make_dealer()
+    devices = common.make_devices(user, args.devices)
+    FCM.objects.bulk_create([FCM(imei_1=d.imei, fcm_token=f"tok-{d.imei}") for d in devices])
+    token = {d.pk: f"tok-{d.imei}" for d in Device.objects.all()}
+    rng = random.Random(7)
+    # final desired state: odd number of toggles from unlocked -> locked
+    final = args.toggles % 2 == 1
+
+    def install(fleet):
+        fcm_server._client, fcm_server._client_pid = fleet, os.getpid()
+
+    # ---- fire-and-forget commands ----
+    fleet = Fleet(args.drop, rng)
+    install(fleet)
+    with common.timer() as t:
+        for i in range(args.toggles):
+            fcm_server.send_to_imeis([d.imei for d in devices], "LOCK" if i % 2 == 0 else "UNLOCK")
+        fleet.deliver(versioned=False)
+    wrong = sum(fleet.locked.get(token[d.pk]) != final for d in devices)
+    print(f"fire-and-forget:   {fleet.sent:>7,} pushes, {wrong:>6,} devices in the wrong state "
+          f"({wrong / args.devices:.1%}), {t['seconds']:.2f}s")
+
+    # ---- versioned desired state ----
+    fleet = Fleet(args.drop, rng)
+    install(fleet)
+    # the whole burst lands inside one LOCK_PUSH_DELAY window (a real burst takes milliseconds)
+    lock_pushes.interval, lock_pushes.max_items = 3600, args.devices + 1
+    with common.timer() as t:
+        for i in range(args.toggles):
+            for device in devices:
+                set_lock_state(device, i % 2 == 0, "locked" if i % 2 == 0 else "unlocked")
+        lock_pushes.flush()  # the burst collapses into one push per device
+        fleet.deliver(versioned=True)
+        first = fleet.sent
+
+        rounds = 0
+        with override_settings(LOCK_RETRY_AFTER=0):
+            while True:
+                # phones report what they applied (heartbeat)
+                for device in devices:
+                    Device.objects.filter(pk=device.pk).update(applied_version=fleet.applied.get(token[device.pk], 0))
+                if not reconcile():
+                    break
+                fleet.deliver(versioned=True)
+                rounds += 1
+    wrong = sum(fleet.locked.get(token[d.pk]) != final for d in devices)
+    print(f"versioned + coalesced: {first:>7,} pushes for the burst, {fleet.sent - first:,} re-pushes in "
+          f"{rounds} reconcile round(s), {wrong} devices in the wrong state, {t['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Cash-flow projection (emiapp/projection.py) over the whole portfolio:
+streamed columnar load + vectorized projection, against projecting the
+same plans one installment at a time from ORM rows.
+
+    python benchmarks/bench_projection.py --loans 1000000 --months 24
+"""
+import argparse
+import math
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import common
+
+
+def seed(count, dealers, rng):
+    from django.db import connection, transaction
+
+    users = [common.make_dealer(f"projection-dealer-{i}") for i in range(dealers)]
+    today = date.today()
+    created = datetime.now(timezone.utc).isoformat()
+    sql = (
+        "INSERT INTO emiapp_customer (user_id, name, mobile, created_at, updated_at, emi_per_month, "
+        "total_months, paid_months, remaining_months, next_payment_date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    # raw executemany: bulk_create's SQL assembly would dominate the setup time
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, count, 50000):
+            rows = []
+            for n in range(start, min(start + 50000, count)):
+                months = rng.choice((6, 9, 12, 18, 24))
+                paid = rng.randint(0, months - 1)
+                late = rng.random() < 0.25
+                due = today + timedelta(days=rng.randint(-150, 0) if late else rng.randint(0, 30))
+                rows.append((rng.choice(users).pk, f"Loan {n}", f"7{n:09d}", created, created,
+                             rng.choice((799, 1299, 2499, 4999)), months, paid, months - paid, due.isoformat()))
+            cursor.executemany(sql, rows)
+
+
+def python_projection(queryset, today, months, write_off_days):
+    """One ORM row and one installment at a time."""
+    from emiapp.projection import month_starts
+
+    bounds = month_starts(today, months)
+    scheduled = [0.0] * months
+    for amount, total, paid, due in queryset.values_list("emi_per_month", "total_months", "paid_months", "next_payment_date"):
+        overdue = max((today - due).days, 0) if due else 0
+        if overdue > write_off_days:
+            continue
+        day = (due - today).days + 30 * math.ceil(overdue / 30) if due else 0
+        for _ in range(total - paid):
+            if day >= bounds[-1]:
+                break
+            month = next(t for t in range(months) if day < bounds[t + 1])
+            scheduled[month] += float(amount)
+            day += 30
+    return scheduled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=1000000)
+    parser.add_argument("--dealers", type=int, default=100)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--python-sample", type=int, default=100000, help="plans for the row-at-a-time baseline")
+    args = parser.parse_args()
+
+    common.setup()
+    from django.conf import settings
+    from django.utils import timezone as dj_timezone
+    from emiapp.projection import open_plans, project, stream_columns
+
+    seed(args.loans, args.dealers, random.Random(44))
+    today = dj_timezone.localdate()
+    rates = settings.PROJECTION_DEFAULT_RATES
+
+    with common.timer() as t:
+        chunks = list(stream_columns(open_plans()))
+    load = t["seconds"]
+    with common.timer() as t:
+        result = project(iter(chunks), today, args.months, rates)
+    print(f"numpy:  {result['loans'] + result['written_off']['loans']:,} plans x {args.months} months, "
+          f"{len(rates)} scenarios: load {load:.2f}s + project {t['seconds']:.2f}s = {load + t['seconds']:.2f}s")
+
+    sample = open_plans().order_by("id")[:args.python_sample]
+    with common.timer() as t:
+        python_projection(sample, today, args.months, settings.PROJECTION_WRITE_OFF_DAYS)
+    per_plan = t["seconds"] / args.python_sample
+    print(f"python: {args.python_sample:,} plans in {t['seconds']:.2f}s "
+          f"-> ~{per_plan * args.loans:.1f}s for {args.loans:,} plans, one scenario")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Dealer report latency (emiapp/reports.py) as the portfolio grows: for each
+size, the aging and collections endpoints cold (computed in SQL) and warm
+(per-dealer cache), next to bucketing the customer rows in Python, which is
+what a client had to do from the list endpoints.
+
+    python benchmarks/bench_reports.py --sizes 1000,10000,100000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import common
+
+
+def seed(user, count, start, rng):
+    from django.db import connection, transaction
+
+    today = date.today()
+    created = datetime.now(timezone.utc).isoformat()
+    customers, emis, payments = [], [], []
+    for n in range(start, start + count):
+        months = rng.choice((6, 9, 12))
+        paid = rng.randint(0, months - 1)
+        emi = rng.choice((999, 1499, 2499))
+        # mostly current, with a tail of overdue plans
+        due = today + timedelta(days=rng.randint(-150, 30) if rng.random() < 0.3 else rng.randint(0, 30))
+        customers.append((user.pk, f"Customer {n}", f"8{n:09d}", created, created, emi * months, emi, months,
+                          paid, months - paid, due.isoformat()))
+        emis.append((n, emi * months, emi * paid, due.isoformat(), created))
+        payments.extend((n, emi, (today - timedelta(days=30 * k + rng.randint(0, 29))).isoformat(), created)
+                        for k in range(paid))
+
+    # raw executemany: bulk_create's SQL assembly would dominate the setup time
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO emiapp_customer (user_id, name, mobile, created_at, updated_at, total_emi_amount, "
+            "emi_per_month, total_months, paid_months, remaining_months, next_payment_date) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", customers,
+        )
+        cursor.execute("SELECT id, mobile FROM emiapp_customer WHERE user_id = %s", [user.pk])
+        ids = {int(mobile[1:]): pk for pk, mobile in cursor.fetchall()}
+        cursor.executemany(
+            "INSERT INTO emiapp_emi (customer_id, total_amount, paid_amount, next_due_date, is_closed, updated_at) "
+            "VALUES (%s, %s, %s, %s, FALSE, %s)", [(ids[n], *rest) for n, *rest in emis],
+        )
+        cursor.execute("SELECT e.id, c.mobile FROM emiapp_emi e JOIN emiapp_customer c ON c.id = e.customer_id "
+                       "WHERE c.user_id = %s", [user.pk])
+        emi_ids = {int(mobile[1:]): pk for pk, mobile in cursor.fetchall()}
+        cursor.executemany(
+            "INSERT INTO emiapp_payment (emi_id, amount, paid_on, updated_at) VALUES (%s, %s, %s, %s)",
+            [(emi_ids[n], *rest) for n, *rest in payments],
+        )
+    return len(payments)
+
+
+def python_aging(user):
+    """The row-list way: every customer row to the app server, bucketed there."""
+    from emiapp.models import Customer
+
+    today = date.today()
+    buckets = {}
+    for emi, months, paid, due in Customer.objects.filter(user=user).values_list(
+            "emi_per_month", "total_months", "paid_months", "next_payment_date"):
+        if not months or paid >= months:
+            continue
+        days = (today - due).days if due else 0
+        label = "current" if days <= 0 else "1-30" if days <= 30 else "31-60" if days <= 60 else "61-90" if days <= 90 else "90+"
+        count, outstanding = buckets.get(label, (0, 0))
+        buckets[label] = (count + 1, outstanding + emi * (months - paid))
+    return buckets
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="customers per dealer, comma-separated")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    common.setup()
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+    from emiapp import reports
+
+    rng = random.Random(43)
+    start = 0
+    print(f"{'customers':>10} {'payments':>9} | {'python rows':>11} {'aging cold':>10} {'aging warm':>10} | "
+          f"{'collections cold':>16} {'collections warm':>16}   (median ms)")
+    for size in (int(s) for s in args.sizes.split(",")):
+        user = common.make_dealer(f"report-dealer-{size}")
+        payments = seed(user, size, start, rng)
+        start += size
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def cold(url):
+            def run():
+                reports.invalidate(user.pk)
+                assert client.get(url).status_code == 200
+            return run
+
+        def warm(url):
+            return lambda: client.get(url)
+
+        row = [timed(lambda: python_aging(user), max(1, args.repeat // 4))]
+        for url in ("/api/v1/reports/aging/", "/api/v1/reports/collections/?months=12"):
+            row.append(timed(cold(url), args.repeat))
+            row.append(timed(warm(url), args.repeat))
+        print(f"{size:>10,} {payments:>9,} | {row[0]:>11.2f} {row[1]:>10.2f} {row[2]:>10.2f} | "
+              f"{row[3]:>16.2f} {row[4]:>16.2f}")
+        cache.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Customer search latency (emiapp/search.py) over a large customer table:
+mobile / IMEI / loan-number prefixes and name tokens, for one dealer's
+slice of the data and through the full /customers/search/ endpoint.
+
+    python benchmarks/bench_search.py --customers 1000000 --dealers 50
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import common
+
+
+def seed(count, dealers, rng):
+    from django.db import connection, transaction
+    from emiapp.management.commands.seed_data import FIRST_NAMES, LAST_NAMES, imei_for
+
+    users = [common.make_dealer(f"search-dealer-{i}") for i in range(dealers)]
+    created = datetime.now(timezone.utc).isoformat()
+    # raw executemany: bulk_create's SQL assembly would dominate the setup time
+    sql = (
+        "INSERT INTO emiapp_customer (user_id, name, mobile, loan_account_no, imei_1, imei_2, "
+        "created_at, updated_at, paid_months) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0)"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, count, 50000):
+            cursor.executemany(sql, [
+                (rng.choice(users).pk, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                 f"9{n:09d}", f"LN{n:010d}", imei_for(2 * n), imei_for(2 * n + 1) if n % 3 else None, created, created)
+                for n in range(start, min(start + 50000, count))
+            ])
+    return users
+
+
+def measure(label, fn, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<34} p50 {statistics.median(timings):6.2f} ms   p95 {p95:6.2f} ms   max {timings[-1]:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=1000000)
+    parser.add_argument("--dealers", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    common.setup()
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from emiapp.models import Customer
+    from emiapp.search import search_customers
+
+    rng = random.Random(3)
+    with common.timer() as t:
+        users = seed(args.customers, args.dealers, rng)
+    print(f"seeded {args.customers:,} customers for {args.dealers} dealers in {t['seconds']:.1f}s "
+          f"({connection.vendor})\n")
+
+    sample = list(Customer.objects.order_by("?").values_list("user_id", "name", "mobile", "imei_1", "loan_account_no")[:args.queries])
+    by_id = {user.pk: user for user in users}
+
+    def run(q):
+        user_id, query = q
+        return search_customers(by_id[user_id], query)
+
+    measure("mobile prefix (6 digits)", run, [(row[0], row[2][:6]) for row in sample])
+    measure("mobile exact", run, [(row[0], row[2]) for row in sample])
+    measure("IMEI prefix (10 digits)", run, [(row[0], row[3][:10]) for row in sample])
+    measure("loan number prefix", run, [(row[0], row[4][:9].lower()) for row in sample])
+    measure("name token prefix ('vij')", run, [(row[0], row[1].split()[0][:3]) for row in sample])
+    measure("full name (2 tokens)", run, [(row[0], row[1]) for row in sample])
+
+    client = APIClient()
+
+    def endpoint(q):
+        user_id, query = q
+        client.force_authenticate(by_id[user_id])
+        response = client.get("/api/v1/customers/search/", {"q": query})
+        assert response.status_code == 200, response.content
+
+    measure("endpoint, full name, page 1", endpoint, [(row[0], row[1]) for row in sample])
+    measure("endpoint, mobile prefix, page 1", endpoint, [(row[0], row[2][:7]) for row in sample])
+
+
+if __name__ == "__main__":
+    main()
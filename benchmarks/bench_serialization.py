@@ -0,0 +1,88 @@
+"""
+Rows per second for the list endpoints: DRF ModelSerializer + JSONRenderer
+versus the values_list() fast path + ORJSONRenderer (emiapp/fastserializers.py).
+Also checks that both produce byte-identical JSON.
+
+    python benchmarks/bench_serialization.py --customers 20000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import common
+
+
+def seed(user, count):
+    from emiapp.models import EMI, Customer, Payment
+
+    rng = random.Random(7)
+    names = ["Asha", "Ravi", "Zoë", "Müller", "राम", "Line\u2028Sep", 'Quote "q"', "O'Neil"]
+    customers = Customer.objects.bulk_create([
+        Customer(
+            user=user,
+            name=f"{rng.choice(names)} {i}",
+            mobile=str(9000000000 + i),
+            email=f"c{i}@example.com" if i % 3 else None,
+            loan_account_no=f"LN{i:08d}",
+            imei_1=str(350000000000000 + i),
+            mobile_model="Galaxy A14",
+            total_emi_amount=Decimal(rng.randint(5000, 60000)),
+            emi_per_month=Decimal(rng.randint(500, 5000)) / 3,  # non-terminating, exercises quantize
+            total_months=12,
+            paid_months=rng.randint(0, 12),
+            remaining_months=rng.randint(0, 12),
+            next_payment_date=date.today() + timedelta(days=rng.randint(-90, 30)) if i % 5 else None,
+            paid_down_payment=Decimal("999.5"),
+        )
+        for i in range(count)
+    ], batch_size=1000)
+    emis = EMI.objects.bulk_create([
+        EMI(customer=c, total_amount=c.total_emi_amount, paid_amount=Decimal("0.1") * i,
+            next_due_date=date.today() + timedelta(days=i % 60))
+        for i, c in enumerate(customers)
+    ], batch_size=1000)
+    Payment.objects.bulk_create([Payment(emi=e, amount=Decimal("1250.00")) for e in emis], batch_size=1000)
+
+
+def compare(label, queryset, serializer_class, fast_serializer_class, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from emiapp.renderers import ORJSONRenderer
+
+    count = queryset.count()
+    best_drf = best_fast = None
+    for _ in range(repeat):
+        with common.timer() as drf:
+            drf_bytes = JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+        with common.timer() as fast:
+            fast_bytes = ORJSONRenderer().render(fast_serializer_class().serialize(queryset.all()))
+        best_drf = min(best_drf or drf["seconds"], drf["seconds"])
+        best_fast = min(best_fast or fast["seconds"], fast["seconds"])
+
+    assert drf_bytes == fast_bytes, f"{label}: output differs"
+    before = common.report(f"{label} ModelSerializer+JSONRenderer", count, best_drf, "rows")
+    after = common.report(f"{label} values_list+orjson", count, best_fast, "rows")
+    print(f"{'':<44} byte-identical, {after / before:.1f}x faster\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    common.setup()
+    from emiapp.fastserializers import CustomerFastSerializer, EMIFastSerializer, PaymentFastSerializer
+    from emiapp.models import EMI, Customer, Payment
+    from emiapp.serializers import CustomerSerializer, EMISerializer, PaymentSerializer
+
+    user = common.make_dealer()
+    seed(user, args.customers)
+
+    compare("customers", Customer.objects.order_by("-created_at"), CustomerSerializer, CustomerFastSerializer, args.repeat)
+    compare("emis", EMI.objects.order_by("next_due_date"), EMISerializer, EMIFastSerializer, args.repeat)
+    compare("payments", Payment.objects.all(), PaymentSerializer, PaymentFastSerializer, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+SQLite under concurrent workers (emiapp/sqlite.py): writer processes post
+EMI payments (read the customer, update it, insert a Payment: one atomic
+block, like update_emi_payment) while reader processes page through
+customers and payments, with the default SQLite setup and with
+SQLITE_CONCURRENT (WAL, busy_timeout, IMMEDIATE transactions).
+
+    python benchmarks/bench_sqlite.py --writers 2 --readers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import common
+
+
+def worker(role, db_path, concurrent, seconds, seed, results):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["SQLITE_CONCURRENT"] = "1" if concurrent else "0"
+    common.setup(migrate=False)
+    from django.db import OperationalError, transaction
+    from django.db.models import F
+    from emiapp.models import EMI, Customer, Payment
+
+    rng = random.Random(seed)
+    ids = list(Customer.objects.values_list("id", flat=True))
+    ok = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == "writer":
+                with transaction.atomic():
+                    customer = Customer.objects.get(pk=rng.choice(ids))
+                    Customer.objects.filter(pk=customer.pk).update(paid_months=F("paid_months") + 1)
+                    emi = EMI.objects.filter(customer=customer).first()
+                    Payment.objects.create(emi=emi, amount=customer.emi_per_month or 0)
+            else:
+                list(Customer.objects.order_by("-id").values_list("id", "name", "paid_months")[:50])
+                Payment.objects.filter(emi__customer_id=rng.choice(ids)).count()
+            ok += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:  # "database is locked"
+            errors += 1
+    latencies.sort()
+    results.put((role, ok, errors, latencies[int(len(latencies) * 0.99)] if latencies else 0.0))
+
+
+def prepare(db_path, concurrent, customers):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["SQLITE_CONCURRENT"] = "1" if concurrent else "0"
+    common.setup()
+    from django.db import connections
+    from emiapp.models import EMI, Customer
+
+    user = common.make_dealer()
+    created = Customer.objects.bulk_create(
+        Customer(user=user, name=f"Customer {n}", mobile=f"6{n:09d}", emi_per_month=999, total_months=12)
+        for n in range(customers)
+    )
+    EMI.objects.bulk_create(EMI(customer=c, total_amount=11988, next_due_date="2030-01-01") for c in created)
+    connections.close_all()
+
+
+def run(label, db_path, concurrent, args):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(role, db_path, concurrent, args.seconds, i, results))
+        for i, role in enumerate(["writer"] * args.writers + ["reader"] * args.readers)
+    ]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    for role in ("writer", "reader"):
+        mine = [r for r in rows if r[0] == role]
+        if not mine:
+            continue
+        done, failed = sum(r[1] for r in mine), sum(r[2] for r in mine)
+        p99 = max(r[3] for r in mine) * 1000
+        print(f"{label:<22} {role}s: {done / args.seconds:>9,.0f} ops/s  {failed:>6,} 'database is locked'  "
+              f"p99 {p99:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # one process per worker: keep writers + readers near the CPU count, or the
+    # lock holder gets descheduled and every waiter's latency measures the OS scheduler
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--customers", type=int, default=5000)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")  # fresh Django (and settings) per worker, like gunicorn
+    directory = tempfile.mkdtemp(prefix="emibench-")
+    for label, concurrent in (("default SQLite", False), ("SQLITE_CONCURRENT", True)):
+        db_path = os.path.join(directory, f"{'concurrent' if concurrent else 'default'}.sqlite3")
+        # settings are read once per process, so each mode is set up in its own
+        setup = multiprocessing.Process(target=prepare, args=(db_path, concurrent, args.customers))
+        setup.start()
+        setup.join()
+        run(label, db_path, concurrent, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Payment webhook under a month-end burst (emiapp/payments.py): a fake
+gateway fires signed callbacks at a fixed rate against the app served by
+gunicorn, re-delivering a share of them (gateway retries, some while the
+first delivery is still in flight), while ``apply_payments --loop`` posts
+them. Reports ack latency and failures, how long the worker took to drain,
+and checks the books: one Payment per distinct transaction, none twice.
+
+    python benchmarks/bench_webhook.py --rate 500 --seconds 10 --replay 0.2
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import common
+
+SECRET = "bench-secret"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(customers):
+    from emiapp.models import EMI, Customer
+
+    user = common.make_dealer()
+    created = Customer.objects.bulk_create(
+        Customer(user=user, name=f"Payer {n}", mobile=f"9{n:09d}", emi_per_month=999, total_months=10 ** 6)
+        for n in range(customers)
+    )
+    EMI.objects.bulk_create(EMI(customer=c, total_amount=10 ** 7, next_due_date="2030-01-01") for c in created)
+    return [c.pk for c in created]
+
+
+async def gateway(url, ids, args):
+    """Open loop: callback i leaves at i / rate whatever the server is doing."""
+    import httpx
+
+    rng = random.Random(49)
+    latencies, failures = [], {}
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def deliver(client, body):
+        signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+        async with limit:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, content=body, headers={
+                    "Content-Type": "application/json", "X-Webhook-Signature": signature,
+                })
+                if response.status_code != 200:
+                    failures[response.status_code] = failures.get(response.status_code, 0) + 1
+                    return
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError as exc:
+                failures[type(exc).__name__] = failures.get(type(exc).__name__, 0) + 1
+
+    total = int(args.rate * args.seconds)
+    tasks, sent = [], 0
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.monotonic()
+        for i in range(total):
+            await asyncio.sleep(max(0.0, start + i / args.rate - time.monotonic()))
+            body = json.dumps({
+                "transaction_id": f"txn_{i}", "reference": str(rng.choice(ids)), "amount": "999.00", "status": "captured",
+            }).encode()
+            copies = 2 if rng.random() < args.replay else 1  # gateway retry, possibly overlapping the first try
+            for _ in range(copies):
+                tasks.append(asyncio.ensure_future(deliver(client, body)))
+                sent += 1
+        await asyncio.gather(*tasks)
+    return total, sent, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=500, help="distinct callbacks per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--replay", type=float, default=0.2, help="share of callbacks delivered twice")
+    parser.add_argument("--concurrency", type=int, default=64, help="callbacks in flight at most")
+    parser.add_argument("--timeout", type=float, default=5, help="gateway-side timeout, seconds")
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--batch-size", type=int, help="apply_payments batch (default PAYMENT_APPLY_BATCH)")
+    args = parser.parse_args()
+
+    os.environ["PAYMENT_WEBHOOK_SECRETS"] = json.dumps({"bench": SECRET})
+    common.setup()
+    ids = seed(args.customers)
+
+    port = free_port()
+    env = {**os.environ, "WEB_CONCURRENCY": str(args.workers)}
+    # served as the Procfile's web process (gunicorn.conf.py: sync workers)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "emibackend.wsgi:application"],
+        cwd=common.ROOT, env=env,
+    )
+    batch = ["--batch-size", str(args.batch_size)] if args.batch_size else []
+    applier = subprocess.Popen(
+        [sys.executable, "manage.py", "apply_payments", "--loop", "0.2", *batch], cwd=common.ROOT, env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        import httpx
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/v1/ping/")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+
+        url = f"http://127.0.0.1:{port}/api/v1/payments/webhook/bench/"
+        with common.timer() as t:
+            total, sent, latencies, failures = asyncio.run(gateway(url, ids, args))
+        latencies.sort()
+        p50, p99 = (latencies[int(len(latencies) * q)] * 1000 if latencies else 0.0 for q in (0.5, 0.99))
+        print(f"gateway: {total:,} payments, {sent:,} callbacks in {t['seconds']:.1f}s "
+              f"({sent / t['seconds']:,.0f}/s)  ack p50 {p50:.1f} ms  p99 {p99:.1f} ms  failed {failures or 0}")
+
+        from emiapp.models import PaymentEvent
+        with common.timer() as t:
+            while PaymentEvent.objects.filter(state=PaymentEvent.PENDING).exists():
+                time.sleep(0.1)
+        print(f"worker:  drained {t['seconds']:.1f}s after the burst")
+    finally:
+        applier.terminate()
+        server.terminate()
+        applier.wait()
+        server.wait()
+
+    from django.db.models import Count, Sum
+    from emiapp.models import Customer, Payment, PaymentEvent
+    states = dict(PaymentEvent.objects.values_list("state").annotate(n=Count("id")))
+    payments = Payment.objects.count()
+    posted = Customer.objects.aggregate(months=Sum("paid_months"))["months"] or 0
+    print(f"books:   {states}  {payments:,} payments, {posted:,} installments posted "
+          f"-> {'OK' if payments == posted == states.get('applied', 0) == total else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Shared bootstrap for the benchmark scripts in this directory.
+
+Each script calls ``setup()`` before touching Django. Unless DATABASE_URL is
+already set, benchmarks run against a fresh, migrated SQLite file in a temp
+directory so ``db.sqlite3`` is never touched.
+
+Run from the repository root, e.g. ``python benchmarks/bench_heartbeat.py``.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(db_path=None, migrate=True):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    if not os.environ.get("DATABASE_URL"):
+        db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="emibench-"), "bench.sqlite3")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emibackend.settings")
+
+    import django
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
+    return os.environ["DATABASE_URL"]
+
+
+def make_dealer(username="bench-dealer"):
+    from django.contrib.auth.models import User
+    user, _ = User.objects.get_or_create(username=username, defaults={"is_staff": True})
+    return user
+
+
+def make_devices(user, count, start_imei=350000000000000):
+    from emiapp.models import Device
+    devices = [Device(user=user, imei=str(start_imei + i)) for i in range(count)]
+    return Device.objects.bulk_create(devices, batch_size=500)
+
+
+@contextmanager
+def timer():
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def report(label, count, seconds, unit="ops"):
+    rate = count / seconds if seconds else float("inf")
+    print(f"{label:<44} {count:>9} {unit} in {seconds:7.3f}s  -> {rate:12,.0f} {unit}/s")
+    return rate
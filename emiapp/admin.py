@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import UserProfile, Customer, EMI, Payment, BalanceKey, Device, Tutorial, MDMConfig, Policy, ServiceRequest
-from .models import AppVersion
+from .models import AppVersion, AuditEvent, FCM, PaymentEvent
+from .fleet import has_fcm_token
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -92,6 +93,21 @@ class MDMConfigAdmin(admin.ModelAdmin):
     fields = ("name", "qr_data", "updated_at")
 
 
+class FCMTokenFilter(admin.SimpleListFilter):
+    title = "FCM token"
+    parameter_name = "fcm_token"
+
+    def lookups(self, request, model_admin):
+        return (("yes", "Has a valid token"), ("no", "No valid token"))
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(has_fcm_token())
+        if self.value() == "no":
+            return queryset.filter(~has_fcm_token())
+        return queryset
+
+
 @admin.register(Device)
 class DeviceAdmin(admin.ModelAdmin):
     list_display = (
@@ -99,10 +115,16 @@ class DeviceAdmin(admin.ModelAdmin):
         "imei",
         "customer",
         "is_locked",
+        "desired_version",
+        "applied_version",
         "device_token",   # ✅ ADD THIS
-        "last_updated"
+        "last_updated",
+        "last_seen",
     )
 
+    list_filter = ("is_locked", "applied_lock_state", FCMTokenFilter, "last_seen", "last_updated")
+    search_fields = ("imei", "customer__name")
+    list_select_related = ("customer",)
     readonly_fields = ("device_token",) 
 
 # =========================POLICY ADMIN=========================
@@ -120,4 +142,43 @@ class ServiceRequestAdmin(admin.ModelAdmin):
 @admin.register(AppVersion)
 class AppVersionAdmin(admin.ModelAdmin):
     list_display = ("version_name", "version_code", "force_update", "updated_at")
-    readonly_fields = ("updated_at",)
\ No newline at end of file
+    readonly_fields = ("updated_at",)
+
+# =========================AUDIT LOG ADMIN=========================
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ("action", "imei", "actor", "user", "created_at")
+    list_filter = ("action",)
+    search_fields = ("imei", "actor")
+
+    # append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# =========================FCM TOKEN ADMIN=========================
+@admin.register(FCM)
+class FCMAdmin(admin.ModelAdmin):
+    list_display = ("imei_1", "is_valid", "recent_failures", "recent_results", "last_error", "last_sent_at", "updated_at")
+    list_filter = ("is_valid", "last_error")
+    search_fields = ("imei_1",)
+    readonly_fields = ("history", "last_sent_at", "updated_at")
+
+# =========================PAYMENT EVENT ADMIN=========================
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "provider", "transaction_id", "reference", "amount", "status", "state", "installments", "error",
+        "received_at", "applied_at",
+    )
+    list_filter = ("state", "provider", "status")
+    search_fields = ("transaction_id", "reference")
+    readonly_fields = (
+        "provider", "transaction_id", "reference", "amount", "status", "payload", "received_at", "applied_at",
+        "payment", "installments",
+    )
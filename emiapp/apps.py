@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class EmiappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'emiapp'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from .models import Customer, Payment
+        from .reports import invalidate_on_change
+        from .search import install_after_migrate
+        from .sqlite import configure_connection
+
+        # SQLite table rebuilds drop the FTS triggers, so re-check after every migrate
+        post_migrate.connect(install_after_migrate, sender=self)
+
+        # cached reports follow customer / payment changes
+        for model in (Customer, Payment):
+            post_save.connect(invalidate_on_change, sender=model, dispatch_uid=f"report-{model._meta.model_name}-save")
+            post_delete.connect(invalidate_on_change, sender=model, dispatch_uid=f"report-{model._meta.model_name}-delete")
+
+        # WAL / busy_timeout / ... on each new SQLite connection
+        connection_created.connect(configure_connection, dispatch_uid="sqlite-pragmas")
@@ -0,0 +1,82 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- AUDIT LOG (WRITE-BEHIND) ----------------
+class AuditBuffer(WriteBehindBuffer):
+    """Queues AuditEvent rows in process and writes them with bulk_create."""
+
+    def __init__(self, interval=None, max_items=None, batch_size=500):
+        super().__init__(interval, max_items)
+        self.batch_size = batch_size
+        self._events = []
+
+    def _add(self, item):
+        self._events.append(item)
+        return len(self._events)
+
+    def _pending(self):
+        return len(self._events)
+
+    def _drain(self):
+        batch, self._events = self._events, []
+        return batch
+
+    def _requeue(self, batch):
+        self._events[:0] = batch
+        return True
+
+    def write(self, batch):
+        try:
+            with transaction.atomic():
+                AuditEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+            return
+        except DatabaseError:
+            for event in batch:  # rolled back: forget the ids bulk_create handed out
+                event.pk, event._state.adding = None, True
+            if len(batch) == 1:
+                raise
+
+        # one bad row must not take the batch with it: write row by row and
+        # drop only the rows that fail on their own
+        failed = []
+        for event in batch:
+            try:
+                with transaction.atomic():
+                    event.save(force_insert=True)
+            except DatabaseError:
+                event.pk, event._state.adding = None, True
+                failed.append(event)
+        if len(failed) == len(batch):
+            raise DatabaseError(f"no audit event of {len(batch)} could be written")  # re-queued
+        if failed:
+            logger.error("Dropped %d audit events that could not be written: %s",
+                         len(failed), [(event.action, event.created_at) for event in failed])
+
+
+events = AuditBuffer(
+    interval=settings.AUDIT_FLUSH_INTERVAL,
+    max_items=settings.AUDIT_MAX_PENDING,
+)
+
+
+def record(action, user=None, actor="", device=None, customer=None, imei="", **data):
+    """Queue an audit event; never blocks the request on a database write."""
+    events.add(AuditEvent(
+        action=action,
+        user_id=getattr(user, "pk", user),
+        actor=actor,
+        device_id=getattr(device, "pk", device),
+        customer_id=getattr(customer, "pk", customer),
+        imei=imei or getattr(device, "imei", ""),
+        data=data,
+        created_at=timezone.now(),
+    ))
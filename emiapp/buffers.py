@@ -0,0 +1,115 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- WRITE-BEHIND BUFFER ----------------
+class WriteBehindBuffer:
+    """
+    Per-process buffer that collects writes in memory and hands them to
+    ``write()`` in batches, either every ``interval`` seconds from a daemon
+    thread or as soon as ``max_items`` are pending.
+
+    Subclasses implement ``_add(item)`` (store under ``self.lock``),
+    ``_drain()`` (return and reset the pending batch) and ``write(batch)``.
+    A batch whose write fails is put back with ``_requeue(batch)`` and tried
+    again on the next flush, up to ``max_retries`` times, then dropped.
+    """
+
+    interval = 5.0
+    max_items = 1000
+    max_retries = 3  # consecutive failed flushes before the batch is dropped
+
+    def __init__(self, interval=None, max_items=None):
+        self.interval = interval if interval is not None else self.interval
+        self.max_items = max_items if max_items is not None else self.max_items
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._failures = 0
+
+    # ---- producer side ----
+    def add(self, item):
+        with self.lock:
+            pending = self._add(item)
+        self._ensure_thread()
+        if pending >= self.max_items:
+            self._wakeup.set()
+
+    def __len__(self):
+        with self.lock:
+            return self._pending()
+
+    # ---- consumer side ----
+    def flush(self):
+        """Write everything pending now; returns the number of items written."""
+        with self._flush_lock:
+            with self.lock:
+                batch = self._drain()
+            if not batch:
+                return 0
+            try:
+                self.write(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures <= self.max_retries:
+                    with self.lock:
+                        requeued = self._requeue(batch)
+                    if requeued:
+                        # e.g. SQLite "database is locked": the next flush tries again
+                        logger.warning("%s flush failed (attempt %d), re-queued %d items",
+                                       type(self).__name__, self._failures, len(batch), exc_info=True)
+                        return 0
+                logger.exception("%s flush failed, dropping %d items", type(self).__name__, len(batch))
+                self._failures = 0
+                return 0
+            self._failures = 0
+            return len(batch)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def _ensure_thread(self):
+        # gunicorn forks after import, so (re)start the flusher per worker pid
+        pid = os.getpid()
+        if self._pid == pid and self._thread and self._thread.is_alive():
+            return
+        with self.lock:
+            if self._pid == pid and self._thread and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+        atexit.register(self._flush_at_exit)
+
+    def _flush_at_exit(self):
+        self.flush()
+        connections.close_all()
+
+    # ---- subclass hooks ----
+    def _add(self, item):
+        raise NotImplementedError
+
+    def _pending(self):
+        raise NotImplementedError
+
+    def _drain(self):
+        raise NotImplementedError
+
+    def _requeue(self, batch):
+        """Put a failed batch back ahead of what is pending; False drops it instead."""
+        return False
+
+    def write(self, batch):
+        raise NotImplementedError
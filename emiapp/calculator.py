@@ -0,0 +1,182 @@
+"""
+EMI / amortization calculator (reducing balance, monthly rests).
+
+Quotes are computed a batch at a time with NumPy: a dealer comparing
+tenures and rates sends arrays, and every EMI, total and schedule comes out
+of the same handful of array operations however many quotes there are.
+
+    emi = L * r * (1 + r)^n / ((1 + r)^n - 1),  r = annual % / 1200   (L / n when r = 0)
+
+EMIs are rounded to the paisa; the last installment absorbs the rounding so
+every schedule ends at a zero balance.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .models import Customer
+
+
+# ---------------- MATH ----------------
+def amortize(principal, down_payment, rate, months, schedules=False):
+    """
+    1-D quote arrays (broadcast together). Returns a dict of arrays: loan, emi,
+    last_emi, total_interest, total_payable and, with ``schedules``, the
+    (quotes x max months) interest / principal / balance matrices.
+    """
+    import numpy as np  # heavy, only needed for quotes
+
+    principal, down_payment, rate, months = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(down_payment, dtype=np.float64),
+        np.asarray(rate, dtype=np.float64), np.asarray(months, dtype=np.int64),
+    )
+    loan = principal - down_payment
+    r = rate / 1200
+    interest_free = r == 0
+    safe_r = np.where(interest_free, 1, r)  # keeps the discarded np.where branch finite
+    growth = (1 + r) ** months
+    emi = np.round(np.where(interest_free, loan / months, loan * safe_r * growth / np.where(interest_free, 1, growth - 1)), 2)
+
+    def balance_after(k):
+        # L(1+r)^k - emi((1+r)^k - 1)/r, or L - k*emi interest-free; quotes are rows, k broadcasts
+        g = (1 + r[:, None]) ** k
+        paid = np.where(interest_free[:, None], emi[:, None] * k, emi[:, None] * (g - 1) / safe_r[:, None])
+        return np.round(loan[:, None] * g - paid, 2)
+
+    before_last = balance_after(months[:, None] - 1)[:, 0]
+    last_emi = np.round(before_last + np.round(before_last * r, 2), 2)
+    total_payable = np.round(emi * (months - 1) + last_emi, 2)
+    result = {
+        "loan": loan,
+        "emi": emi,
+        "last_emi": last_emi,
+        "total_interest": np.round(total_payable - loan, 2),
+        "total_payable": total_payable,
+    }
+    if schedules:
+        k = np.arange(months.max(initial=0) + 1)[None, :]
+        balance = balance_after(k)
+        interest = np.round(balance[:, :-1] * r[:, None], 2)
+        principal_part = np.round(emi[:, None] - interest, 2)
+        rows = np.arange(len(loan))
+        principal_part[rows, months - 1] = before_last
+        balance = balance[:, 1:]
+        balance[rows, months - 1] = 0
+        result.update(interest=interest, principal=principal_part, balance=balance)
+    return result
+
+
+# ---------------- REQUESTS ----------------
+def _column(data, name, default=None):
+    import numpy as np
+
+    value = data.get(name, default)
+    if value is None:
+        raise ValidationError({name: ["This field is required."]})
+    try:
+        array = np.atleast_1d(np.asarray(value, dtype=np.float64))
+    except (TypeError, ValueError):
+        raise ValidationError({name: ["Must be a number or a list of numbers."]})
+    if array.ndim != 1 or not len(array) or not np.isfinite(array).all():
+        raise ValidationError({name: ["Must be a number or a non-empty list of finite numbers."]})
+    return array
+
+
+def parse_quotes(data):
+    """Validated (principal, down_payment, rate, months) arrays from a request body."""
+    import numpy as np
+
+    if not isinstance(data, dict):
+        raise ValidationError({"detail": "Expected an object"})
+    columns = {
+        "principal": _column(data, "principal"),
+        "down_payment": _column(data, "down_payment", 0),
+        "rate": _column(data, "rate", 0),
+        "months": _column(data, "months"),
+    }
+    if data.get("grid"):
+        # every combination, e.g. one price x several tenures x several rates
+        count = np.prod([len(a) for a in columns.values()])
+        if count > settings.CALCULATOR_MAX_QUOTES:
+            raise ValidationError({"detail": f"At most {settings.CALCULATOR_MAX_QUOTES} quotes per request"})
+        columns = dict(zip(columns, (a.ravel() for a in np.meshgrid(*columns.values(), indexing="ij"))))
+    else:
+        lengths = {len(a) for a in columns.values()} - {1}
+        if len(lengths) > 1:
+            raise ValidationError({"detail": "List fields must have the same length (or use \"grid\": true)"})
+        if lengths and lengths.pop() > settings.CALCULATOR_MAX_QUOTES:
+            raise ValidationError({"detail": f"At most {settings.CALCULATOR_MAX_QUOTES} quotes per request"})
+        columns = dict(zip(columns, np.broadcast_arrays(*columns.values())))
+
+    errors = {}
+    if (columns["principal"] <= 0).any():
+        errors["principal"] = ["Must be greater than 0."]
+    if (columns["down_payment"] < 0).any() or (columns["down_payment"] >= columns["principal"]).any():
+        errors["down_payment"] = ["Must be at least 0 and less than the principal."]
+    if (columns["rate"] < 0).any() or (columns["rate"] > settings.CALCULATOR_MAX_RATE).any():
+        errors["rate"] = [f"Annual rate must be between 0 and {settings.CALCULATOR_MAX_RATE}%."]
+    months = columns["months"]
+    if (months != np.floor(months)).any() or (months < 1).any() or (months > settings.CALCULATOR_MAX_MONTHS).any():
+        errors["months"] = [f"Must be a whole number of months from 1 to {settings.CALCULATOR_MAX_MONTHS}."]
+    if errors:
+        raise ValidationError(errors)
+    return columns["principal"], columns["down_payment"], columns["rate"], months.astype(np.int64)
+
+
+def quote_response(principal, down_payment, rate, months, schedules=False):
+    result = amortize(principal, down_payment, rate, months, schedules)
+    # tolist() once per column: per-element float() calls would dominate large batches
+    columns = {name: values.tolist() for name, values in (
+        ("principal", principal), ("down_payment", down_payment), ("rate", rate), ("months", months),
+        *((name, result[name]) for name in ("loan", "emi", "last_emi", "total_interest", "total_payable")),
+    )}
+    quotes = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    if schedules:
+        rows = {name: result[name].tolist() for name in ("interest", "principal", "balance")}
+        for i, quote in enumerate(quotes):
+            n = quote["months"]
+            quote["schedule"] = {name: rows[name][i][:n] for name in rows}
+    return quotes
+
+
+def fill_plan(attrs, instance=None):
+    """
+    CustomerSerializer: derive emi_per_month and total_emi_amount from
+    ``price`` (+ ``interest_rate``, ``paid_down_payment``, ``total_months``,
+    falling back to ``instance`` on updates) when the client did not send them.
+    """
+    price = attrs.pop("price", None)
+    rate = attrs.pop("interest_rate", None) or 0
+    if price is None:
+        return attrs
+
+    def current(name, default=None):
+        return attrs[name] if name in attrs else getattr(instance, name, default)
+
+    months = current("total_months")
+    if not months:
+        raise ValidationError({"total_months": ["Required to compute the EMI from price."]})
+    principal, down, rate, months = parse_quotes({
+        "principal": float(price), "down_payment": float(current("paid_down_payment") or 0),
+        "rate": float(rate), "months": months,
+    })
+    result = amortize(principal, down, rate, months)
+    for name, value in (("emi_per_month", result["emi"][0]), ("total_emi_amount", result["total_payable"][0])):
+        if name not in attrs:
+            attrs[name] = _fit(name, Decimal(f"{value:.2f}"))
+    if "total_months" in attrs:
+        attrs.setdefault("remaining_months", attrs["total_months"] - (current("paid_months") or 0))
+    return attrs
+
+
+def _fit(name, amount):
+    # a derived amount must fit its column: checked here, before anything is saved
+    field = Customer._meta.get_field(name)
+    amount = amount.quantize(Decimal(1).scaleb(-field.decimal_places))
+    if abs(amount) >= Decimal(10) ** (field.max_digits - field.decimal_places):
+        raise ValidationError({"price": [
+            f"Works out to a {field.verbose_name} of {amount}, more than the "
+            f"{field.max_digits - field.decimal_places} digits allowed before the decimal point."
+        ]})
+    return amount
@@ -0,0 +1,328 @@
+"""
+values_list()-based serialization for the hot read endpoints.
+
+A FastSerializer declares the same output keys as its ModelSerializer and
+the ORM lookup behind each key. Rows are fetched as tuples and turned into
+dicts by converters compiled once per serializer, reproducing exactly what
+the DRF fields would emit (quantized Decimal strings, ISO dates and "...Z"
+datetimes), without instantiating models or fields.
+
+Clients can narrow and widen the rows per request:
+
+    ?fields=id,name,next_payment_date        only these keys (and SQL columns)
+    ?expand=device                           nest a related object
+    ?fields=id,name,device.is_locked         dotted names imply the expansion
+    ?fields=id,emi.customer.mobile           ... at any depth (also ?expand=emi.customer)
+
+Expansions are fetched with one extra query per expansion (``WHERE key IN``),
+never per row, and only return rows the requesting user owns: a staff
+user's queryset may span dealers, the nested objects never do.
+"""
+from decimal import ROUND_HALF_UP, Context, Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from django.utils import timezone
+from django.http import Http404
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from .models import EMI, Customer, Device, Payment
+
+IN_CHUNK = 10000  # keys per expansion query; stays under SQLite's variable limit
+
+
+# ---------------- CONVERTERS ----------------
+def _decimal(field):
+    # DRF DecimalField(coerce_to_string=True): quantize to decimal_places, then '{:f}'
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+    context = Context(prec=field.max_digits)
+
+    def convert(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(exponent, rounding=ROUND_HALF_UP, context=context))
+    return convert
+
+
+def _datetime(field):
+    def convert(value):
+        if not value:
+            return None
+        if timezone.is_aware(value):
+            value = value.astimezone(timezone.get_current_timezone())
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+    return convert
+
+
+def _date(field):
+    return lambda value: value.isoformat() if value else None
+
+
+def _uuid(field):
+    return lambda value: str(value) if value is not None else None
+
+
+def _converter_for(field):
+    if isinstance(field, models.DecimalField):
+        return _decimal(field)
+    if isinstance(field, models.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, models.DateField):
+        return _date(field)
+    if isinstance(field, models.UUIDField):
+        return _uuid(field)
+    return None  # value passes through unchanged
+
+
+def _resolve_field(model, lookup):
+    """Model field behind a values_list() lookup such as ``customer__name``."""
+    *path, name = lookup.split("__")
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    field = model._meta.get_field(name)
+    if field.is_relation:  # FK columns serialize as the related pk
+        return field.target_field
+    return field
+
+
+def _split(param):
+    return [name.strip() for name in (param or "").split(",") if name.strip()]
+
+
+# ---------------- FAST SERIALIZER ----------------
+class Expansion:
+    """
+    A related object nested under ``?expand=<name>``: rows of ``serializer``
+    whose ``target`` lookup equals this row's ``source`` lookup and whose
+    ``owner`` lookup is the requesting user. When several match (reverse
+    FKs) the first by ``ordering`` wins.
+    """
+
+    def __init__(self, serializer, source, target, owner, ordering=()):
+        self.serializer = serializer
+        self.source = source
+        self.target = target
+        self.owner = owner
+        self.ordering = ordering
+
+    def fetch(self, serializer, keys, user):
+        keys = [key for key in keys if key is not None]
+        rows = {}
+        for start in range(0, len(keys), IN_CHUNK):
+            # no user (no request in the context): owner=None matches nothing
+            queryset = serializer.model.objects.filter(
+                **{f"{self.target}__in": keys[start:start + IN_CHUNK], self.owner: user}
+            )
+            if self.ordering:
+                queryset = queryset.order_by(*self.ordering)
+            for row in queryset.values_list(*serializer.lookups, *serializer.extra_lookups, self.target):
+                rows.setdefault(row[-1], row)
+        # serialize_rows: the related rows' own expansions are applied too
+        return dict(zip(rows, serializer.serialize_rows(list(rows.values()))))
+
+
+class FastSerializer:
+    model = None
+    fields = ()   # output keys, same order as the ModelSerializer
+    sources = {}  # output key -> ORM lookup when it differs from the key
+    expandable = {}  # ?expand= name -> Expansion
+
+    def __init__(self, fields=None, expand=None, context=None):
+        self.context = context or {}
+        expand, nested, nested_expand = list(expand or ()), {}, {}
+        for name in list(expand):
+            prefix, dot, rest = name.partition(".")
+            if dot:
+                expand.remove(name)
+                nested_expand.setdefault(prefix, []).append(rest)
+                if prefix not in expand:
+                    expand.append(prefix)
+        if fields is not None:
+            top = set()
+            for name in fields:
+                prefix, dot, rest = name.partition(".")
+                if dot:
+                    nested.setdefault(prefix, set()).add(rest)
+                    if prefix not in expand:
+                        expand.append(prefix)
+                else:
+                    top.add(name)
+            unknown = top - set(self.fields)
+            if unknown:
+                raise ValidationError({"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}"]})
+            fields = top
+
+        unknown = [name for name in expand if name not in self.expandable]
+        if unknown:
+            raise ValidationError({"expand": [f"Cannot expand: {', '.join(unknown)}"]})
+
+        keys = [key for key in self.fields if fields is None or key in fields]
+        self.keys = keys
+        self.lookups = [self.sources.get(key, key) for key in keys]
+        self.converters = [
+            (index, convert)
+            for index, convert in enumerate(
+                _converter_for(_resolve_field(self.model, lookup)) for lookup in self.lookups
+            )
+            if convert is not None
+        ]
+
+        # join columns for the expansions ride along after the output columns
+        self.extra_lookups = []
+        self.expansions = []
+        for name in expand:
+            expansion = self.expandable[name]
+            serializer = expansion.serializer(
+                fields=nested.get(name), expand=nested_expand.get(name), context=self.context,
+            )
+            if expansion.source in self.lookups:
+                index = self.lookups.index(expansion.source)
+            else:
+                if expansion.source not in self.extra_lookups:
+                    self.extra_lookups.append(expansion.source)
+                index = len(self.lookups) + self.extra_lookups.index(expansion.source)
+            self.expansions.append((name, expansion, serializer, index))
+
+    @classmethod
+    def from_request(cls, request, context=None):
+        """Serializer for the request's ``?fields=`` / ``?expand=`` (400 on unknown names)."""
+        fields = request.query_params.get("fields")
+        return cls(
+            fields=_split(fields) if fields is not None else None,
+            expand=_split(request.query_params.get("expand")),
+            context=context,
+        )
+
+    def to_representation(self, row):
+        if self.converters:
+            row = list(row)
+            for index, convert in self.converters:
+                row[index] = convert(row[index])
+        return dict(zip(self.keys, row))
+
+    def values_list(self, queryset):
+        return queryset.values_list(*self.lookups, *self.extra_lookups)
+
+    @property
+    def user(self):
+        request = self.context.get("request")
+        return request.user if request is not None else None
+
+    def serialize_rows(self, rows):
+        data = [self.to_representation(row) for row in rows]
+        for name, expansion, serializer, index in self.expansions:
+            related = expansion.fetch(serializer, {row[index] for row in rows}, self.user)
+            for item, row in zip(data, rows):
+                item[name] = related.get(row[index])
+        return data
+
+    def serialize(self, queryset):
+        return self.serialize_rows(list(self.values_list(queryset)))
+
+
+class DeviceFastSerializer(FastSerializer):
+    model = Device
+    fields = (
+        "id", "imei", "is_locked", "last_action", "last_updated", "last_seen", "applied_lock_state",
+        "desired_version", "applied_version",
+    )
+
+
+class CustomerFastSerializer(FastSerializer):
+    model = Customer
+    fields = (
+        "id",
+        "name",
+        "mobile",
+        "alternate_mobile",
+        "email",
+        "loan_account_no",
+        "imei_1",
+        "imei_2",
+        "created_at",
+        "mobile_model",
+        "total_emi_amount",
+        "emi_per_month",
+        "total_months",
+        "paid_months",
+        "remaining_months",
+        "next_payment_date",
+        "dealer_contact",
+        "paid_down_payment",
+        "version",
+    )
+    expandable = {"device": Expansion(DeviceFastSerializer, "id", "customer_id", "user", ordering=("-registered_at",))}
+
+
+class FleetDeviceFastSerializer(FastSerializer):
+    model = Device
+    fields = (
+        "id", "imei", "customer", "customer_name", "is_locked", "applied_lock_state", "last_action",
+        "last_updated", "last_seen", "registered_at", "battery_level", "app_version", "desired_version",
+        "applied_version",
+    )
+    sources = {"customer": "customer_id", "customer_name": "customer__name"}
+    expandable = {"customer": Expansion(CustomerFastSerializer, "customer_id", "id", "user")}
+
+
+class EMIFastSerializer(FastSerializer):
+    model = EMI
+    fields = (
+        "id", "customer_name", "total_amount", "paid_amount", "next_due_date", "is_closed", "updated_at", "version",
+        "customer",
+    )
+    sources = {"customer_name": "customer__name", "customer": "customer_id"}
+    expandable = {"customer": Expansion(CustomerFastSerializer, "customer_id", "id", "user")}
+
+
+class PaymentFastSerializer(FastSerializer):
+    model = Payment
+    fields = ("id", "amount", "paid_on", "updated_at", "emi")
+    sources = {"emi": "emi_id"}
+    expandable = {"emi": Expansion(EMIFastSerializer, "emi_id", "id", "customer__user")}
+
+
+# ---------------- VIEWSET MIXIN ----------------
+class FastListMixin:
+    """
+    Serve ``list`` and ``retrieve`` through ``fast_serializer_class`` instead
+    of the ModelSerializer, honouring ``?fields=`` and ``?expand=``.
+    """
+
+    fast_serializer_class = None
+
+    def get_fast_serializer(self):
+        return self.fast_serializer_class.from_request(self.request, context=self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_fast_serializer()
+        rows = serializer.values_list(self.filter_queryset(self.get_queryset()))
+        if self.paginator is not None:
+            page = self.paginate_queryset(rows)  # slices the values_list query
+            return self.get_paginated_response(serializer.serialize_rows(list(page)))
+        return Response(serializer.serialize_rows(list(rows)))
+
+    def retrieve(self, request, *args, **kwargs):
+        # object-level permissions need a model instance
+        if any(type(p).has_object_permission is not BasePermission.has_object_permission
+               for p in self.get_permissions()):
+            return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_fast_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, DjangoValidationError):  # as get_object_or_404
+            raise Http404
+        data = serializer.serialize(queryset[:1])
+        if not data:
+            raise Http404
+        return Response(data[0])
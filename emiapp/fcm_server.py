@@ -1,63 +1,209 @@
-import os
+"""
+FCM HTTP v1 delivery client.
+
+One ``httpx.Client`` per worker process keeps a small pool of persistent
+HTTP/2 connections to FCM, so concurrent sends are multiplexed as streams on
+the same connections instead of opening (and TLS-handshaking) new ones. The
+OAuth access token is cached and only refreshed when it is about to expire.
+
+``FCM_BASE_URL`` can point the client at a local stub server
+(see benchmarks/bench_fcm.py).
+"""
 import json
-import firebase_admin
-from firebase_admin import credentials, messaging
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-firebase_app = None
+from django.conf import settings
+from django.db import transaction
 
+from .models import FCM
 
-def initialize_firebase():
-    global firebase_app
+# httpx / google-auth are imported on first use, not when views.py is loaded:
+# most workers and manage.py commands never send a push
 
-    # Already initialized
-    if firebase_app:
-        return firebase_app
+logger = logging.getLogger(__name__)
 
-    if firebase_admin._apps:
-        firebase_app = firebase_admin.get_app()
-        return firebase_app
+SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
+
+
+class FCMClient:
+    def __init__(self, credentials, project_id, base_url=None):
+        import httpx
+
+        self.credentials = credentials
+        self.base_url = (base_url or settings.FCM_BASE_URL).rstrip("/")
+        self.url = f"{self.base_url}/v1/projects/{project_id}/messages:send"
+        self._token_lock = threading.Lock()
+        self._pool = None
+        self.http = httpx.Client(
+            http2=True,
+            # plain http:// (a local stub) has no ALPN, so use HTTP/2 prior knowledge
+            http1=not self.base_url.startswith("http://"),
+            limits=httpx.Limits(
+                max_connections=settings.FCM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FCM_MAX_CONNECTIONS,
+            ),
+            timeout=settings.FCM_TIMEOUT,
+        )
 
-    # Check env variable
-    service_account = os.environ.get("serviceaccountkey")
+    @classmethod
+    def from_service_account(cls, info, base_url=None):
+        from google.oauth2 import service_account
 
-    if not service_account:
-        print("⚠️ Firebase key not found (safe for migration)")
-        return None
+        credentials = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
+        return cls(credentials, info["project_id"], base_url=base_url)
 
+    def access_token(self):
+        # google-auth credentials keep the token and its expiry; refresh only when stale
+        if not self.credentials.valid:
+            with self._token_lock:
+                if not self.credentials.valid:
+                    from google.auth.transport.requests import Request
+
+                    self.credentials.refresh(Request())
+        return self.credentials.token
+
+    def send(self, token, data):
+        """
+        Send one data message; returns {"success": message name} or
+        {"error": message, "code": FCM error code (e.g. "UNREGISTERED")}.
+        """
+        import httpx
+        from google.auth.exceptions import GoogleAuthError
+
+        if not token:
+            return {"error": "FCM token missing"}
+        try:
+            response = self.http.post(
+                self.url,
+                json={"message": {"token": token, "data": data}},
+                headers={"Authorization": f"Bearer {self.access_token()}"},
+            )
+            body = response.json() if response.status_code == 200 else None
+        # a failed token refresh or a garbled 200 must not escape into send_many / lock views
+        except (httpx.HTTPError, GoogleAuthError, ValueError) as e:
+            return {"error": str(e) or e.__class__.__name__, "code": "UNAVAILABLE"}
+
+        if response.status_code == 200:
+            return {"success": body.get("name") if isinstance(body, dict) else None}
+        return parse_error(response)
+
+    def send_many(self, messages):
+        """
+        Send ``[(token, data), ...]`` concurrently on the shared connections.
+        Returns results in the same order.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=settings.FCM_CONCURRENCY, thread_name_prefix="fcm")
+        return list(self._pool.map(lambda message: self.send(*message), messages))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        self.http.close()
+
+
+def parse_error(response):
+    """Error message and code of a failed v1 send (the FcmError detail wins over the gRPC status)."""
+    fallback = f"HTTP {response.status_code}"
     try:
-        service_account_info = json.loads(service_account)
-        cred = credentials.Certificate(service_account_info)
-        firebase_app = firebase_admin.initialize_app(cred)
+        error = response.json()["error"]
+    except (ValueError, KeyError, TypeError):
+        return {"error": fallback, "code": "UNKNOWN"}
+
+    code = error.get("status") or "UNKNOWN"
+    for detail in error.get("details") or ():
+        if detail.get("@type") == "type.googleapis.com/google.firebase.fcm.v1.FcmError" and detail.get("errorCode"):
+            code = detail["errorCode"]
+    return {"error": error.get("message") or fallback, "code": code}
+
 
-        print("✅ Firebase initialized")
-        return firebase_app
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
 
-    except Exception as e:
-        print("❌ Firebase init error:", str(e))
-        return None
+
+def get_client():
+    """The per-process client, or None if no service account is configured."""
+    global _client, _client_pid
+
+    # a pool inherited over fork() shares sockets with the parent, so rebuild it
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            service_account = os.environ.get("serviceaccountkey")
+            if not service_account:
+                logger.warning("⚠️ Firebase key not found (safe for migration)")
+                return None
+            try:
+                _client = FCMClient.from_service_account(json.loads(service_account))
+            except Exception as e:
+                logger.error("❌ FCM client init error: %s", e)
+                return None
+            _client_pid = os.getpid()
+    return _client
 
 
 # Function to send command
 def send_command(token, command):
-    try:
-        if not token:
-            return {"error": "FCM token missing"}
+    if not token:
+        return {"error": "FCM token missing"}
 
-        app = initialize_firebase()
+    client = get_client()
+    if not client:
+        return {"error": "Firebase not initialized"}
 
-        if not app:
-            return {"error": "Firebase not initialized"}
+    return client.send(token, {"command": command})
 
-        message = messaging.Message(
-            data={"command": command},
-            token=token,
-        )
 
-        response = messaging.send(message)
-        print("FCM sent:", response)
+def send_commands(tokens, command):
+    """Fan one command out to many tokens; returns {token: result}."""
+    tokens = [t for t in dict.fromkeys(tokens) if t]
+    if not tokens:
+        return {}
+
+    client = get_client()
+    if not client:
+        return {token: {"error": "Firebase not initialized"} for token in tokens}
+
+    results = client.send_many([(token, {"command": command}) for token in tokens])
+    return dict(zip(tokens, results))
+
+
+def send_to_imeis(imeis, command):
+    """
+    Send ``command`` to the registered devices with a valid token and record
+    each result on its FCM row (tokens that fail permanently are invalidated).
+    Returns {imei: result}; IMEIs without a usable token are left out.
+    """
+    return send_data_to_imeis({imei: {"command": command} for imei in imeis})
+
+
+def send_data_to_imeis(payloads):
+    """send_to_imeis() with a data payload per device: {imei: data}."""
+    entries = list(FCM.objects.filter(imei_1__in=list(payloads), is_valid=True).exclude(fcm_token=""))
+    if not entries:
+        return {}
+
+    if not get_client():  # not a delivery failure, so nothing is recorded
+        return {entry.imei_1: {"error": "Firebase not initialized"} for entry in entries}
+
+    results = get_client().send_many([(entry.fcm_token, payloads[entry.imei_1]) for entry in entries])
+    with transaction.atomic():
+        for entry, result in zip(entries, results):
+            entry.record_result(result)
+            # only if the device has not re-registered a new token meanwhile
+            FCM.objects.filter(pk=entry.pk, fcm_token=entry.fcm_token).update(
+                is_valid=entry.is_valid, history=entry.history,
+                last_error=entry.last_error, last_sent_at=entry.last_sent_at,
+            )
+    return {entry.imei_1: result for entry, result in zip(entries, results)}
 
-        return {"success": response}
 
-    except Exception as e:
-        print("FCM ERROR:", str(e))
-        return {"error": str(e)}
\ No newline at end of file
+def send_to_imei(imei, command):
+    """send_to_imeis() for one device; None if it has no valid token."""
+    return send_to_imeis([imei], command).get(imei)
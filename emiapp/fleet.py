@@ -0,0 +1,80 @@
+"""
+A dealer's device fleet: server-side filters for /devices/ and the status
+counts for /devices/summary/.
+
+    ?status=locked | unlocked | no_fcm_token | lagging
+    ?last_seen_before=<ISO date or datetime>   (devices never seen match too)
+
+The list is ordered by -last_updated (the latest lock / unlock first), so
+the (user, is_locked, last_updated) index serves both the status filter
+and the ordering; the summary is one conditional aggregate.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import FCM
+
+STATUSES = ("locked", "unlocked", "no_fcm_token", "lagging")
+
+
+def has_fcm_token():
+    # a token push delivery can use: present and not marked invalid (see fcm_server.py)
+    return Exists(FCM.objects.filter(imei_1=OuterRef("imei"), is_valid=True).exclude(fcm_token=""))
+
+
+def status_q(status):
+    # is_locked IN (...) rather than = : Django writes =True as a bare "is_locked",
+    # which SQLite can't seek device_user_lock_idx on
+    return {
+        "locked": Q(is_locked__in=[True]),
+        "unlocked": Q(is_locked__in=[False]),
+        "no_fcm_token": ~has_fcm_token(),
+        "lagging": Q(applied_version__lt=F("desired_version")),  # lock state not applied yet
+    }[status]
+
+
+def not_seen_since(moment):
+    return Q(last_seen__lt=moment) | Q(last_seen__isnull=True)
+
+
+def parse_moment(value, name):
+    try:
+        moment = parse_datetime(value) if "T" in value or " " in value else None
+        if moment is None and (day := parse_date(value)) is not None:
+            moment = datetime.combine(day, time.min)
+    except ValueError:  # well formed but impossible, e.g. 2024-02-30 or T25:00
+        moment = None
+    if moment is None:
+        raise ValidationError({name: ["Expected an ISO 8601 date or datetime."]})
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+# ---------------- LIST ----------------
+def filter_devices(queryset, params):
+    status = params.get("status")
+    if status:
+        if status not in STATUSES:
+            raise ValidationError({"status": [f"One of: {', '.join(STATUSES)}."]})
+        queryset = queryset.filter(status_q(status))
+    if params.get("last_seen_before"):
+        queryset = queryset.filter(not_seen_since(parse_moment(params["last_seen_before"], "last_seen_before")))
+    return queryset.order_by("-last_updated", "-id")
+
+
+# ---------------- SUMMARY ----------------
+def summary(queryset, offline_before=None):
+    """Per-state counts over ``queryset`` in one query; ``offline`` = not seen since ``offline_before``."""
+    offline_before = offline_before or timezone.now() - timedelta(seconds=settings.DEVICE_OFFLINE_AFTER)
+    counts = queryset.aggregate(
+        total=Count("id"),
+        **{status: Count("id", filter=status_q(status)) for status in STATUSES},
+        never_seen=Count("id", filter=Q(last_seen__isnull=True)),
+        offline=Count("id", filter=not_seen_since(offline_before)),
+    )
+    counts["offline_before"] = offline_before.isoformat()
+    return counts
@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from .buffers import WriteBehindBuffer
+from .models import Device
+
+# Columns a heartbeat may touch (``last_seen`` is always set server-side)
+HEARTBEAT_FIELDS = ("last_seen", "applied_lock_state", "battery_level", "app_version", "applied_version")
+
+
+# ---------------- HEARTBEAT BUFFER ----------------
+class HeartbeatBuffer(WriteBehindBuffer):
+    """
+    Coalesces device heartbeats per worker: the latest report per device wins
+    and each flush turns the whole batch into bulk UPDATEs (one per group of
+    devices reporting the same set of columns) instead of one UPDATE each.
+    """
+
+    def __init__(self, interval=None, max_items=None, batch_size=500):
+        super().__init__(interval, max_items)
+        self.batch_size = batch_size
+        self._pending_updates = {}
+
+    def _add(self, item):
+        device_id, values = item
+        # last-write-wins, but keep columns an earlier heartbeat set and this one omitted
+        self._pending_updates.setdefault(device_id, {}).update(values)
+        return len(self._pending_updates)
+
+    def _pending(self):
+        return len(self._pending_updates)
+
+    def _drain(self):
+        batch, self._pending_updates = self._pending_updates, {}
+        return batch
+
+    def _requeue(self, batch):
+        # reports that arrived since the drain are newer: they win column by column
+        for device_id, values in batch.items():
+            self._pending_updates[device_id] = {**values, **self._pending_updates.get(device_id, {})}
+        return True
+
+    def write(self, batch):
+        groups = defaultdict(list)
+        for device_id, values in batch.items():
+            groups[tuple(sorted(values))].append(Device(id=device_id, **values))
+        for fields, devices in groups.items():
+            Device.objects.bulk_update(devices, fields, batch_size=self.batch_size)
+
+
+heartbeats = HeartbeatBuffer(
+    interval=settings.HEARTBEAT_FLUSH_INTERVAL,
+    max_items=settings.HEARTBEAT_MAX_PENDING,
+)
+
+
+def record_heartbeat(device_id, **values):
+    heartbeats.add((device_id, values))
@@ -0,0 +1,73 @@
+"""
+Upload pipeline for profile / QR images.
+
+Uploads are re-encoded (which drops EXIF/GPS and other metadata), bounded
+to IMAGE_VARIANT_SIZES["lg"] pixels and rendered as WebP variants in a
+small thread pool (Pillow releases the GIL while resizing and encoding).
+Variants are stored under content-hashed names, so the same bytes always get
+the same URL and can be cached forever (see views_media.serve_media).
+"""
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# names written by store_variants(): <20 hex chars>_<variant>.webp
+HASHED_NAME_RE = re.compile(r"(^|/)[0-9a-f]{20}_[a-z]+\.webp$")
+
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="images")
+    return _pool
+
+
+def _load(upload):
+    # Pillow is imported here rather than at module level so importing models stays cheap
+    from PIL import Image, ImageOps
+
+    upload.seek(0)
+    image = Image.open(upload)
+    image = ImageOps.exif_transpose(image)  # keep the orientation EXIF described, then drop EXIF
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+    largest = max(settings.IMAGE_VARIANT_SIZES.values())
+    image.thumbnail((largest, largest), Image.Resampling.LANCZOS)
+    return image
+
+
+def _render(image, size):
+    from PIL import Image
+
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    # no exif= / icc_profile= arguments, so nothing but pixels is written
+    variant.save(buffer, format="WEBP", quality=settings.IMAGE_WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def store_variants(upload, directory):
+    """Process ``upload`` and return {variant name: storage path}."""
+    image = _load(upload)
+    futures = {
+        name: _executor().submit(_render, image, size)
+        for name, size in settings.IMAGE_VARIANT_SIZES.items()
+    }
+
+    variants = {}
+    for name, future in futures.items():
+        data = future.result()
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        path = f"{directory}/{digest}_{name}.webp"
+        if not default_storage.exists(path):  # content-addressed: identical uploads share files
+            path = default_storage.save(path, ContentFile(data))
+        variants[name] = path
+    return variants
@@ -0,0 +1,127 @@
+"""
+Versioned desired-state delivery for device locks.
+
+Lock / unlock no longer fire a one-off command: they set the desired state
+(``Device.is_locked``) and bump ``desired_version``. A push only says
+"state N is LOCK/UNLOCK"; the phone applies it if N is newer than what it
+has and reports ``applied_version`` back (heartbeat). So pushes that arrive
+late or out of order are ignored, and a lost one is simply pushed again:
+
+- ``request_push`` queues the device in a per-worker buffer; a burst of
+  toggles within LOCK_PUSH_DELAY collapses into one push, and every push
+  reads the current state from the database, never a stale command.
+- ``reconcile`` re-pushes devices whose applied version still lags after
+  LOCK_RETRY_AFTER seconds (``manage.py reconcile_devices``, run from cron).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .buffers import WriteBehindBuffer
+from .models import Device
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- DESIRED STATE ----------------
+def set_lock_state(device, locked, action):
+    """Record the desired lock state as a new version and queue its push; returns the version."""
+    now = timezone.now()
+    Device.objects.filter(pk=device.pk).update(
+        is_locked=locked, last_action=action, last_updated=now, updated_at=now,
+        desired_version=F("desired_version") + 1,
+    )
+    device.refresh_from_db(fields=["is_locked", "last_action", "last_updated", "updated_at", "desired_version"])
+    request_push(device.pk)
+    return device.desired_version
+
+
+def command_for(locked):
+    return "LOCK" if locked else "UNLOCK"
+
+
+def push_desired_state(device_ids):
+    """
+    Push the current desired state to the given devices and record what was
+    pushed. Returns {imei: FCM result} (devices without a valid token are left out).
+    """
+    from .fcm_server import send_data_to_imeis
+
+    devices = list(Device.objects.filter(pk__in=list(device_ids)).values_list("id", "imei", "is_locked", "desired_version"))
+    if not devices:
+        return {}
+
+    # FCM data values must be strings
+    results = send_data_to_imeis({
+        imei: {"command": command_for(locked), "version": str(version)}
+        for _, imei, locked, version in devices
+    })
+
+    now = timezone.now()
+    with transaction.atomic():
+        for pk, imei, _, version in devices:
+            # never move last_pushed_version backwards if another worker pushed a newer one
+            Device.objects.filter(pk=pk, last_pushed_version__lte=version).update(
+                last_pushed_version=version, last_pushed_at=now,
+            )
+    return results
+
+
+# ---------------- COALESCING PUSH BUFFER ----------------
+class LockPushBuffer(WriteBehindBuffer):
+    """Device ids waiting for a push; each id is pushed once per flush however often it was queued."""
+
+    def __init__(self, interval=None, max_items=None):
+        super().__init__(interval, max_items)
+        self._pending_ids = set()
+
+    def _add(self, item):
+        self._pending_ids.add(item)
+        return len(self._pending_ids)
+
+    def _pending(self):
+        return len(self._pending_ids)
+
+    def _drain(self):
+        batch, self._pending_ids = self._pending_ids, set()
+        return batch
+
+    def write(self, batch):
+        push_desired_state(batch)
+
+
+lock_pushes = LockPushBuffer(interval=settings.LOCK_PUSH_DELAY, max_items=settings.LOCK_PUSH_MAX_PENDING)
+
+
+def request_push(device_id):
+    # after commit: the flusher must see the new version
+    transaction.on_commit(lambda: lock_pushes.add(device_id))
+
+
+# ---------------- RECONCILER ----------------
+def lagging_devices(now=None):
+    """Devices that have not applied their desired version and were not pushed recently."""
+    retry_before = (now or timezone.now()) - timedelta(seconds=settings.LOCK_RETRY_AFTER)
+    return (
+        Device.objects.filter(applied_version__lt=F("desired_version"))
+        .exclude(last_pushed_at__gte=retry_before)
+        .order_by(F("last_pushed_at").asc(nulls_first=True))
+    )
+
+
+def reconcile(limit=None):
+    """Re-push lagging devices in batches; returns the number of devices pushed."""
+    limit = limit or settings.LOCK_RECONCILE_BATCH
+    started = timezone.now()  # devices pushed during this run drop out of the query
+    pushed = 0
+    while True:
+        ids = list(lagging_devices(started).values_list("id", flat=True)[:limit])
+        if not ids:
+            return pushed
+        push_desired_state(ids)
+        pushed += len(ids)
+        logger.info("Re-pushed desired lock state to %d lagging devices", len(ids))
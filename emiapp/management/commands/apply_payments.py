@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from emiapp.payments import apply_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Post staged payment-gateway / UPI callbacks to customers, EMIs and payments in batches. "
+        "Drains what is pending and exits, or with --loop keeps polling as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.PAYMENT_APPLY_BATCH)
+        parser.add_argument("--loop", type=float, metavar="SECONDS", help="poll every SECONDS once drained instead of exiting")
+
+    def handle(self, *args, **options):
+        while True:
+            totals = {}
+            while counts := apply_pending(options["batch_size"]):
+                for state, n in counts.items():
+                    totals[state] = totals.get(state, 0) + n
+                if set(counts) == {"pending"}:
+                    break  # only conflicted events left: back off before trying them again
+            if totals:
+                self.stdout.write("  " + ", ".join(f"{n:,} {state}" for state, n in sorted(totals.items())))
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
+            close_old_connections()
@@ -0,0 +1,107 @@
+import gzip
+import json
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from emiapp.utils import explicit_timestamps
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a JSON Lines file written by dump_jsonl (or dumpdata --format jsonl) with "
+        "batched bulk_create. The file is read line by line, so it can be larger than RAM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="input file ('.gz' is decompressed, '-' reads stdin)")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--batch-size", type=int, default=2000, help="objects per bulk_create / transaction")
+        parser.add_argument("--ignore-conflicts", action="store_true", help="skip rows whose primary or unique keys already exist")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if path == "-":
+            stream = sys.stdin
+        elif path.endswith(".gz"):
+            stream = gzip.open(path, "rt", encoding="utf-8")
+        else:
+            stream = open(path, encoding="utf-8")
+
+        self.using = options["database"]
+        self.batch_size = options["batch_size"]
+        self.ignore_conflicts = options["ignore_conflicts"]
+        self.loaded = {}
+
+        try:
+            model, batch = None, []
+            for line_no, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    obj_model = apps.get_model(record["model"])
+                    obj = self.build(obj_model, record)
+                except (ValueError, KeyError, LookupError, TypeError) as e:
+                    raise CommandError(f"{path}:{line_no}: {e}")
+
+                if obj_model is not model or len(batch) >= self.batch_size:
+                    self.write(model, batch)
+                    model, batch = obj_model, []
+                batch.append(obj)
+            self.write(model, batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.reset_sequences()
+        for model, count in self.loaded.items():
+            self.stdout.write(f"  {model._meta.label:<28} {count:>10,} rows")
+        self.stdout.write(self.style.SUCCESS(f"✅ Loaded {sum(self.loaded.values()):,} objects"))
+
+    def build(self, model, record):
+        pk = model._meta.pk.to_python(record.get("pk"))
+        values, m2m = {model._meta.pk.attname: pk}, []
+        for name, value in record["fields"].items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                # dumpdata inlines M2M ids (dump_jsonl writes the through tables instead)
+                if value:
+                    m2m.append((field, [field.target_field.to_python(v) for v in value]))
+                continue
+            # FKs hold the related primary key, as in dumpdata output
+            target = field.target_field if field.is_relation else field
+            values[field.attname] = None if value is None else target.to_python(value)
+        obj = model(**values)
+        obj._jsonl_m2m = m2m
+        return obj
+
+    def write(self, model, batch):
+        if not batch:
+            return
+        manager = model._base_manager.using(self.using)
+        with transaction.atomic(using=self.using), explicit_timestamps(model):
+            manager.bulk_create(batch, ignore_conflicts=self.ignore_conflicts)
+            through_rows = {}
+            for obj in batch:
+                for field, ids in obj._jsonl_m2m:
+                    through = field.remote_field.through
+                    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+                    through_rows.setdefault(through, []).extend(
+                        through(**{f"{source}_id": obj.pk, f"{target}_id": i}) for i in ids
+                    )
+            for through, rows in through_rows.items():
+                through._base_manager.using(self.using).bulk_create(rows, ignore_conflicts=self.ignore_conflicts)
+        self.loaded[model] = self.loaded.get(model, 0) + len(batch)
+
+    def reset_sequences(self):
+        # explicit primary keys leave Postgres sequences behind; no-op on SQLite
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.loaded))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from emiapp.lockstate import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-push the desired lock state to devices whose reported applied_version lags "
+        "behind desired_version. Run from cron, or with --loop as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.LOCK_RECONCILE_BATCH)
+        parser.add_argument("--loop", type=float, metavar="SECONDS", help="repeat every SECONDS instead of exiting")
+
+    def handle(self, *args, **options):
+        while True:
+            pushed = reconcile(options["batch_size"])
+            self.stdout.write(f"  re-pushed {pushed:,} lagging devices")
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
+            close_old_connections()
@@ -0,0 +1,190 @@
+import math
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from emiapp.models import BalanceKey, Customer, Device, EMI, FCM, Payment, UserProfile
+from emiapp.utils import explicit_timestamps
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Ishaan", "Rohan", "Rahul", "Amit", "Suresh",
+    "Priya", "Ananya", "Diya", "Kavya", "Sneha", "Pooja", "Neha", "Fatima", "Ayesha", "Mohammad",
+    "Imran", "Salman", "Ravi", "Vijay", "Deepak", "Manoj", "Sunita", "Lakshmi", "Meena", "Geeta",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Patel", "Shah", "Khan", "Ansari", "Singh", "Yadav", "Gupta", "Kumar",
+    "Reddy", "Nair", "Iyer", "Das", "Ghosh", "Mehta", "Joshi", "Chauhan", "Qureshi", "Sheikh",
+]
+PHONE_MODELS = [
+    ("Redmi Note 13", 18), ("Galaxy A15", 16), ("Vivo Y28", 12), ("Realme Narzo 70", 10),
+    ("OPPO A79", 9), ("iQOO Z9", 8), ("Galaxy M35", 8), ("Poco X6", 7), ("OnePlus Nord CE4", 7),
+    ("iPhone 13", 5),
+]
+TENURES = [(3, 5), (6, 20), (9, 10), (12, 35), (18, 15), (24, 15)]  # months, weight
+
+
+def luhn_digit(body):
+    total = 0
+    for i, ch in enumerate(reversed(body)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return str((10 - total % 10) % 10)
+
+
+def imei_for(n):
+    body = f"35{n:012d}"  # 14 digits + Luhn check digit, like a real IMEI
+    return body + luhn_digit(body)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic dealers, customers, devices, EMIs, payments, balance keys "
+        "and FCM tokens with realistic distributions, written with batched bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dealers", type=int, default=20)
+        parser.add_argument("--customers", type=int, default=10000, help="total, spread over dealers (long-tailed)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="customers generated and written per transaction")
+        parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible data")
+        parser.add_argument("--password", default="seed-password", help="password for every generated dealer")
+
+    def handle(self, *args, **options):
+        if options["dealers"] < 1 or options["customers"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--dealers and --batch-size must be positive, --customers non-negative")
+
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        # continue numbering after existing rows so repeated runs don't collide
+        self.offset = (Customer.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+
+        dealers = self.create_dealers(options["dealers"], options["password"])
+        # a few big dealers and a long tail of small ones
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(len(dealers))]
+        self.rng.shuffle(weights)
+
+        total, batch_size = options["customers"], options["batch_size"]
+        counts = {"customers": 0, "devices": 0, "emis": 0, "payments": 0, "balance_keys": 0, "fcm": 0}
+        with explicit_timestamps(Customer, Device, BalanceKey, Payment):
+            for start in range(0, total, batch_size):
+                owners = self.rng.choices(dealers, weights=weights, k=min(batch_size, total - start))
+                with transaction.atomic():
+                    for name, count in self.create_chunk(owners, self.offset + start).items():
+                        counts[name] += count
+                self.stdout.write(f"  {start + len(owners):>10,} / {total:,} customers")
+
+        summary = ", ".join(f"{count:,} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"✅ Seeded {len(dealers)} dealers, {summary}"))
+
+    def create_dealers(self, count, password):
+        first = User.objects.filter(username__startswith="seed-dealer-").count()
+        password = make_password(password)  # hash once, not per dealer
+        dealers = User.objects.bulk_create([
+            User(username=f"seed-dealer-{first + i:05d}", email=f"dealer{first + i}@example.com",
+                 password=password, is_staff=True, date_joined=self.now)
+            for i in range(count)
+        ])
+        # bulk_create skips the post_save signal that normally creates profiles
+        UserProfile.objects.bulk_create([
+            UserProfile(user=dealer, shop_name=f"{self.rng.choice(LAST_NAMES)} Mobiles",
+                        phone_number=f"8{self.rng.randrange(10 ** 9):09d}")
+            for dealer in dealers
+        ])
+        return dealers
+
+    def create_chunk(self, owners, first_number):
+        rng, now, today = self.rng, self.now, self.now.date()
+        models = [m for m, _ in PHONE_MODELS]
+        model_weights = [w for _, w in PHONE_MODELS]
+        tenures = [t for t, _ in TENURES]
+        tenure_weights = [w for _, w in TENURES]
+
+        customers, plans = [], []
+        for i, dealer in enumerate(owners):
+            number = first_number + i
+            months = rng.choices(tenures, weights=tenure_weights)[0]
+            price = Decimal(min(max(round(rng.lognormvariate(math.log(18000), 0.6), -2), 3000), 250000))
+            down = (price * Decimal(rng.randint(10, 30)) / 100).quantize(Decimal("1"))
+            per_month = ((price - down) / months).quantize(Decimal("0.01"))
+            paid = min(int(rng.betavariate(1.2, 1.5) * (months + 1)), months)
+            age_days = paid * 30 + rng.randint(0, 29)
+            created = now - timedelta(days=age_days, seconds=rng.randint(0, 86399))
+            next_due = created.date() + timedelta(days=30 * (paid + 1)) if paid < months else None
+
+            customers.append(Customer(
+                user=dealer,
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                mobile=f"9{number:09d}",
+                alternate_mobile=f"7{number:09d}" if rng.random() < 0.3 else None,
+                email=f"customer{number}@example.com" if rng.random() < 0.4 else None,
+                loan_account_no=f"LN{number:010d}",
+                imei_1=imei_for(number * 2),
+                imei_2=imei_for(number * 2 + 1) if rng.random() < 0.7 else None,
+                created_at=created,
+                mobile_model=rng.choices(models, weights=model_weights)[0],
+                total_emi_amount=price - down,
+                emi_per_month=per_month,
+                total_months=months,
+                paid_months=paid,
+                remaining_months=months - paid,
+                next_payment_date=next_due,
+                dealer_contact=f"8{rng.randrange(10 ** 9):09d}",
+                paid_down_payment=down,
+            ))
+            plans.append((created, paid, months, per_month, next_due))
+        customers = Customer.objects.bulk_create(customers)
+
+        devices, keys, fcm = [], [], []
+        for customer, (created, paid, months, per_month, next_due) in zip(customers, plans):
+            registered = created + timedelta(minutes=rng.randint(5, 600))
+            keys.append(BalanceKey(admin_user_id=customer.user_id, created_at=created - timedelta(days=rng.randint(0, 30)),
+                                   is_used=True, used_by=customer, used_at=registered))
+            if rng.random() < 0.08:  # sold but never enrolled
+                continue
+            overdue = next_due is not None and next_due < today
+            locked = rng.random() < (0.6 if overdue else 0.02)
+            devices.append(Device(
+                user_id=customer.user_id, customer=customer, imei=customer.imei_1, is_locked=locked,
+                registered_at=registered, last_action="locked" if locked else "registered",
+                last_updated=now - timedelta(days=rng.randint(0, 20)) if locked else registered,
+                last_seen=now - timedelta(minutes=int(rng.expovariate(1 / 240))),
+                applied_lock_state=locked, battery_level=rng.randint(5, 100),
+                app_version=rng.choices(["2.4.1", "2.5.0", "2.6.0"], weights=[10, 30, 60])[0],
+            ))
+            if rng.random() < 0.9:
+                fcm.append(FCM(imei_1=customer.imei_1, fcm_token=f"seed:{uuid.UUID(int=rng.getrandbits(128)).hex}",
+                               is_valid=rng.random() < 0.95))
+        # a pool of unused keys per dealer, as dealers pre-generate them
+        for customer in customers[::10]:
+            keys.append(BalanceKey(admin_user_id=customer.user_id, created_at=now - timedelta(days=rng.randint(0, 60))))
+
+        emis = EMI.objects.bulk_create([
+            EMI(customer=customer, total_amount=customer.total_emi_amount,
+                paid_amount=plan[3] * plan[1], next_due_date=plan[4] or plan[0].date() + timedelta(days=30 * plan[2]),
+                is_closed=plan[1] == plan[2])
+            for customer, plan in zip(customers, plans)
+        ])
+        payments = [
+            Payment(emi=emi, amount=per_month, paid_on=created.date() + timedelta(days=30 * (k + 1) - rng.randint(0, 5)))
+            for emi, (created, paid, _, per_month, _) in zip(emis, plans)
+            for k in range(paid)
+        ]
+        Payment.objects.bulk_create(payments, batch_size=5000)
+        Device.objects.bulk_create(devices)
+        BalanceKey.objects.bulk_create(keys)  # skips save(), so no QR images are rendered
+        FCM.objects.bulk_create(fcm)
+
+        return {"customers": len(customers), "devices": len(devices), "emis": len(emis),
+                "payments": len(payments), "balance_keys": len(keys), "fcm": len(fcm)}
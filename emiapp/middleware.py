@@ -0,0 +1,197 @@
+import hashlib
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip only
+    brotli = None
+
+from .routers import choose_replica, read_from
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+# ---------------- READ REPLICA ROUTING ----------------
+PIN_COOKIE = "db_pin"
+PIN_HEADER = "X-DB-Pin"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serves safe-method requests from a replica, except for clients that wrote
+    within the last REPLICA_STICKY_SECONDS: those stay pinned to the primary
+    so they always read their own writes despite replication lag.
+
+    The pin travels with the client instead of being stored: a write answers
+    with a signed, timestamped token as the ``db_pin`` cookie and as the
+    X-DB-Pin header, which clients without a cookie jar send back as a
+    request header. Checking it is an HMAC, no query, and it holds on every
+    worker. The token is bound to the client's Authorization header (JWT or
+    device token), falling back to the session cookie and then the remote
+    address. A view sets ``request.pin_to_primary = False`` on an unsafe
+    request that does not write synchronously (buffered heartbeats, staged
+    webhooks, a /batch/ of reads).
+    """
+
+    sync_capable = True
+    async_capable = True
+    signer = signing.TimestampSigner(salt="emiapp.middleware.db-pin")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        alias = choose_replica() if request.method in SAFE_METHODS and not self.is_pinned(request) else None
+        with read_from(alias):
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        alias = choose_replica() if request.method in SAFE_METHODS and not self.is_pinned(request) else None
+        with read_from(alias):
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and getattr(request, "pin_to_primary", True):
+            token = self.signer.sign(self.client_id(request))
+            response[PIN_HEADER] = token
+            response.set_cookie(
+                PIN_COOKIE, token, max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite="Lax",
+            )
+        return response
+
+    @classmethod
+    def is_pinned(cls, request):
+        token = request.headers.get(PIN_HEADER) or request.COOKIES.get(PIN_COOKIE)
+        if not token:
+            return False
+        try:
+            client = cls.signer.unsign(token, max_age=settings.REPLICA_STICKY_SECONDS)
+        except signing.BadSignature:  # includes SignatureExpired
+            return False
+        return client == cls.client_id(request)
+
+    @staticmethod
+    def client_id(request):
+        client = (
+            request.headers.get("Authorization")
+            or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+            or request.META.get("REMOTE_ADDR", "")
+        )
+        return hashlib.sha1(client.encode()).hexdigest()
+
+
+# ---------------- STATIC FILES ----------------
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, which makes Django run the whole middleware
+    chain through sync_to_async under ASGI. Looking up a static file does no
+    I/O, so the same logic is safe to run directly on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+# ---------------- RESPONSE COMPRESSION ----------------
+class CompressionMiddleware:
+    """
+    Brotli (when installed and accepted) or gzip for responses of at least
+    COMPRESSION_MIN_SIZE bytes. Small responses such as device polls are
+    sent as-is, since compressing them saves nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self._choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding == "br":
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == "gzip":
+            compressed = compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # the representation changed, so a strong ETag must become weak
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    @staticmethod
+    def _choose_encoding(accept_encoding):
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in accept_encoding.split(",")
+            if not re.search(r";\s*q=0(\.0*)?\s*$", token)
+        }
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
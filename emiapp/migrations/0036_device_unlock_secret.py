@@ -0,0 +1,33 @@
+# Generated by Django 6.0.3 on 2026-10-19 14:54
+
+import emiapp.utils
+from django.db import migrations, models
+
+
+def assign_unlock_secrets(apps, schema_editor):
+    # AddField evaluates the callable default once, so give every
+    # existing device its own secret.
+    Device = apps.get_model('emiapp', 'Device')
+    for device in Device.objects.only('id'):
+        device.unlock_secret = emiapp.utils.generate_secret()
+        device.save(update_fields=['unlock_secret'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0035_remove_appversion_apk_file_appversion_apk_url'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='device',
+            name='unlock_code',
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='unlock_secret',
+            field=models.CharField(default=emiapp.utils.generate_secret, editable=False, max_length=32),
+        ),
+        migrations.RunPython(assign_unlock_secrets, migrations.RunPython.noop),
+    ]
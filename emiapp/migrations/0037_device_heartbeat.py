@@ -0,0 +1,33 @@
+# Generated by Django 6.0.3 on 2026-10-19 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0036_device_unlock_secret'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='app_version',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='applied_lock_state',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='battery_level',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
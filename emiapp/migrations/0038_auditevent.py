@@ -0,0 +1,34 @@
+# Generated by Django 6.0.3 on 2026-10-19 14:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0037_device_heartbeat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('device_registered', 'Device registered'), ('device_locked', 'Device locked'), ('device_unlocked', 'Device unlocked'), ('emi_posted', 'EMI posted')], max_length=32)),
+                ('actor', models.CharField(blank=True, max_length=150)),
+                ('imei', models.CharField(blank=True, max_length=50)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_events', to='emiapp.customer')),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_events', to='emiapp.device')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device', '-id'], name='audit_device_timeline_idx'), models.Index(fields=['user', '-id'], name='audit_dealer_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.3 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0038_auditevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='qr_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
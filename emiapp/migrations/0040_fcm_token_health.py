@@ -0,0 +1,37 @@
+# Generated by Django 6.0.3 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0039_userprofile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fcm',
+            name='history',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='fcm',
+            name='is_valid',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='fcm',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='fcm',
+            name='last_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fcm',
+            index=models.Index(condition=models.Q(('is_valid', True)), fields=['imei_1'], name='fcm_valid_token_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.3 on 2026-10-19 15:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from emiapp import search
+
+
+def install_name_index(apps, schema_editor):
+    # SQLite: FTS5 table + triggers; Postgres: pg_trgm GIN index
+    search.install(schema_editor.connection)
+
+
+def uninstall_name_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0040_fcm_token_health'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'mobile'], name='customer_user_mobile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'alternate_mobile'], name='customer_user_alt_mobile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'imei_1'], name='customer_user_imei1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'imei_2'], name='customer_user_imei2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'loan_account_no'], name='customer_user_loan_no_idx'),
+        ),
+        migrations.RunPython(install_name_index, uninstall_name_index),
+    ]
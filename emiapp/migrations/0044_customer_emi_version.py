@@ -0,0 +1,23 @@
+# Generated by Django 6.0.3 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0043_device_desired_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='emi',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.3 on 2026-10-19 16:23
+
+import django.db.models.deletion
+import emiapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0044_customer_emi_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32)),
+                ('transaction_id', models.CharField(max_length=100)),
+                ('reference', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('applied', 'Applied'), ('rejected', 'Rejected'), ('ignored', 'Ignored')], default='pending', max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='event', to='emiapp.payment')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('state', 'pending')), fields=['id'], name='payment_event_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'transaction_id'), name='payment_event_txn_uniq')],
+            },
+            bases=(emiapp.models.DirtyFieldsMixin, models.Model),
+        ),
+    ]
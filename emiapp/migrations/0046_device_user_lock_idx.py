@@ -0,0 +1,19 @@
+# Generated by Django 6.0.3 on 2026-10-19 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0045_paymentevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['user', 'is_locked', 'last_updated'], name='device_user_lock_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.3 on 2026-10-19 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emiapp', '0047_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentevent',
+            name='installments',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
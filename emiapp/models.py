@@ -1,19 +1,110 @@
 from django.db import models
+from django.db.models.fields.files import FieldFile
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
+import copy
 import uuid
-import qrcode
 from io import BytesIO
 from django.core.files.base import ContentFile
-import hashlib
-import requests
-import base64
+from .utils import generate_secret
+from .images import store_variants
+
+
+# =========================
+# DIRTY FIELDS
+# =========================
+def _comparable(value):
+    # files compare by stored name; JSON containers are copied so in-place edits show up
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class DirtyFieldsMixin:
+    """
+    Remembers the column values an instance was loaded (or last saved) with.
+    save() on a loaded instance then UPDATEs only the columns that changed,
+    plus auto_now ones, and skips the query (and its signals) when none did.
+    An explicit update_fields, force_insert or another ``using`` still wins.
+
+    With ``version_field`` set, every UPDATE also bumps that column
+    (F() + 1, read back through RETURNING) unless the caller already set a
+    new version, as versioning.claim does.
+    """
+    _loaded_values = None
+    version_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self, attnames=None):
+        loaded = {} if attnames is None or self._loaded_values is None else self._loaded_values
+        for field in self._meta.concrete_fields:
+            if attnames is not None and field.attname not in attnames:
+                continue
+            if field.attname not in self.__dict__:  # deferred
+                continue
+            value = self.__dict__[field.attname]
+            if hasattr(value, "resolve_expression"):
+                loaded.pop(field.attname, None)  # F() etc.: unknown until refreshed
+            else:
+                loaded[field.attname] = _comparable(value)
+        self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """Names of the concrete fields changed since the instance was loaded or saved."""
+        loaded = self._loaded_values or {}
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            value = self.__dict__[field.attname]
+            if field.attname not in loaded or (value.name if isinstance(value, FieldFile) else value) != loaded[field.attname]:
+                dirty.append(field.name)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        if (
+            self._loaded_values is not None and not self._state.adding and not args
+            and kwargs.get("update_fields") is None and not kwargs.get("force_insert")
+            and (kwargs.get("using") or self._state.db) == self._state.db
+        ):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            auto_now = [f.name for f in self._meta.concrete_fields if getattr(f, "auto_now", False) and f.name not in dirty]
+            kwargs["update_fields"] = dirty + auto_now
+        if self.version_field and not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") != []:
+            self._bump_version(kwargs)
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        self._snapshot(None if update_fields is None else {self._meta.get_field(name).attname for name in update_fields})
+
+    def _bump_version(self, kwargs):
+        name = self.version_field
+        loaded = self._loaded_values or {}
+        if name not in loaded or self.__dict__.get(name) == loaded[name]:
+            setattr(self, name, models.F(name) + 1)
+        if kwargs.get("update_fields") is not None and name not in kwargs["update_fields"]:
+            kwargs["update_fields"] = [*kwargs["update_fields"], name]
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get("fields") if "fields" in kwargs else (args[1] if len(args) > 1 else None)
+        self._snapshot(None if fields is None else {self._meta.get_field(name).attname for name in fields})
+
+
 # =========================
 # USER PROFILE
 # =========================
-class UserProfile(models.Model):
+class UserProfile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     profile_image = models.ImageField(upload_to='profile/', null=True, blank=True)
     qr_image = models.ImageField(upload_to='qr/', null=True, blank=True)
@@ -21,6 +112,24 @@ class UserProfile(models.Model):
     distributor_name = models.CharField(max_length=255, blank=True)
     distributor_contact = models.CharField(max_length=20, blank=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+    # {variant: storage path} of the processed WebP renditions (see images.py)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    qr_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    IMAGE_FIELDS = ("profile_image", "qr_image")
+
+    def save(self, *args, **kwargs):
+        # 🖼 Fresh uploads go through the image pipeline; only the variants are stored
+        for field_name in self.IMAGE_FIELDS:
+            image = getattr(self, field_name)
+            if image and not image._committed:
+                variants = store_variants(image, self._meta.get_field(field_name).upload_to.rstrip("/"))
+                image.name = variants["lg"]
+                image._committed = True
+                setattr(self, f"{field_name}_variants", variants)
+            elif not image:
+                setattr(self, f"{field_name}_variants", {})
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user.username
@@ -28,18 +137,18 @@ class UserProfile(models.Model):
 
 # 🧩 Automatically create & update profile whenever a User is created or saved
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_or_update_user_profile(sender, instance, created, update_fields=None, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
-    else:
-        instance.profile.save()
+    elif update_fields is None:  # not for partial saves such as the last_login stamp on every login
+        instance.profile.save()  # writes only what changed on the profile, if anything
 
 
 # =========================
 # CUSTOMER
 # =========================
 
-class Customer(models.Model):
+class Customer(DirtyFieldsMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="customers")
     name = models.CharField(max_length=100)
     mobile = models.CharField(max_length=15, unique=True)
@@ -49,6 +158,7 @@ class Customer(models.Model):
     imei_1 = models.CharField(max_length=50, blank=True, null=True)
     imei_2 = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Automatically set on creation
+    updated_at = models.DateTimeField(auto_now=True)  # 🔄 delta sync cursor
     mobile_model = models.CharField(max_length=255, null=True, blank=True)
     total_emi_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     emi_per_month = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -58,8 +168,31 @@ class Customer(models.Model):
     next_payment_date = models.DateField(null=True, blank=True)
     dealer_contact = models.CharField(max_length=20, blank=True, null=True)
     paid_down_payment = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    
+    # 🔢 bumped by every write; conditional updates and ETag / If-Match use it (see versioning.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    version_field = "version"
+
+    class Meta:
+        # 🔎 per-dealer prefix search (see search.py); names use FTS5 / pg_trgm
+        indexes = [
+            models.Index(fields=["user", "mobile"], name="customer_user_mobile_idx"),
+            models.Index(fields=["user", "alternate_mobile"], name="customer_user_alt_mobile_idx"),
+            models.Index(fields=["user", "imei_1"], name="customer_user_imei1_idx"),
+            models.Index(fields=["user", "imei_2"], name="customer_user_imei2_idx"),
+            models.Index(fields=["user", "loan_account_no"], name="customer_user_loan_no_idx"),
+            models.Index(fields=["user", "updated_at", "id"], name="customer_user_sync_idx"),
+        ]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        renamed = (
+            not self._state.adding and self._loaded_values is not None and "name" in self.get_dirty_fields()
+            and (update_fields is None or "name" in update_fields)
+        )
+        super().save(*args, **kwargs)
+        if renamed:
+            # 🔄 EMI rows carry customer_name in /sync/: move them past the clients' cursors
+            EMI.objects.using(self._state.db).filter(customer=self).update(updated_at=timezone.now())
 
     def __str__(self):
         return self.name
@@ -68,20 +201,46 @@ class Customer(models.Model):
 #lock/unlock device status
 #=========================
 
-class Device(models.Model):
+class Device(DirtyFieldsMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="devices")
     customer = models.ForeignKey("Customer", on_delete=models.SET_NULL, null=True, blank=True, related_name="device")
     imei = models.CharField(max_length=50, unique=True)
-    unlock_code = models.CharField(max_length=6, blank=True, null=True)
+    unlock_secret = models.CharField(max_length=32, default=generate_secret, editable=False)  # TOTP seed for offline unlock codes
     is_locked = models.BooleanField(default=False)
     registered_at = models.DateTimeField(auto_now_add=True)
     last_action = models.CharField(max_length=20, blank=True, null=True)
     last_updated = models.DateTimeField(default=timezone.now)
+    # 💓 reported by the device heartbeat (written in bulk, see heartbeat.py)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    applied_lock_state = models.BooleanField(null=True, blank=True)
+    battery_level = models.PositiveSmallIntegerField(null=True, blank=True)
+    app_version = models.CharField(max_length=20, blank=True, null=True)
     device_token = models.UUIDField(
         default=uuid.uuid4,
         editable=False,
         null=False  
     )
+    # 🔄 delta sync cursor; heartbeat telemetry (bulk_update) deliberately doesn't bump it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # 🎯 Desired lock state (is_locked) is versioned: every lock/unlock bumps
+    # desired_version, the phone reports the version it applied, and
+    # lockstate.py re-pushes devices that lag (see reconcile_devices)
+    desired_version = models.PositiveIntegerField(default=0)
+    applied_version = models.PositiveIntegerField(default=0)
+    last_pushed_version = models.PositiveIntegerField(default=0)
+    last_pushed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at", "id"], name="device_user_sync_idx"),
+            models.Index(fields=["user", "is_locked", "last_updated"], name="device_user_lock_idx"),  # fleet list / summary
+            models.Index(
+                fields=["last_pushed_at"],
+                condition=models.Q(applied_version__lt=models.F("desired_version")),
+                name="device_lagging_idx",
+            ),
+        ]
 
 
 
@@ -93,7 +252,7 @@ class Device(models.Model):
 
 #======= blance key =================
 
-class BalanceKey(models.Model):
+class BalanceKey(DirtyFieldsMixin, models.Model):
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     admin_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="balance_keys")
     is_used = models.BooleanField(default=False)
@@ -109,6 +268,8 @@ class BalanceKey(models.Model):
 
         # ✅ Automatically generate QR code after saving (only once)
         if not self.qr_image:
+            import qrcode  # heavy (pulls in PIL), only needed when a key is created
+
             qr = qrcode.QRCode(
                 version=1,
                 error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -133,12 +294,20 @@ class BalanceKey(models.Model):
 # =========================
 # EMI
 # =========================
-class EMI(models.Model):
+class EMI(DirtyFieldsMixin, models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="emis")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     next_due_date = models.DateField()
     is_closed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0, editable=False)  # see Customer.version
+    version_field = "version"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="emi_sync_idx"),
+        ]
 
     def __str__(self):
         return f"EMI for {self.customer.name}"
@@ -148,7 +317,7 @@ class EMI(models.Model):
 #=========================
 #  Tutorial video
 #=========================
-class Tutorial(models.Model):
+class Tutorial(DirtyFieldsMixin, models.Model):
     title = models.CharField(max_length=255)
     youtube_url = models.URLField()
 
@@ -158,7 +327,7 @@ class Tutorial(models.Model):
 #=========================
 #MDM QR Code
 #=========================
-class MDMConfig(models.Model):
+class MDMConfig(DirtyFieldsMixin, models.Model):
     name = models.CharField(max_length=100, default="Default Config")
     qr_data = models.JSONField()  # store full QR data
     updated_at = models.DateTimeField(auto_now=True)
@@ -171,25 +340,142 @@ class MDMConfig(models.Model):
 # =========================
 # PAYMENT
 # =========================
-class Payment(models.Model):
+class Payment(DirtyFieldsMixin, models.Model):
     emi = models.ForeignKey(EMI, on_delete=models.CASCADE, related_name="payments")
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid_on = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="payment_sync_idx"),
+        ]
+
+
+# =========================
+# PAYMENT EVENTS (gateway / UPI callbacks)
+# =========================
+class PaymentEvent(DirtyFieldsMixin, models.Model):
+    """A payment callback as received: staged on arrival, applied in batches (see payments.py)."""
+    PENDING = "pending"
+    APPLIED = "applied"
+    REJECTED = "rejected"  # could not be posted (unknown customer, nothing due); needs a look
+    IGNORED = "ignored"  # the gateway reported a payment that was not captured
+    STATES = [(PENDING, "Pending"), (APPLIED, "Applied"), (REJECTED, "Rejected"), (IGNORED, "Ignored")]
+
+    provider = models.CharField(max_length=32)
+    transaction_id = models.CharField(max_length=100)
+    reference = models.CharField(max_length=100)  # our customer id, as given to the gateway
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)  # the gateway's, e.g. "captured"
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    state = models.CharField(max_length=10, choices=STATES, default=PENDING)
+    error = models.CharField(max_length=255, blank=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    payment = models.OneToOneField(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name="event")
+    # whole installments the amount moved the plan on by; the rest stayed on the EMI (see posting.py)
+    installments = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # 🔁 gateways retry callbacks: a replay hits this index and is dropped
+            models.UniqueConstraint(fields=["provider", "transaction_id"], name="payment_event_txn_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(state="pending"), name="payment_event_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.transaction_id} ({self.state})"
+
+
+# =========================
+# TOMBSTONES (delta sync)
+# =========================
+class Tombstone(models.Model):
+    """A deleted Customer / EMI / Payment / Device, so /sync/ can tell the dealer app to drop it."""
+    # no FK constraint: tombstones are written while a dealer's own rows are cascade-deleted
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    model = models.CharField(max_length=20)  # model_name, e.g. "customer"
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at", "id"], name="tombstone_user_sync_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted @ {self.deleted_at:%Y-%m-%d %H:%M:%S}"
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=EMI)
+@receiver(post_delete, sender=Payment)
+def record_tombstone(sender, instance, **kwargs):
+    # cascades delete children first, so the parents are still there to name the dealer
+    if sender is EMI:
+        user_id = Customer.objects.filter(pk=instance.customer_id).values_list("user_id", flat=True).first()
+    elif sender is Payment:
+        user_id = EMI.objects.filter(pk=instance.emi_id).values_list("customer__user_id", flat=True).first()
+    else:
+        user_id = instance.user_id
+    if user_id is not None:
+        Tombstone.objects.create(user_id=user_id, model=sender._meta.model_name, object_id=instance.pk)
 
 
 # ========================
 # FMC
 # ========================
-class FCM(models.Model):
+class FCM(DirtyFieldsMixin, models.Model):
+    HISTORY_BITS = 16
+    # FCM error codes that will never succeed for this token
+    PERMANENT_ERRORS = ("UNREGISTERED", "INVALID_ARGUMENT", "SENDER_ID_MISMATCH")
+
     imei_1 = models.CharField(max_length=255, unique=True)  # IMEI or random ID
     fcm_token = models.TextField()
     updated_at = models.DateTimeField(auto_now=True)
 
+    # 📡 Token health: invalid tokens are skipped until the device re-registers
+    is_valid = models.BooleanField(default=True)
+    # last HISTORY_BITS send results, newest in bit 0 (1 = delivered), under a leading 1 bit
+    history = models.PositiveIntegerField(default=1)
+    last_error = models.CharField(max_length=50, blank=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["imei_1"], condition=models.Q(is_valid=True), name="fcm_valid_token_idx"),
+        ]
+
+    def record_result(self, result):
+        """Fold one send result ({"success": ...} / {"error": ..., "code": ...}) into the health fields."""
+        delivered = "success" in result
+        history = (self.history << 1) | delivered
+        if history >> (self.HISTORY_BITS + 1):
+            history = history & ((1 << self.HISTORY_BITS) - 1) | (1 << self.HISTORY_BITS)
+        self.history = history
+        self.last_error = "" if delivered else (result.get("code") or "UNKNOWN")[:50]
+        if self.last_error in self.PERMANENT_ERRORS:
+            self.is_valid = False
+        self.last_sent_at = timezone.now()
+
+    @property
+    def recent_results(self):
+        """Recorded results, oldest first, as "1" (delivered) / "0" (failed)."""
+        return bin(self.history)[3:]
+
+    @property
+    def recent_failures(self):
+        return self.recent_results.count("0")
+
     def __str__(self):
         return self.imei_1
 
 # =========================policy=================
-class Policy(models.Model):
+class Policy(DirtyFieldsMixin, models.Model):
     type = models.CharField(
         max_length=20,
         choices=[
@@ -206,7 +492,7 @@ class Policy(models.Model):
 
 
 # =========================service request=================
-class ServiceRequest(models.Model):
+class ServiceRequest(DirtyFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
     issue = models.TextField(max_length=500)
@@ -216,7 +502,7 @@ class ServiceRequest(models.Model):
         return f"{self.name} - {self.email}"
 
 # =========================app version=================
-class AppVersion(models.Model):
+class AppVersion(DirtyFieldsMixin, models.Model):
     version_name = models.CharField(max_length=20)   # e.g. "1.0.1"
     version_code = models.IntegerField()             # e.g. 2
     apk_url = models.URLField()# upload APK
@@ -225,4 +511,38 @@ class AppVersion(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.version_name
\ No newline at end of file
+        return self.version_name
+
+
+# =========================audit log=================
+class AuditEvent(models.Model):
+    """Append-only history of device and payment actions (written in batches by audit.py)."""
+    ACTION_CHOICES = [
+        ("device_registered", "Device registered"),
+        ("device_locked", "Device locked"),
+        ("device_unlocked", "Device unlocked"),
+        ("emi_posted", "EMI posted"),
+    ]
+
+    action = models.CharField(max_length=32, choices=ACTION_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="audit_events")  # dealer
+    actor = models.CharField(max_length=150, blank=True)  # username / "device" that triggered it
+    device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True, related_name="audit_events")
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name="audit_events")
+    imei = models.CharField(max_length=50, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["device", "-id"], name="audit_device_timeline_idx"),
+            models.Index(fields=["user", "-id"], name="audit_dealer_timeline_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Audit events are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.action} {self.imei} @ {self.created_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,26 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+# ---------------- AUDIT EVENTS ----------------
+class AuditEventPagination(CursorPagination):
+    """Keyset pagination (WHERE id < cursor) so deep pages cost the same as the first."""
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+# ---------------- CUSTOMER SEARCH ----------------
+class CustomerSearchPagination(PageNumberPagination):
+    """Pages over the ranked search hits (capped at SEARCH_MAX_RESULTS)."""
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+# ---------------- DEVICE FLEET ----------------
+class DevicePagination(PageNumberPagination):
+    """Pages over a dealer's devices, latest lock / unlock first (see emiapp/fleet.py)."""
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
@@ -0,0 +1,15 @@
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+# ---------------- MESSAGEPACK PARSER ----------------
+class MessagePackParser(BaseParser):
+    """Request bodies sent with ``Content-Type: application/msgpack``."""
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
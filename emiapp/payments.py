@@ -0,0 +1,153 @@
+"""
+Payment-gateway / UPI callbacks.
+
+Month-end bursts must not time the gateway out, and gateways retry any
+callback they are unsure about, so ingestion and posting are split:
+
+- the webhook (views_payments.py) checks the HMAC signature, stages the
+  callback as a PaymentEvent with one ``INSERT ... ON CONFLICT DO NOTHING``
+  and answers 200 as soon as that has committed. A replayed transaction id
+  hits the (provider, transaction_id) unique index and is dropped, so a
+  callback is stored once however often it arrives;
+- ``apply_pending`` (``manage.py apply_payments --loop``) posts pending
+  events in batches: one transaction per batch, each event posted like
+  update_emi_payment (see posting.py) and marked applied in that same
+  transaction, so an event is posted exactly once even with several
+  workers (SKIP LOCKED on PostgreSQL; SQLite serializes them).
+
+Callback body, signed with the provider's secret (hex HMAC-SHA256 of the
+raw body in the X-Webhook-Signature header)::
+
+    {"transaction_id": "pay_123", "reference": "42", "amount": "999.00", "status": "captured"}
+
+``reference`` is the customer id the payment was initiated for.
+"""
+import hashlib
+import hmac
+import logging
+import re
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Customer, PaymentEvent
+from .posting import AlreadyPaid, post_emi
+from .versioning import VersionConflict
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+CAPTURED = {"captured", "success", "paid"}
+REFERENCE = re.compile(r"[0-9]{1,18}")  # a customer id: ASCII digits that fit a BIGINT
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCallback(ValueError):
+    """The callback body is not one we can stage (answered 400)."""
+
+
+# ---------------- INGESTION ----------------
+def verify_signature(provider, body, signature):
+    secret = settings.PAYMENT_WEBHOOK_SECRETS.get(provider)
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def parse_callback(provider, data):
+    """PaymentEvent for a decoded callback body; raises InvalidCallback."""
+    if not isinstance(data, dict):
+        raise InvalidCallback("Expected an object")
+    transaction_id, reference = str(data.get("transaction_id") or ""), str(data.get("reference") or "")
+    if not transaction_id or len(transaction_id) > 100:
+        raise InvalidCallback("transaction_id is required (at most 100 characters)")
+    if not REFERENCE.fullmatch(reference):
+        raise InvalidCallback("reference must be the customer id")
+    try:
+        amount = Decimal(str(data.get("amount"))).quantize(Decimal("0.01"))
+        in_range = 0 < amount < Decimal("1e8")
+    except (InvalidOperation, ValueError):
+        raise InvalidCallback("amount must be a decimal number")
+    if not in_range:
+        raise InvalidCallback("amount out of range")
+    return PaymentEvent(
+        provider=provider, transaction_id=transaction_id, reference=reference, amount=amount,
+        status=str(data.get("status") or "captured").lower()[:20], payload=data,
+    )
+
+
+def stage(event):
+    """Durably store ``event`` unless the provider already sent that transaction."""
+    PaymentEvent.objects.bulk_create([event], ignore_conflicts=True)
+
+
+# ---------------- APPLYING ----------------
+def apply_pending(batch_size=None):
+    """Post one batch of pending events; returns {state: count} for it (empty when nothing is pending)."""
+    batch_size = batch_size or settings.PAYMENT_APPLY_BATCH
+    counts = {}
+    with transaction.atomic():
+        pending = PaymentEvent.objects.filter(state=PaymentEvent.PENDING).order_by("id")
+        if connections[pending.db].features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)  # workers take disjoint batches
+        events = list(pending[:batch_size])
+        if not events:
+            return counts
+        references = {_customer_id(e.reference) for e in events} - {None}
+        owners = dict(Customer.objects.filter(id__in=references).values_list("id", "user_id"))
+
+        now = timezone.now()
+        # rows stamped early in the batch stay invisible until it commits: bound
+        # that delay (conflict backoff adds up) so /sync/ can hold back long enough
+        deadline = time.monotonic() + settings.PAYMENT_APPLY_MAX_SECONDS
+        done = []
+        for event in events:
+            if done and time.monotonic() > deadline:
+                break  # the rest stay pending for the next batch
+            try:
+                event.state = _apply(event, owners)
+            except Exception as exc:
+                # one bad event must not roll back the batch and come first again every run
+                logger.exception("Payment event %s could not be applied", event)
+                event.state, event.error = PaymentEvent.REJECTED, f"{type(exc).__name__}: {exc}"[:255]
+            if event.state != PaymentEvent.PENDING:
+                event.applied_at = now
+            counts[event.state] = counts.get(event.state, 0) + 1
+            done.append(event)
+        PaymentEvent.objects.bulk_update(done, ["state", "error", "applied_at", "payment", "installments"])
+    return counts
+
+
+def _customer_id(reference):
+    return int(reference) if REFERENCE.fullmatch(reference) else None
+
+
+def _apply(event, owners):
+    if event.status not in CAPTURED:
+        return PaymentEvent.IGNORED
+    pk = _customer_id(event.reference)
+    try:
+        if pk not in owners:
+            raise Customer.DoesNotExist()
+        customer, event.payment, event.installments = post_emi(pk, owners[pk], amount=event.amount)
+    except Customer.DoesNotExist:
+        event.error = "Unknown customer"
+        return PaymentEvent.REJECTED
+    except AlreadyPaid:
+        event.error = "Nothing due: plan fully paid or no open EMI"
+        return PaymentEvent.REJECTED
+    except VersionConflict:
+        event.error = "Customer kept changing; retries ran out"
+        return PaymentEvent.PENDING  # next batch tries again
+
+    # 📝 like update_emi_payment, once the batch has committed
+    transaction.on_commit(lambda: audit.record(
+        "emi_posted", user=owners[pk], actor=f"webhook:{event.provider}", customer=customer,
+        amount=str(event.amount), paid_months=customer.paid_months, installments=event.installments,
+        transaction_id=event.transaction_id,
+    ))
+    return PaymentEvent.APPLIED
@@ -1,19 +1,32 @@
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
 from rest_framework.permissions import BasePermission
 from .models import Device
 
-class IsDeviceAuthenticated(BasePermission):
-    def has_permission(self, request, view):
-        token = request.headers.get("Authorization")
 
-        if not token or not token.startswith("Device "):
-            return False
+def get_device_token(request):
+    """Token value from an ``Authorization: Device <token>`` header, or None."""
+    token = request.headers.get("Authorization")
 
-        parts = token.split()
+    if not token or not token.startswith("Device "):
+        return None
 
-        if len(parts) != 2:
-            return False
+    parts = token.split()
+
+    if len(parts) != 2:
+        return None
+
+    return parts[1]
+
+
+class IsDeviceAuthenticated(BasePermission):
+    def has_permission(self, request, view):
+        token_value = get_device_token(request)
 
-        token_value = parts[1]
+        if not token_value:
+            return False
 
         try:
             device = Device.objects.get(device_token=token_value)
@@ -25,5 +38,37 @@ class IsDeviceAuthenticated(BasePermission):
             request.device = device
             return True
 
-        except Device.DoesNotExist:
-            return False
\ No newline at end of file
+        except (Device.DoesNotExist, ValidationError):
+            return False
+
+
+# ---------------- ASYNC (native async views, see views_device.py) ----------------
+async def aauthenticate_device(request):
+    token_value = get_device_token(request)
+
+    if not token_value:
+        return None
+
+    try:
+        # customer is needed by most device endpoints; fetch it in the same query
+        return await Device.objects.select_related("customer").aget(device_token=token_value)
+    except (Device.DoesNotExist, ValidationError):
+        return None
+
+
+def device_authenticated(view):
+    """Async counterpart of IsDeviceAuthenticated for plain async views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        device = await aauthenticate_device(request)
+
+        if device is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=403,
+                json_dumps_params={"separators": (",", ":")},
+            )
+
+        request.device = device
+        return await view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,80 @@
+"""
+Posting a collected EMI payment: the customer's plan moves on by the whole
+installments it covers, the open EMI is credited with all of it, and the
+Payment is recorded, all in one transaction.
+
+A partial amount (or the part above whole installments) stays on the EMI's
+paid_amount and counts towards the next installment: the plan moves on when
+the EMI's credit crosses the next multiple of emi_per_month.
+
+Rows are not locked while the new values are worked out; the customer and
+EMI rows are claimed at the version that was read (see versioning.py) and a
+post that loses the race is retried from a fresh read.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import EMI, Customer, Payment
+from .versioning import check_if_match, claim, retry_on_conflict
+
+
+class AlreadyPaid(Exception):
+    """Every installment of the plan has been posted."""
+
+
+def post_emi(customer_id, user, request=None, amount=None):
+    """
+    Post a payment of ``user``'s customer; returns (customer, payment or None
+    when the customer has no open EMI, installments the plan moved on by).
+
+    ``amount`` is what was collected; without it one installment of
+    emi_per_month is posted. A collected amount is only posted against an
+    open EMI. Raises Customer.DoesNotExist,
+    AlreadyPaid, PreconditionFailed (the customer no longer matches
+    ``request``'s If-Match) or, once the retries run out, VersionConflict.
+    """
+    return retry_on_conflict(_post, customer_id, user, request, amount)
+
+
+def _post(customer_id, user, request, amount):
+    customer = Customer.objects.get(id=customer_id, user=user)
+    if request is not None:
+        check_if_match(request, customer)
+    if customer.paid_months >= (customer.total_months or 0):
+        raise AlreadyPaid()
+    emi = EMI.objects.filter(customer=customer, is_closed=False).first()
+    if amount is None:
+        amount = customer.emi_per_month or 0
+        installments = 1
+    elif emi is None:
+        raise AlreadyPaid()  # nothing to credit the money to
+    else:
+        installments = _installments(emi.paid_amount, amount, customer.emi_per_month)
+    installments = min(installments, customer.total_months - customer.paid_months)
+
+    if installments:
+        claim(customer)
+        customer.paid_months += installments
+        customer.remaining_months = customer.total_months - customer.paid_months
+        customer.next_payment_date = (
+            (customer.next_payment_date or timezone.now().date()) + timedelta(days=30 * installments)
+        )
+        customer.save()
+
+    payment = None
+    if emi:
+        claim(emi)
+        emi.paid_amount += amount
+        if emi.paid_amount >= emi.total_amount:
+            emi.is_closed = True
+        emi.save()
+        payment = Payment.objects.create(emi=emi, amount=amount)
+    return customer, payment, installments
+
+
+def _installments(credited, amount, per_month):
+    """Whole installments ``amount`` completes on top of the EMI's earlier ``credited``."""
+    if not per_month or per_month <= 0:
+        return 0
+    return int((credited + amount) // per_month - credited // per_month)
@@ -0,0 +1,159 @@
+"""
+Expected collections, month by month, for a dealer or the whole portfolio.
+
+The open plans are streamed from one query into columnar NumPy arrays
+(emi_per_month, remaining installments, days to next_payment_date), a chunk
+at a time, and each chunk is projected with array operations only:
+
+- a plan pays every 30 days from its next due date until its remaining
+  installments run out (the same step update_emi_payment uses);
+- delay: a plan that is behind keeps the lag it has built up, so it pays
+  the same installments ``ceil(days overdue / 30)`` periods later rather
+  than catching up. The lag distribution is reported with the projection;
+- plans overdue by more than PROJECTION_WRITE_OFF_DAYS are treated as
+  defaulted and projected at zero;
+- scenarios: each annual default rate becomes a monthly hazard, and month
+  ``t`` is scaled by the chance a plan is still paying by then.
+
+For a plan that pays from day ``f`` (days from today), the installments
+falling before day ``b`` number ``clip(ceil((b - f) / 30), 0, remaining)``.
+Taking that at every month boundary gives a (plans x months + 1) matrix
+whose row differences are the installments per month, so a chunk's
+inflows are one matrix-vector product.
+"""
+import calendar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, F
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Customer
+
+PERIOD_DAYS = 30
+MAX_LAG = 4  # lag histogram: 0, 1, 2, 3 and 4+ periods behind
+
+
+# ---------------- LOADING ----------------
+def open_plans(user=None):
+    customers = Customer.objects.filter(total_months__gt=F("paid_months"), emi_per_month__gt=0)
+    return customers.filter(user=user) if user is not None else customers
+
+
+def stream_columns(queryset, chunk_size=None):
+    """
+    Yield (emi_per_month, remaining, next_payment_date) arrays per chunk of
+    ``queryset``. Raw cursor rows skip the ORM's per-row Decimal conversion,
+    and the date is read as ISO text: NumPy parses that in bulk ~15x faster
+    than it converts date objects.
+    """
+    import numpy as np  # heavy, only needed for projections
+
+    chunk_size = chunk_size or settings.PROJECTION_CHUNK_SIZE
+    sql, params = (
+        queryset.order_by()
+        .values_list("emi_per_month", F("total_months") - F("paid_months"), Cast("next_payment_date", CharField()))
+        .query.sql_with_params()
+    )
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(chunk_size):
+            amounts, remaining, due = zip(*rows)
+            # None -> NaT
+            yield (
+                np.array(amounts, dtype=np.float64),
+                np.array(remaining, dtype=np.int64),
+                np.array(due, dtype="datetime64[D]"),
+            )
+
+
+# ---------------- PROJECTION ----------------
+def month_starts(today, months):
+    """Day offsets from ``today`` of each projected month's start, plus the end of the last one."""
+    bounds, day = [0], today
+    for _ in range(months):
+        day = day.replace(day=1) + timedelta(days=calendar.monthrange(day.year, day.month)[1])
+        bounds.append((day - today).days)
+    return bounds
+
+
+def monthly_hazard(annual_default_rate):
+    return 1 - (1 - annual_default_rate) ** (1 / 12)
+
+
+def project(chunks, today, months, default_rates):
+    """Accumulate the projection over ``stream_columns`` chunks."""
+    import numpy as np
+
+    bounds = np.array(month_starts(today, months), dtype=np.float64)
+    scheduled = np.zeros(months)
+    lag_counts = np.zeros(MAX_LAG + 1, dtype=np.int64)
+    loans = written_off = 0
+    outstanding = written_off_amount = 0.0
+    today64 = np.datetime64(today, "D")
+
+    for amount, remaining, due in chunks:
+        days = (due - today64).astype(np.int64)
+        days[np.isnat(due)] = 0  # no date recorded: due now
+        overdue = np.maximum(-days, 0)
+        balance = amount * remaining
+
+        dead = overdue > settings.PROJECTION_WRITE_OFF_DAYS
+        written_off += int(dead.sum())
+        written_off_amount += float(balance[dead].sum())
+        live = ~dead
+        amount, remaining, overdue, days, balance = amount[live], remaining[live], overdue[live], days[live], balance[live]
+        loans += len(amount)
+        outstanding += float(balance.sum())
+
+        # the lag a plan has built up shifts all of its installments
+        lag = -(-overdue // PERIOD_DAYS)
+        lag_counts += np.bincount(np.minimum(lag, MAX_LAG), minlength=MAX_LAG + 1)
+        first = days + lag * PERIOD_DAYS
+
+        paid_by = np.clip(np.ceil((bounds[None, :] - first[:, None]) / PERIOD_DAYS), 0, remaining[:, None])
+        scheduled += amount @ np.diff(paid_by, axis=1)
+
+    # scenarios x months: chance of still paying by the end of month t
+    hazards = np.array([monthly_hazard(rate) for rate in default_rates])
+    survival = (1 - hazards[:, None]) ** np.arange(1, months + 1)[None, :]
+    expected = survival * scheduled[None, :]
+
+    first_month = today.year * 12 + today.month - 1
+    labels = [f"{index // 12}-{index % 12 + 1:02d}" for index in range(first_month, first_month + months)]
+
+    return {
+        "as_of": today.isoformat(),
+        "loans": loans,
+        "outstanding": round(outstanding, 2),
+        "written_off": {"loans": written_off, "outstanding": round(written_off_amount, 2)},
+        # plans by periods behind: "0", "1", ... "4+"
+        "lag": {(f"{i}+" if i == MAX_LAG else str(i)): int(n) for i, n in enumerate(lag_counts)},
+        "months": [
+            {
+                "month": label,
+                "scheduled": round(float(scheduled[t]), 2),
+                "expected": [round(float(expected[s, t]), 2) for s in range(len(default_rates))],
+            }
+            for t, label in enumerate(labels)
+        ],
+        "scenarios": [
+            {"default_rate": rate, "expected_total": round(float(expected[s].sum()), 2)}
+            for s, rate in enumerate(default_rates)
+        ],
+    }
+
+
+def project_cashflow(user=None, months=None, default_rates=None, today=None, using=None):
+    """Project ``user``'s open plans (every dealer's when None)."""
+    queryset = open_plans(user)
+    if using:
+        queryset = queryset.using(using)
+    return project(
+        stream_columns(queryset),
+        today or timezone.localdate(),
+        months or settings.PROJECTION_DEFAULT_MONTHS,
+        default_rates if default_rates is not None else settings.PROJECTION_DEFAULT_RATES,
+    )
@@ -0,0 +1,41 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+# datetimes/dates/times go through DRF's encoder so the output ("...Z",
+# microseconds, Decimal -> float) matches JSONRenderer byte for byte
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+# ---------------- ORJSON RENDERER ----------------
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for DRF's JSONRenderer (compact, UTF-8) backed by orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        # pretty-printing requests (``; indent=4``) keep DRF's implementation
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_encoder.default, option=_OPTIONS)
+        # same escaping DRF applies so the output is safe inside <script> tags
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+# ---------------- MESSAGEPACK RENDERER ----------------
+class MessagePackRenderer(BaseRenderer):
+    """Binary MessagePack responses for ``Accept: application/msgpack`` (same values as the JSON output)."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
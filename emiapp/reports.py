@@ -0,0 +1,190 @@
+"""
+Portfolio reports for dealers: overdue aging and collection efficiency.
+
+Each report is computed in the database, not by walking rows in Python:
+
+- aging: one conditional aggregate over the dealer's open plans (customers
+  and outstanding balance per days-overdue bucket, plus PAR30),
+- collections: payments summed per month with a running total taken by a
+  window function over those rows, and one conditional aggregate over the
+  plans for this month's dues still unpaid.
+
+Results are cached per dealer in the shared cache (settings.CACHES, seen
+by every worker and by apply_payments). Every cache key carries the
+dealer's report version, which is replaced after any committed change to
+their customers or payments, so a posted EMI shows up on the next request.
+A report is computed on the primary, so a lagging replica cannot store
+stale figures under the new version. After that first request a report is
+one cache read, whatever the portfolio size.
+"""
+import calendar
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import EMI, Customer, Payment
+from .routers import use_primary
+
+CENT = Decimal("0.01")
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+# (label, min days overdue, max days overdue); None = open-ended
+AGING_BUCKETS = (
+    ("current", None, 0),
+    ("1-30", 1, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
+
+
+def _money(value):
+    return str(Decimal(str(value or 0)).quantize(CENT))
+
+
+def _open_plans(user):
+    # installments still to pay; plans without total_months are not EMI plans
+    return Customer.objects.filter(user=user, total_months__gt=F("paid_months"))
+
+
+def _bucket_filter(today, low, high):
+    if low is None:
+        return Q(next_payment_date__isnull=True) | Q(next_payment_date__gte=today)
+    # overdue by d days <=> next_payment_date == today - d; a date range keeps it index-friendly
+    q = Q(next_payment_date__lte=today - timedelta(days=low))
+    if high is not None:
+        q &= Q(next_payment_date__gte=today - timedelta(days=high))
+    return q
+
+
+# ---------------- AGING ----------------
+def aging(user, today=None):
+    today = today or timezone.localdate()
+    outstanding = ExpressionWrapper(F("emi_per_month") * (F("total_months") - F("paid_months")), output_field=MONEY)
+
+    aggregates = {}
+    for index, (_, low, high) in enumerate(AGING_BUCKETS):
+        q = _bucket_filter(today, low, high)
+        aggregates[f"customers_{index}"] = Count("id", filter=q)
+        aggregates[f"outstanding_{index}"] = Sum(outstanding, filter=q)
+    # portfolio at risk: balance of plans more than 30 days overdue
+    aggregates["at_risk"] = Sum(outstanding, filter=_bucket_filter(today, 31, None))
+    aggregates["outstanding"] = Sum(outstanding)
+    row = _open_plans(user).aggregate(**aggregates)
+
+    total = Decimal(str(row["outstanding"] or 0))
+    return {
+        "as_of": today.isoformat(),
+        "buckets": [
+            {"bucket": label, "customers": row[f"customers_{index}"], "outstanding": _money(row[f"outstanding_{index}"])}
+            for index, (label, _, _) in enumerate(AGING_BUCKETS)
+        ],
+        "customers": sum(row[f"customers_{index}"] for index in range(len(AGING_BUCKETS))),
+        "outstanding": _money(total),
+        "par30": round(float(Decimal(str(row["at_risk"] or 0)) / total), 4) if total else None,
+    }
+
+
+# ---------------- COLLECTIONS ----------------
+def _months_back(today, months):
+    """First day of the month ``months - 1`` months before ``today``'s."""
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _monthly_collections(user, start):
+    # grouped by day in the ORM: the SQLite month function is a Python UDF, too slow per payment row
+    daily = (
+        Payment.objects.filter(emi__customer__user=user, paid_on__gte=start)
+        .values("paid_on")
+        .annotate(collected=Sum("amount"), payments=Count("id"))
+        .order_by()
+    )
+    connection = connections[daily.db]
+    qn = connection.ops.quote_name
+    sql, params = daily.query.sql_with_params()
+    month_sql, month_params = connection.ops.date_trunc_sql("month", qn("paid_on"), ())
+    # ...rolled up to months, with the running total taken by a window over those rows
+    # (the ORM cannot put a window over an aggregate)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT month, collected, payments, SUM(collected) OVER (ORDER BY month) FROM ("
+            f"SELECT {month_sql} AS month, SUM({qn('collected')}) AS collected, SUM({qn('payments')}) AS payments "
+            f"FROM ({sql}) daily GROUP BY 1) monthly ORDER BY month",
+            (*month_params, *params),
+        )
+        return [
+            {
+                "month": str(month)[:7],  # a timestamp on Postgres, "YYYY-MM-DD" on SQLite
+                "collected": _money(collected),
+                "payments": payments,
+                "cumulative": _money(cumulative),
+            }
+            for month, collected, payments, cumulative in cursor.fetchall()
+        ]
+
+
+def collections(user, months, today=None):
+    today = today or timezone.localdate()
+    rows = _monthly_collections(user, _months_back(today, months))
+
+    # this month's demand = what was collected + installments falling due by month end still unpaid
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    unpaid = _open_plans(user).aggregate(
+        due=Sum("emi_per_month", filter=Q(next_payment_date__lte=month_end)),
+        customers=Count("id", filter=Q(next_payment_date__lte=month_end)),
+    )
+    current = today.strftime("%Y-%m")
+    collected = next((Decimal(row["collected"]) for row in rows if row["month"] == current), Decimal(0))
+    demand = collected + Decimal(str(unpaid["due"] or 0))
+
+    return {
+        "as_of": today.isoformat(),
+        "months": rows,
+        "current_month": {
+            "month": current,
+            "collected": _money(collected),
+            "due_unpaid": _money(unpaid["due"]),
+            "customers_due": unpaid["customers"],
+            "efficiency": round(float(collected / demand), 4) if demand else None,
+        },
+    }
+
+
+# ---------------- CACHE ----------------
+def _version_key(user_id):
+    return f"report-version:{user_id}"
+
+
+def cached(name, user, compute, *params):
+    """``compute()`` through the per-dealer report cache."""
+    # a random version: after an eviction the key comes back new, never as a reused stale one
+    version = cache.get_or_set(_version_key(user.pk), lambda: uuid.uuid4().hex, None)
+    key = ":".join(["report", name, str(user.pk), version, *map(str, params)])
+    data = cache.get(key)
+    if data is None:
+        with use_primary():
+            data = compute()
+        cache.set(key, data, settings.REPORT_CACHE_TTL)
+    return data
+
+
+def invalidate(user_id):
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def invalidate_on_change(sender, instance, using=None, **kwargs):
+    # post_save / post_delete handler for Customer and Payment
+    if sender is Payment:
+        user_id = EMI.objects.using(using).filter(pk=instance.emi_id).values_list("customer__user_id", flat=True).first()
+    else:
+        user_id = instance.user_id
+    if user_id is not None:
+        # after commit: a report computed before then would be cached under the new version
+        transaction.on_commit(lambda: invalidate(user_id), using=using)
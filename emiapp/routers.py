@@ -0,0 +1,50 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Alias reads should go to for the current request; None means "primary".
+# Set per request by ReplicaRoutingMiddleware.
+_read_alias = ContextVar("read_alias", default=None)
+
+
+# ---------------- PRIMARY / REPLICA ROUTER ----------------
+class PrimaryReplicaRouter:
+    """
+    Writes always go to ``default``. Reads go to whichever alias the
+    middleware picked for the request (a replica for safe-method requests
+    from clients that have not written recently), otherwise ``default``.
+    Management commands and background threads never touch replicas.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "django_cache":
+            return "default"  # the DatabaseCache table: pins and report versions must be current
+        return _read_alias.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_primary():
+    """Force reads in the block to the primary (e.g. read-after-write inside a GET)."""
+    return read_from(None)
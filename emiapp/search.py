@@ -0,0 +1,181 @@
+"""
+Customer search for the dealer app (CustomerViewSet.search).
+
+- Mobile / IMEI / loan account numbers are prefix-matched as index range
+  scans (``col >= 'q' AND col < 'r'``) on the (user, col) composite indexes.
+  Unlike LIKE 'q%', a range works with the default indexes on both SQLite
+  and Postgres.
+- Names are token-searched: SQLite uses an FTS5 external-content table kept
+  in sync by triggers, Postgres a pg_trgm GIN index.
+
+Exact identifier hits rank first, then identifier prefixes, then names. On
+SQLite names are ranked by how many query tokens match a whole word, newest
+first (FTS5's bm25 has to count every row holding the dealer's user_id token
+to compute IDF, which alone costs more than the rest of the search); on
+Postgres by trigram word similarity.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import connections
+
+from .models import Customer
+
+NUMERIC_FIELDS = ("mobile", "alternate_mobile", "imei_1", "imei_2")
+IDENTIFIER_FIELDS = NUMERIC_FIELDS + ("loan_account_no",)
+NAME_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "emiapp_customer_fts"
+FTS_TRIGGERS = ("emiapp_customer_fts_ai", "emiapp_customer_fts_ad", "emiapp_customer_fts_au")
+TRGM_INDEX = "customer_name_trgm_idx"
+
+
+# ---------------- INDEX SETUP ----------------
+def install(connection):
+    """
+    Create the backend's name index. Idempotent: it also runs after every
+    migrate, because SQLite table rebuilds (AlterField etc.) drop triggers.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'emiapp_customer'")
+            missing = set(FTS_TRIGGERS) - {row[0] for row in cursor.fetchall()}
+            if not missing:
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "name, user_id, content='emiapp_customer', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS emiapp_customer_fts_ai AFTER INSERT ON emiapp_customer BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, name, user_id) VALUES (new.id, new.name, new.user_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS emiapp_customer_fts_ad AFTER DELETE ON emiapp_customer BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, user_id) "
+                f"VALUES ('delete', old.id, old.name, old.user_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS emiapp_customer_fts_au AFTER UPDATE OF name, user_id ON emiapp_customer BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, user_id) "
+                f"VALUES ('delete', old.id, old.name, old.user_id); "
+                f"INSERT INTO {FTS_TABLE}(rowid, name, user_id) VALUES (new.id, new.name, new.user_id); END"
+            )
+            # rows written while the triggers were missing
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON emiapp_customer USING gin (name gin_trgm_ops)")
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for trigger in FTS_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"DROP INDEX IF EXISTS {TRGM_INDEX}")
+
+
+def install_after_migrate(sender, using, apps=None, **kwargs):
+    # post_migrate handler; skipped while migrated back past 0041_customer_search.
+    # flush sends it without a migration state: the installed models are current
+    try:
+        customer = (apps or global_apps).get_model("emiapp", "Customer")
+    except LookupError:
+        return
+    if any(index.name == "customer_user_mobile_idx" for index in customer._meta.indexes):
+        install(connections[using])
+
+
+# ---------------- QUERIES ----------------
+def _prefix_upper_bound(prefix):
+    # smallest string greater than every string starting with ``prefix``
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _identifier_matches(customers, term, limit):
+    """(rank, id) pairs: 0 = exact match, 1 = prefix match."""
+    variants = {term, term.upper()}
+    # mobiles and IMEIs are all digits; only loan numbers can contain letters
+    fields = IDENTIFIER_FIELDS if term.isdigit() else ("loan_account_no",)
+    hits = []
+    for field in fields:
+        for value in variants:
+            rows = (
+                customers.filter(**{f"{field}__gte": value, f"{field}__lt": _prefix_upper_bound(value)})
+                .order_by(field)
+                .values_list("id", field)[:limit]
+            )
+            hits.extend((0 if matched == value else 1, pk) for pk, matched in rows)
+    return hits
+
+
+def _name_matches(customers, user, tokens, limit):
+    connection = connections[customers.db]
+    if connection.vendor == "sqlite":
+        # every token as a prefix, restricted to the dealer's rows inside the FTS index
+        query = 'name:(%s) AND user_id:"%d"' % (" ".join(f'"{t}"*' for t in tokens), user.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s",
+                [query, limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        names = dict(customers.filter(id__in=ids).values_list("id", "name"))
+        wanted = {token.casefold() for token in tokens}
+
+        def whole_words(pk):
+            return len(wanted & {word.casefold() for word in NAME_TOKEN_RE.findall(names.get(pk, ""))})
+        return sorted(ids, key=whole_words, reverse=True)  # stable: newest first within a score
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models import F, Value
+
+        phrase = " ".join(tokens)
+        return list(
+            customers.filter(TrigramWordSimilar(F("name"), Value(phrase)))  # name %> phrase, uses the GIN index
+            .annotate(similarity=TrigramWordSimilarity(phrase, "name"))
+            .order_by("-similarity", "-id")
+            .values_list("id", flat=True)[:limit]
+        )
+
+    # other backends: unindexed fallback
+    queryset = customers
+    for token in tokens:
+        queryset = queryset.filter(name__icontains=token)
+    return list(queryset.order_by("-id").values_list("id", flat=True)[:limit])
+
+
+def search_customers(user, q, using=None):
+    """Ranked ids of ``user``'s customers matching ``q`` (at most SEARCH_MAX_RESULTS)."""
+    q = q.strip()
+    limit = settings.SEARCH_MAX_RESULTS
+    if len(q) < settings.SEARCH_MIN_LENGTH:
+        return []
+
+    customers = Customer.objects.filter(user=user)
+    if using:
+        customers = customers.using(using)
+
+    ranked = []
+    term = re.sub(r"[\s\-]", "", q).lstrip("+")  # "+91 98765-43210" -> "919876543210"
+    if term.isalnum():
+        ranked.extend(sorted(_identifier_matches(customers, term, limit), key=lambda hit: hit[0]))
+
+    tokens = NAME_TOKEN_RE.findall(q)
+    if tokens and not term.isdigit():
+        ranked.extend((2, pk) for pk in _name_matches(customers, user, tokens, limit))
+
+    ids = []
+    seen = set()
+    for _, pk in ranked:
+        if pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+    return ids[:limit]
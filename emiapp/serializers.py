@@ -1,7 +1,10 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Customer, EMI, Payment, UserProfile, Device, BalanceKey, FCM , Tutorial, MDMConfig , Policy, ServiceRequest
-from .models import AppVersion
+from .models import AppVersion, AuditEvent
+from .calculator import fill_plan
 
 # ---------------- SIGNUP & LOGIN ----------------
 class SignUpSerializer(serializers.ModelSerializer):
@@ -58,23 +61,62 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "qr_image",
         )
 
+    def validate_profile_image(self, value):
+        return self._validate_image_size(value)
+
+    def validate_qr_image(self, value):
+        return self._validate_image_size(value)
+
+    @staticmethod
+    def _validate_image_size(value):
+        if value and value.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"Image must be smaller than {settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+            )
+        return value
+
+    def to_representation(self, instance):
+        # 🖼 Return the processed WebP variant (?image_size=sm|md|lg) plus all variant URLs
+        data = super().to_representation(instance)
+        request = self.context.get("request")
+        size = request.query_params.get("image_size") if request else None
+        if size not in settings.IMAGE_VARIANT_SIZES:
+            size = settings.IMAGE_DEFAULT_VARIANT
+
+        for field in UserProfile.IMAGE_FIELDS:
+            urls = {}
+            for name, path in (getattr(instance, f"{field}_variants") or {}).items():
+                url = default_storage.url(path)
+                urls[name] = request.build_absolute_uri(url) if request else url
+            data[f"{field}_variants"] = urls
+            if size in urls:
+                data[field] = urls[size]
+        return data
+
 # ---------------- DEVICE SERIALIZER ----------------
 class DeviceSerializer(serializers.ModelSerializer):
-    customer_name = serializers.CharField(source="customer.name", read_only=True)
-    user_name = serializers.CharField(source="user.username", read_only=True)
+    customer_name = serializers.CharField(source="customer.name", read_only=True, default=None)
 
     class Meta:
         model = Device
+        # no device_token: it is the phone's credential, not fleet data
         fields = [
             "id",
-            "user_name",
-            "customer_name",
             "imei",
+            "customer",
+            "customer_name",
             "is_locked",
+            "applied_lock_state",
+            "last_action",
+            "last_updated",
+            "last_seen",
             "registered_at",
-            "device_token",
+            "battery_level",
+            "app_version",
+            "desired_version",
+            "applied_version",
         ]
-        read_only_fields = ["id", "registered_at", "user_name", "customer_name"]
+        read_only_fields = fields
 
 # ---------------- BALANCE KEY SERIALIZER ----------------
 
@@ -108,6 +150,10 @@ class EMISerializer(serializers.ModelSerializer):
 
 # ---------------- CUSTOMER SERIALIZER ----------------
 class CustomerSerializer(serializers.ModelSerializer):
+    # 🧮 optional: send the price (and rate) instead of typing emi_per_month / total_emi_amount
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, write_only=True, required=False)
+    interest_rate = serializers.DecimalField(max_digits=5, decimal_places=2, write_only=True, required=False)
+
     class Meta:
         model = Customer
         fields = [
@@ -129,9 +175,15 @@ class CustomerSerializer(serializers.ModelSerializer):
             'next_payment_date',
             'dealer_contact',
             'paid_down_payment',
+            'version',
+            'price',
+            'interest_rate',
         ]
         read_only_fields = ["id", "created_at"]
 
+    def validate(self, attrs):
+        return fill_plan(attrs, self.instance)
+
 # ---------------- TUTORIAL SERIALIZER ----------------
 class TutorialSerializer(serializers.ModelSerializer):
     class Meta:
@@ -181,4 +233,11 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
 class AppVersionSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppVersion
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+# ---------------- AUDIT EVENT SERIALIZER ----------------
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ["id", "action", "actor", "device", "customer", "imei", "data", "created_at"]
@@ -0,0 +1,32 @@
+"""
+SQLite tuned for several workers sharing one database file.
+
+With the default rollback journal a reader holds the file lock for its
+whole query, a writer has to wait for every reader to finish before it can
+commit, and a transaction that reads before it writes cannot upgrade its
+lock while another one is pending: "database is locked". In this mode
+(SQLITE_CONCURRENT, on by default):
+
+- every new connection gets SQLITE_PRAGMAS via ``connection_created``: WAL
+  (readers and the writer stop blocking each other), a busy_timeout so a
+  writer queues for the lock instead of failing, synchronous=NORMAL (fsync
+  at checkpoints only; with WAL a power cut can lose the last commits but
+  never corrupt the file) and a larger page cache + mmap for reads;
+- transactions begin IMMEDIATE (the DATABASES OPTIONS, see settings.py):
+  an atomic() block takes the write lock up front, where busy_timeout
+  applies, instead of failing halfway when a read turns into a write.
+
+There is still one writer at a time; this mode makes writers wait their
+turn rather than error. benchmarks/bench_sqlite.py has the numbers.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    # connection_created handler
+    if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        # busy_timeout first: switching to WAL needs a moment of exclusive access
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -1,3 +1,720 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from . import payments
+from .audit import AuditBuffer
+from .posting import post_emi
+from .calculator import fill_plan
+from .heartbeat import HeartbeatBuffer
+from .middleware import PIN_HEADER, ReplicaRoutingMiddleware
+from .models import EMI, AuditEvent, BalanceKey, Customer, Device, Payment, PaymentEvent, Tombstone
+from .routers import _read_alias
+from .utils import generate_code, unlock_code_params
+from .versioning import VersionConflict, retry_on_conflict
 
 # Create your tests here.
+
+
+# ---------------- IMPORT COST ----------------
+BOOT = """
+import json, os, resource, sys
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emibackend.settings")
+import django
+django.setup()
+import emibackend.urls
+try:
+    # peak RSS of this image only: on Linux ru_maxrss keeps the forking test runner's peak
+    with open("/proc/self/status") as status:
+        rss_kb = int(next(line for line in status if line.startswith("VmHWM:")).split()[1])
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "modules": sorted(sys.modules),
+    "rss_mb": rss_kb / 1024,
+}))
+"""
+
+
+class ImportCostTests(SimpleTestCase):
+    """
+    Worker boot cost: what ``django.setup(); import emibackend.urls`` drags in.
+    Heavy dependencies must be imported on first use, not at module level
+    (see benchmarks/bench_import.py for the numbers behind the budgets).
+    """
+    HEAVY_MODULES = ("firebase_admin", "google.cloud", "grpc", "qrcode", "PIL", "numpy")
+    # -X importtime of our own modules, including whatever they import first
+    PROJECT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 50))
+    RSS_BUDGET_MB = float(os.environ.get("IMPORT_RSS_BUDGET_MB", 70))
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        cls.boot = json.loads(proc.stdout)
+        cls.importtime = proc.stderr
+
+    def project_import_ms(self):
+        """Cumulative -X importtime (ms) of the outermost emiapp imports."""
+        total, depth = 0, None
+        # importtime lists children before their parent, so walk it bottom-up
+        for line in reversed(self.importtime.splitlines()):
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            indent = len(name) - len(name.lstrip())
+            if depth is not None and indent > depth:
+                continue  # nested inside a project module already counted
+            depth = None
+            if name.strip().split(".")[0] == "emiapp":
+                total += int(cumulative)
+                depth = indent
+        return total / 1000
+
+    def test_heavy_modules_are_imported_lazily(self):
+        loaded = set(self.boot["modules"])
+        eager = [m for m in self.HEAVY_MODULES if m in loaded]
+        self.assertEqual(eager, [], f"imported at boot: {', '.join(eager)}")
+
+    def test_project_import_time_budget(self):
+        elapsed = self.project_import_ms()
+        self.assertLess(elapsed, self.PROJECT_BUDGET_MS,
+                        f"project modules took {elapsed:.1f} ms to import (budget {self.PROJECT_BUDGET_MS} ms)")
+
+    def test_boot_memory_budget(self):
+        self.assertLess(self.boot["rss_mb"], self.RSS_BUDGET_MB,
+                        f"boot RSS {self.boot['rss_mb']:.1f} MB (budget {self.RSS_BUDGET_MB} MB)")
+
+
+# ---------------- PAYMENT CALLBACKS ----------------
+@override_settings(PAYMENT_WEBHOOK_SECRETS={"upi": "test-secret"})
+class PaymentCallbackTests(TestCase):
+    """Webhook staging and apply_pending (emiapp/payments.py, emiapp/posting.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dealer = User.objects.create_user("dealer", password="x")
+        cls.customer = Customer.objects.create(
+            user=cls.dealer, name="Payer", mobile="9000000001", emi_per_month=Decimal("500.00"),
+            total_months=6, remaining_months=6, next_payment_date=date(2030, 1, 1),
+        )
+        cls.emi = EMI.objects.create(customer=cls.customer, total_amount=Decimal("3000.00"), next_due_date=date(2030, 1, 1))
+
+    def setUp(self):
+        # audit writes are queued for a background flush that would outlive the test database
+        patcher = mock.patch("emiapp.payments.audit.record")
+        self.record = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def callback(self, transaction_id, amount, reference=None, status="captured", secret="test-secret"):
+        body = json.dumps({
+            "transaction_id": transaction_id, "reference": reference or str(self.customer.pk),
+            "amount": str(amount), "status": status,
+        }).encode()
+        signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return APIClient().post(
+            "/api/v1/payments/webhook/upi/", body, content_type="application/json",
+            HTTP_X_WEBHOOK_SIGNATURE=signature,
+        )
+
+    def apply(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            payments.apply_pending()
+        self.customer.refresh_from_db()
+        self.emi.refresh_from_db()
+
+    def test_replayed_callback_is_applied_once(self):
+        for _ in range(3):
+            self.assertEqual(self.callback("txn_1", 500).status_code, 200)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.apply()
+        self.apply()
+        self.assertEqual(self.customer.paid_months, 1)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(PaymentEvent.objects.get().state, PaymentEvent.APPLIED)
+
+    def test_invalid_callbacks_are_not_staged(self):
+        self.assertEqual(self.callback("txn_1", 500, secret="wrong").status_code, 401)
+        for reference in ("²", "9" * 30, "12a"):
+            self.assertEqual(self.callback("txn_1", 500, reference=reference).status_code, 400, reference)
+        self.assertEqual(self.callback("txn_1", "NaN").status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_plan_moves_on_by_whole_installments(self):
+        self.callback("txn_1", 1500)  # three months prepaid
+        self.apply()
+        self.assertEqual((self.customer.paid_months, self.customer.remaining_months), (3, 3))
+        self.assertEqual(self.customer.next_payment_date, date(2030, 1, 1) + timedelta(days=90))
+        self.assertEqual(PaymentEvent.objects.get(transaction_id="txn_1").installments, 3)
+
+        self.callback("txn_2", 1)  # partial: credited, the plan stays put
+        self.apply()
+        self.assertEqual(self.customer.paid_months, 3)
+        self.assertEqual(self.emi.paid_amount, Decimal("1501.00"))
+        event = PaymentEvent.objects.get(transaction_id="txn_2")
+        self.assertEqual((event.state, event.installments), (PaymentEvent.APPLIED, 0))
+
+        self.callback("txn_3", 499)  # completes the installment the partial started
+        self.apply()
+        self.assertEqual(self.customer.paid_months, 4)
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_unpostable_callbacks_are_rejected(self):
+        self.callback("txn_1", 100, reference="999999")
+        self.callback("txn_2", 100, status="failed")
+        Customer.objects.filter(pk=self.customer.pk).update(paid_months=6)
+        self.callback("txn_3", 500)
+        self.apply()
+        states = dict(PaymentEvent.objects.values_list("transaction_id", "state"))
+        self.assertEqual(states, {
+            "txn_1": PaymentEvent.REJECTED, "txn_2": PaymentEvent.IGNORED, "txn_3": PaymentEvent.REJECTED,
+        })
+        self.assertFalse(Payment.objects.exists())
+
+    def test_failing_event_does_not_block_the_batch(self):
+        self.callback("txn_1", 500)
+        self.callback("txn_2", 500)
+        post_emi, calls = payments.post_emi, []
+
+        def flaky(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return post_emi(*args, **kwargs)
+
+        with mock.patch.object(payments, "post_emi", side_effect=flaky), self.assertLogs("emiapp.payments", "ERROR"):
+            self.apply()
+        failed, applied = PaymentEvent.objects.order_by("id")
+        self.assertEqual((failed.state, failed.error), (PaymentEvent.REJECTED, "RuntimeError: boom"))
+        self.assertEqual(applied.state, PaymentEvent.APPLIED)
+        self.assertEqual(self.customer.paid_months, 1)
+
+    def test_applied_callback_is_audited(self):
+        self.callback("txn_1", 1000)
+        self.apply()
+        self.record.assert_called_once()
+        action, kwargs = self.record.call_args.args[0], self.record.call_args.kwargs
+        self.assertEqual(action, "emi_posted")
+        self.assertEqual(kwargs["customer"].pk, self.customer.pk)
+        self.assertEqual((kwargs["user"], kwargs["actor"]), (self.dealer.pk, "webhook:upi"))
+        self.assertEqual((kwargs["amount"], kwargs["paid_months"], kwargs["transaction_id"]), ("1000.00", 2, "txn_1"))
+
+
+# ---------------- DEVICE FLEET ----------------
+class DeviceFleetFilterTests(TestCase):
+    """?last_seen_before= on /devices/ and /devices/summary/ (emiapp/fleet.py)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("dealer", password="x"))
+
+    def test_impossible_moments_are_rejected(self):
+        for value in ("2024-02-30", "2024-01-01T25:00", "2024-13-01 10:00", "yesterday"):
+            for url in ("/api/v1/devices/", "/api/v1/devices/summary/"):
+                response = self.client.get(url, {"last_seen_before": value})
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertIn("last_seen_before", response.json())
+
+    def test_valid_moments_are_accepted(self):
+        for value in ("2024-02-29", "2024-02-29T23:59:59+05:30"):
+            for url in ("/api/v1/devices/", "/api/v1/devices/summary/"):
+                self.assertEqual(self.client.get(url, {"last_seen_before": value}).status_code, 200, (url, value))
+
+
+# ---------------- FIELDS / EXPAND ----------------
+class FieldSelectionTests(TestCase):
+    """?fields= / ?expand= on the fast list endpoints (emiapp/fastserializers.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plans = {}
+        for name in ("a", "b"):
+            dealer = User.objects.create_user(f"dealer_{name}", password="x", is_staff=True)  # as SignUpSerializer
+            customer = Customer.objects.create(
+                user=dealer, name=f"Customer {name}", mobile=f"90000000{ord(name)}", email=f"{name}@example.com",
+                imei_1=f"35000000000000{ord(name)}", loan_account_no=f"LN-{name}", emi_per_month=Decimal("500.00"),
+                total_months=6,
+            )
+            Device.objects.create(user=dealer, customer=customer, imei=customer.imei_1)
+            emi = EMI.objects.create(customer=customer, total_amount=Decimal("3000.00"), next_due_date=date(2030, 1, 1))
+            Payment.objects.create(emi=emi, amount=Decimal("500.00"))
+            cls.plans[name] = (dealer, customer, emi)
+
+    def get(self, url, dealer="a", **params):
+        client = APIClient()
+        client.force_authenticate(self.plans[dealer][0])
+        return client.get(url, params)
+
+    def by_id(self, response, key="id"):
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row[key]: row for row in response.json()}
+
+    def test_fields_narrow_the_rows(self):
+        rows = self.get("/api/v1/customers/", fields="id,mobile").json()
+        self.assertEqual(rows, [{"id": self.plans["a"][1].pk, "mobile": self.plans["a"][1].mobile}])
+
+    def test_unknown_names_are_rejected(self):
+        for params in ({"fields": "id,password"}, {"expand": "user"}, {"fields": "emi.customer.user"},
+                       {"expand": "emi.device"}):
+            response = self.get("/api/v1/payments/", **params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_expansion_is_nested(self):
+        rows = self.get("/api/v1/customers/", expand="device", fields="id,device.imei").json()
+        self.assertEqual(rows[0]["device"], {"imei": self.plans["a"][1].imei_1})
+
+    def test_two_level_fields_are_expanded(self):
+        _, customer, emi = self.plans["a"]
+        for params in ({"fields": "id,emi.customer.mobile"}, {"fields": "id,emi.id", "expand": "emi.customer"}):
+            row = self.by_id(self.get("/api/v1/payments/", **params))[emi.payments.get().pk]
+            self.assertEqual(row["emi"]["customer"]["mobile"], customer.mobile, params)
+
+    def test_expansions_stay_within_the_dealer(self):
+        # a staff dealer's /emis/ and /payments/ span dealers; the nested rows must not
+        _, other, other_emi = self.plans["b"]
+        emis = self.by_id(self.get("/api/v1/emis/", expand="customer"))
+        self.assertEqual(emis[self.plans["a"][2].pk]["customer"]["mobile"], self.plans["a"][1].mobile)
+        self.assertIsNone(emis[other_emi.pk]["customer"])
+        payments = self.by_id(self.get("/api/v1/payments/", fields="id,emi.customer.mobile"))
+        self.assertIsNone(payments[other_emi.payments.get().pk]["emi"])
+        body = self.get("/api/v1/emis/", expand="customer").content.decode()
+        for value in (other.mobile, other.email, other.imei_1, other.loan_account_no):
+            self.assertNotIn(value, body)
+
+
+# ---------------- READ REPLICA ROUTING ----------------
+@override_settings(DATABASE_REPLICAS=["replica_0"], REPLICA_STICKY_SECONDS=5)
+class ReplicaPinTests(SimpleTestCase):
+    """Read-your-writes pins (emiapp/middleware.py): carried by the client (a SimpleTestCase allows no query)."""
+
+    def route(self, method="get", pin_to_primary=True, token=None, authorization="Bearer a"):
+        seen = {}
+
+        def view(request):
+            seen["alias"] = _read_alias.get()
+            if not pin_to_primary:
+                request.pin_to_primary = False
+            return HttpResponse()
+
+        headers = {"HTTP_AUTHORIZATION": authorization}
+        if token:
+            headers["HTTP_X_DB_PIN"] = token
+        request = getattr(RequestFactory(), method)("/api/v1/customers/", **headers)
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen["alias"], response
+
+    def test_write_pins_the_client_to_the_primary(self):
+        self.assertEqual(self.route()[0], "replica_0")
+        alias, response = self.route("post")
+        self.assertIsNone(alias)
+        token = response[PIN_HEADER]
+        self.assertEqual(response.cookies["db_pin"].value, token)
+        self.assertIsNone(self.route(token=token)[0])
+        # bound to the client that wrote
+        self.assertEqual(self.route(token=token, authorization="Bearer b")[0], "replica_0")
+        self.assertEqual(self.route(token=token + "x")[0], "replica_0")
+
+    def test_pin_expires(self):
+        token = self.route("post")[1][PIN_HEADER]
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + 6):
+            self.assertEqual(self.route(token=token)[0], "replica_0")
+
+    def test_views_that_do_not_write_leave_the_client_unpinned(self):
+        response = self.route("post", pin_to_primary=False)[1]
+        self.assertFalse(response.has_header(PIN_HEADER))
+        self.assertNotIn("db_pin", response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"], PAYMENT_WEBHOOK_SECRETS={"upi": "test-secret"})
+class UnpinnedEndpointTests(TestCase):
+    """Heartbeats are buffered and webhooks staged: neither pins the caller."""
+
+    def test_heartbeat_and_webhook_do_not_pin(self):
+        dealer = User.objects.create_user("dealer", password="x")
+        device = Device.objects.create(user=dealer, imei="350000000000001")
+        with mock.patch("emiapp.views.record_heartbeat"):  # the buffer would flush after the test database is gone
+            response = APIClient().post(
+                "/api/v1/device/heartbeat/", {"battery_level": 50}, format="json",
+                HTTP_AUTHORIZATION=f"Device {device.device_token}",
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(response.has_header(PIN_HEADER))
+
+        response = APIClient().post("/api/v1/payments/webhook/upi/", b"{}", content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.has_header(PIN_HEADER))
+
+
+# ---------------- CALCULATOR ----------------
+class PlanFromPriceTests(TestCase):
+    """Customer plans derived from ``price`` (emiapp/calculator.py fill_plan)."""
+
+    def test_derived_amounts_must_fit_the_columns(self):
+        # max_digits=10, decimal_places=2: 99999999.99 is the largest amount a plan can hold
+        plan = fill_plan({"price": Decimal("99999999.99"), "interest_rate": Decimal(0), "total_months": 1})
+        self.assertEqual(plan["total_emi_amount"], Decimal("99999999.99"))
+        with self.assertRaises(ValidationError) as raised:
+            fill_plan({"price": Decimal("99999999.99"), "interest_rate": Decimal("0.01"), "total_months": 1})
+        self.assertIn("price", raised.exception.detail)
+
+    def test_overflowing_plan_is_rejected_before_saving(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("dealer", password="x"))
+        response = client.post("/api/v1/customers/", {
+            "name": "Big ticket", "mobile": "9000000001", "price": "99999999.99", "interest_rate": "60",
+            "total_months": 120,
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("price", response.json())
+        self.assertFalse(Customer.objects.exists())
+
+
+# ---------------- OFFLINE UNLOCK CODES ----------------
+class UnlockCodeTests(TestCase):
+    """TOTP unlock codes (emiapp/utils.py) and who gets the device secret."""
+
+    RFC_SECRET = "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ"  # RFC 6238 test key "12345678901234567890"
+
+    @override_settings(UNLOCK_CODE_INTERVAL=30, UNLOCK_CODE_DIGITS=8)
+    def test_codes_follow_rfc_6238(self):
+        for at, code in ((59, "94287082"), (1111111109, "07081804"), (1234567890, "89005924")):
+            self.assertEqual(generate_code(self.RFC_SECRET, at=at), code)
+
+    @override_settings(UNLOCK_CODE_INTERVAL=900, UNLOCK_CODE_DRIFT=1)
+    def test_window_is_the_current_step_plus_minus_drift(self):
+        step, drift = unlock_code_params()["interval"], unlock_code_params()["drift"]
+        self.assertEqual((step, drift), (900, 1))
+        start = 1_800_000_000 - 1_800_000_000 % step
+        codes = {k: generate_code(self.RFC_SECRET, at=start + k * step) for k in range(-2, 3)}
+        self.assertEqual(len(set(codes.values())), 5)
+        # one code for the whole window
+        self.assertEqual(generate_code(self.RFC_SECRET, at=start + step - 1), codes[0])
+
+        def accepted(code, clock):  # what the device does with unlock_code_params()
+            return any(generate_code(self.RFC_SECRET, at=clock + k * step) == code for k in range(-drift, drift + 1))
+
+        clock = start + step // 2
+        for k in (-1, 0, 1):
+            self.assertTrue(accepted(codes[k], clock), k)
+        for k in (-2, 2):
+            self.assertFalse(accepted(codes[k], clock), k)
+
+    def test_secret_only_at_registration_and_from_the_admin_endpoint(self):
+        dealer = User.objects.create_user("dealer", password="x", is_staff=True)
+        imei = "350000000000001"
+        customer = Customer.objects.create(user=dealer, name="Payer", mobile="9000000001", imei_1=imei)
+        key = BalanceKey.objects.create(admin_user=dealer, qr_image="balance_qr/test.png")  # no QR file rendered
+
+        with mock.patch("emiapp.audit.record"), mock.patch("emiapp.lockstate.request_push"):
+            registered = APIClient().post("/api/v1/device/register/", {"key": str(key.key), "imei": imei},
+                                          format="json")
+            self.assertEqual(registered.status_code, 201)
+            secret = Device.objects.get(imei=imei).unlock_secret
+            self.assertEqual(registered.json()["unlock_secret"], secret)
+
+            dealer_app = APIClient()
+            dealer_app.force_authenticate(dealer)
+            phone = APIClient(HTTP_AUTHORIZATION=f"Device {registered.json()['device_token']}")
+            responses = {
+                "lock": dealer_app.post("/api/v1/device/lock/", {"imei": imei}, format="json"),
+                "devices": dealer_app.get("/api/v1/devices/"),
+                "customers": dealer_app.get("/api/v1/customers/", {"expand": "device"}),
+                "sync": dealer_app.get("/api/v1/sync/"),
+                "device code": phone.get(f"/api/v1/device/{imei}/unlock-code/"),
+                "device state": phone.get("/api/v1/device/state/"),
+                "device customer": phone.get("/api/v1/device/customer/"),
+            }
+            admin = dealer_app.get(f"/api/v1/admin/device/{imei}/unlock-code/")
+
+        self.assertEqual(admin.json()["unlock_secret"], secret)
+        self.assertEqual(admin.json()["unlock_code"], generate_code(secret))
+        self.assertEqual(responses["device code"].json()["unlock_code"], generate_code(secret))
+        for name, response in responses.items():
+            self.assertEqual(response.status_code, 200, name)
+            self.assertNotIn(secret, response.content.decode(), name)
+        self.assertEqual(customer.pk, responses["customers"].json()[0]["id"])
+
+
+# ---------------- OPTIMISTIC CONCURRENCY ----------------
+class VersionConflictTests(TestCase):
+    """If-Match / ETag and retry_on_conflict (emiapp/versioning.py, emiapp/posting.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dealer = User.objects.create_user("dealer", password="x", is_staff=True)
+        cls.customer = Customer.objects.create(
+            user=cls.dealer, name="Payer", mobile="9000000001", emi_per_month=Decimal("500.00"),
+            total_months=6, remaining_months=6, next_payment_date=date(2030, 1, 1),
+        )
+        cls.emi = EMI.objects.create(customer=cls.customer, total_amount=Decimal("3000.00"), next_due_date=date(2030, 1, 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.dealer)
+        self.customer.refresh_from_db()
+
+    def test_stale_if_match_is_refused(self):
+        url = f"/api/v1/customers/{self.customer.pk}/"
+        current = self.client.get(url)["ETag"]
+        self.assertEqual(current, f'"{self.customer.version}"')
+        for stale in (f'"{self.customer.version + 1}"', f"W/{current}"):  # weak tags never match
+            response = self.client.patch(url, {"name": "Renamed"}, format="json", HTTP_IF_MATCH=stale)
+            self.assertEqual(response.status_code, 412, stale)
+        response = self.client.post(f"/api/v1/update-emi/{self.customer.pk}/", HTTP_IF_MATCH='"99"')
+        self.assertEqual(response.status_code, 412)
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.name, self.customer.paid_months), ("Payer", 0))
+
+        response = self.client.patch(url, {"name": "Renamed"}, format="json", HTTP_IF_MATCH=current)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"{self.customer.version + 1}"')
+
+    def test_retries_run_out(self):
+        attempts = []
+
+        def always_conflicts():
+            attempts.append(Customer.objects.filter(pk=self.customer.pk).update(name=f"attempt {len(attempts)}"))
+            raise VersionConflict()
+
+        with mock.patch("emiapp.versioning.time.sleep"), self.assertRaises(VersionConflict):
+            retry_on_conflict(always_conflicts)
+        self.assertEqual(len(attempts), settings.VERSION_CONFLICT_RETRIES)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.name, "Payer")  # every attempt rolled back
+
+        with mock.patch("emiapp.versioning.time.sleep"), mock.patch("emiapp.posting.claim", side_effect=VersionConflict):
+            response = self.client.post(f"/api/v1/update-emi/{self.customer.pk}/")
+        self.assertEqual(response.status_code, 409)
+        with mock.patch("emiapp.versioning.time.sleep"), mock.patch("emiapp.views.claim", side_effect=VersionConflict):
+            response = self.client.patch(f"/api/v1/customers/{self.customer.pk}/", {"name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+    def race(self):
+        """post_emi as caller A, who read the customer just before caller B posted and committed."""
+        stale = Customer.objects.get(pk=self.customer.pk)
+        post_emi(self.customer.pk, self.dealer)  # B
+        get, reads = Customer.objects.get, []
+
+        def read(*args, **kwargs):
+            reads.append(kwargs)
+            return stale if len(reads) == 1 else get(*args, **kwargs)
+
+        with mock.patch.object(Customer.objects, "get", side_effect=read):
+            post_emi(self.customer.pk, self.dealer)
+        return len(reads)
+
+    def test_racing_posts_each_post_once(self):
+        self.assertEqual(self.race(), 2)  # A lost the claim, then posted from a fresh read
+        self.customer.refresh_from_db()
+        self.emi.refresh_from_db()
+        self.assertEqual(self.customer.paid_months, 2)
+        self.assertEqual(self.emi.paid_amount, Decimal("1000.00"))
+        self.assertEqual(Payment.objects.filter(emi=self.emi).count(), 2)
+
+    @override_settings(VERSION_CONFLICT_RETRIES=1)
+    def test_losing_post_writes_nothing(self):
+        with self.assertRaises(VersionConflict):
+            self.race()
+        self.customer.refresh_from_db()
+        self.emi.refresh_from_db()
+        self.assertEqual((self.customer.paid_months, self.emi.paid_amount), (1, Decimal("500.00")))
+        self.assertEqual(Payment.objects.filter(emi=self.emi).count(), 1)
+
+
+# ---------------- DELTA SYNC ----------------
+@override_settings(SYNC_SETTLE_SECONDS=10)
+class DeltaSyncTests(TestCase):
+    """GET /sync/ cursors, the settle window and tombstones (emiapp/views_sync.py)."""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.dealer = User.objects.create_user("dealer", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.dealer)
+
+    def customer(self, name, updated_at, user=None):
+        customer = Customer.objects.create(user=user or self.dealer, name=name, mobile=f"9{Customer.objects.count():09}")
+        Customer.objects.filter(pk=customer.pk).update(updated_at=updated_at)  # update() leaves auto_now alone
+        return customer
+
+    def sync(self, at, since=None):
+        with mock.patch("django.utils.timezone.now", return_value=at):
+            response = self.client.get("/api/v1/sync/", {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def names(self, data):
+        return [row["name"] for row in data["customers"]]
+
+    def test_rows_inside_the_settle_window_are_held_back_not_skipped(self):
+        t = self.now
+        self.customer("settled", t - timedelta(seconds=60))
+        self.customer("fresh", t - timedelta(seconds=3))
+        first = self.sync(t)
+        self.assertEqual(self.names(first), ["settled"])
+
+        # stamped before the first sync but committed after it (a long transaction)
+        self.customer("late commit", t - timedelta(seconds=8))
+        second = self.sync(t + timedelta(seconds=20), first["cursor"])
+        self.assertEqual(self.names(second), ["late commit", "fresh"])
+        self.assertEqual(self.names(self.sync(t + timedelta(seconds=40), second["cursor"])), [])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_cursor_pages_without_gaps_or_repeats(self):
+        same = self.now - timedelta(seconds=60)  # ties on updated_at are ordered by id
+        for name in ("a", "b", "c", "d", "e"):
+            self.customer(name, same)
+        seen, cursor, more = [], None, True
+        while more:
+            data = self.sync(self.now, cursor)
+            seen += self.names(data)
+            cursor, more = data["cursor"], data["has_more"]
+        self.assertEqual(seen, ["a", "b", "c", "d", "e"])
+
+    def test_deleted_rows_come_back_as_tombstones(self):
+        t = self.now
+        customer = self.customer("gone", t - timedelta(seconds=60))
+        emi = EMI.objects.create(customer=customer, total_amount=Decimal("1000.00"), next_due_date=date(2030, 1, 1))
+        payment = Payment.objects.create(emi=emi, amount=Decimal("100.00"))
+        other = self.customer("other dealer's", t - timedelta(seconds=60), user=User.objects.create_user("other"))
+        EMI.objects.filter(pk=emi.pk).update(updated_at=t - timedelta(seconds=60))
+        Payment.objects.filter(pk=payment.pk).update(updated_at=t - timedelta(seconds=60))
+        first = self.sync(t)
+        self.assertEqual([len(first[name]) for name in ("customers", "emis", "payments")], [1, 1, 1])
+        self.assertEqual(first["deleted"], {})
+
+        deleted = {"customer": [customer.pk], "emi": [emi.pk], "payment": [payment.pk]}
+        customer.delete()  # cascades to the EMI and its payment
+        other.delete()
+        Tombstone.objects.update(deleted_at=t + timedelta(seconds=5))  # the default was bound before the clock mock
+        second = self.sync(t + timedelta(seconds=30), first["cursor"])
+        self.assertEqual(second["deleted"], deleted)  # the other dealer's delete is not theirs to see
+        self.assertEqual([len(second[name]) for name in ("customers", "emis", "payments")], [0, 0, 0])
+        self.assertEqual(self.sync(t + timedelta(seconds=60), second["cursor"])["deleted"], {})
+
+
+# ---------------- WRITE-BEHIND BUFFERS ----------------
+class WriteBehindBufferTests(TestCase):
+    """Heartbeat and audit buffers, flushed by hand (the daemon thread is never started)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dealer = User.objects.create_user("dealer", password="x")
+        cls.devices = [Device.objects.create(user=cls.dealer, imei=f"35000000000000{i}") for i in range(2)]
+
+    def buffer(self, cls):
+        buffer = cls(interval=3600, max_items=10 ** 6)
+        buffer._ensure_thread = lambda: None
+        return buffer
+
+    def test_heartbeats_coalesce_per_device(self):
+        heartbeats, (first, second) = self.buffer(HeartbeatBuffer), self.devices
+        t = timezone.now()
+        heartbeats.add((first.pk, {"last_seen": t, "battery_level": 50}))
+        heartbeats.add((first.pk, {"last_seen": t + timedelta(seconds=5), "app_version": "2.0"}))
+        heartbeats.add((second.pk, {"last_seen": t}))
+        self.assertEqual(len(heartbeats), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(heartbeats.flush(), 2)
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)  # one bulk UPDATE per set of reported columns
+        first.refresh_from_db()
+        self.assertEqual((first.last_seen, first.battery_level, first.app_version),
+                         (t + timedelta(seconds=5), 50, "2.0"))
+        self.assertEqual(len(heartbeats), 0)
+
+    def test_failed_heartbeat_flush_is_requeued_under_newer_reports(self):
+        heartbeats, device = self.buffer(HeartbeatBuffer), self.devices[0]
+        t = timezone.now()
+        heartbeats.add((device.pk, {"last_seen": t, "battery_level": 50, "app_version": "2.0"}))
+        with mock.patch.object(Device.objects, "bulk_update", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("emiapp.buffers", "WARNING"):
+            self.assertEqual(heartbeats.flush(), 0)
+        self.assertEqual(len(heartbeats), 1)
+        heartbeats.add((device.pk, {"last_seen": t + timedelta(seconds=5), "battery_level": 40}))
+        self.assertEqual(heartbeats.flush(), 1)
+        device.refresh_from_db()
+        self.assertEqual((device.last_seen, device.battery_level, device.app_version),
+                         (t + timedelta(seconds=5), 40, "2.0"))
+
+    def test_batch_is_dropped_after_max_retries(self):
+        heartbeats = self.buffer(HeartbeatBuffer)
+        heartbeats.add((self.devices[0].pk, {"last_seen": timezone.now()}))
+        with mock.patch.object(Device.objects, "bulk_update", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("emiapp.buffers", "WARNING") as logs:
+            for _ in range(heartbeats.max_retries + 1):
+                heartbeats.flush()
+        self.assertEqual(len(heartbeats), 0)
+        self.assertIn("dropping 1 items", logs.output[-1])
+        self.assertIsNone(Device.objects.get(pk=self.devices[0].pk).last_seen)
+
+    def event(self, action="device_locked"):
+        return AuditEvent(action=action, user_id=self.dealer.pk, actor="dealer", created_at=timezone.now())
+
+    def test_audit_events_are_written_in_bulk(self):
+        audit = self.buffer(AuditBuffer)
+        for _ in range(3):
+            audit.add(self.event())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(audit.flush(), 3)
+        self.assertEqual(sum(q["sql"].startswith("INSERT") for q in queries.captured_queries), 1)
+        self.assertEqual(AuditEvent.objects.count(), 3)
+
+    def test_poison_audit_event_is_dropped_alone(self):
+        audit = self.buffer(AuditBuffer)
+        for action in ("device_locked", None, "device_unlocked"):  # None: NOT NULL fails on insert
+            audit.add(self.event(action))
+        with self.assertLogs("emiapp.audit", "ERROR"):
+            self.assertEqual(audit.flush(), 3)
+        self.assertEqual(sorted(AuditEvent.objects.values_list("action", flat=True)),
+                         ["device_locked", "device_unlocked"])
+        self.assertEqual(len(audit), 0)
+
+    def test_unwritable_audit_batch_is_requeued_and_retried(self):
+        audit = self.buffer(AuditBuffer)
+        audit.add(self.event())
+        audit.add(self.event("device_unlocked"))
+        with mock.patch.object(AuditEvent.objects, "bulk_create", side_effect=OperationalError("database is locked")), \
+                mock.patch.object(AuditEvent, "save", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("emiapp.buffers", "WARNING"):
+            self.assertEqual(audit.flush(), 0)
+        self.assertEqual(len(audit), 2)
+        audit.add(self.event("emi_posted"))
+        self.assertEqual(audit.flush(), 3)  # the rolled-back events are inserted, not "updated"
+        self.assertEqual(list(AuditEvent.objects.order_by("id").values_list("action", flat=True)),
+                         ["device_locked", "device_unlocked", "emi_posted"])
+
+
+class AuditCommitFailureTests(TransactionTestCase):
+    """SQLite checks foreign keys at COMMIT, after bulk_create has handed out ids: a real transaction is needed."""
+
+    def test_events_rolled_back_at_commit_are_written_row_by_row(self):
+        dealer = User.objects.create_user("dealer", password="x")
+        audit = AuditBuffer(interval=3600, max_items=10 ** 6)
+        audit._ensure_thread = lambda: None
+        for device_id in (None, 999999, None):  # 999999: a device deleted meanwhile
+            audit.add(AuditEvent(action="device_locked", user_id=dealer.pk, device_id=device_id,
+                                 created_at=timezone.now()))
+        with self.assertLogs("emiapp.audit", "ERROR"):
+            self.assertEqual(audit.flush(), 3)
+        self.assertEqual(list(AuditEvent.objects.values_list("device_id", flat=True)), [None, None])
@@ -1,9 +1,13 @@
 from django.urls import path, include
 from rest_framework import routers
 from . import views_balancekey
-from .views import device_customer_data, update_emi_payment
-from .views import update_fcm_token
-from .views import get_unlock_code
+from .views import emi_quote, update_emi_payment
+from .views_sync import sync
+from .views_batch import batch
+from .views_reports import aging_report, collections_report, projection_report
+from .views_payments import payment_webhook
+from .views_device import device_customer_data, device_state, get_unlock_code, register_device, update_fcm_token
+from .views import device_heartbeat
 from django.conf import settings
 from django.conf.urls.static import static
 from .views import admin_get_unlock_code
@@ -15,8 +19,8 @@ from .views import (
     CustomerViewSet,
     EMIViewSet,
     PaymentViewSet,
+    DeviceViewSet,
     UserProfileViewSet,
-    register_device,
     lock_device,
     unlock_device,
     PendingEMIViewSet,
@@ -27,6 +31,7 @@ from .views import (
     PolicyUpdateView,
     ServiceRequestCreateView,
     LatestAppVersionView,
+    AuditEventListView,
 
 )
 
@@ -36,6 +41,7 @@ router.register(r'emis', EMIViewSet)
 router.register(r'payments', PaymentViewSet)
 router.register(r'user-profile', UserProfileViewSet, basename='user-profile')
 router.register(r'pending-emis', PendingEMIViewSet, basename='pending-emis')
+router.register(r'devices', DeviceViewSet, basename='devices')
 
     
 
@@ -48,6 +54,7 @@ urlpatterns = [
     # ✅ Device control APIs (for client app)
     path("device/register/", register_device, name="register-device"),
     path("device/customer/", device_customer_data),
+    path("device/state/", device_state, name="device-state"),
     path("device/lock/", lock_device, name="lock-device"),
     path("device/unlock/", unlock_device, name="unlock-device"),
     path("device/<str:imei>/unlock-code/", get_unlock_code, name="get-unlock-code"),
@@ -55,9 +62,12 @@ urlpatterns = [
     # balance key api
     path("balance-keys/", views_balancekey.BalanceKeyListCreateView.as_view(), name="balance-key-list"),
     path('update-emi/<int:customer_id>/', update_emi_payment, name='update_emi'),
+    path("emi/quote/", emi_quote, name="emi-quote"),
+    path("payments/webhook/<slug:provider>/", payment_webhook, name="payment-webhook"),
     # ✅ All router-based API endpoints (customers, EMI, payments, etc.)
     path('', include(router.urls)),
     path('device/update-fcm-token/', update_fcm_token),
+    path('device/heartbeat/', device_heartbeat, name='device-heartbeat'),
     path("tutorials/", TutorialListView),
     # MDM APIs
     path("mdm/qr/", MDMQRView.as_view()),
@@ -65,6 +75,12 @@ urlpatterns = [
     path("admin/policies/", PolicyUpdateView.as_view()),
     path("service-requests/", ServiceRequestCreateView.as_view(), name="service-request"),
      path("app/version/", LatestAppVersionView.as_view(), name="app-version"),
+    path("audit-events/", AuditEventListView.as_view(), name="audit-events"),
+    path("sync/", sync, name="sync"),
+    path("batch/", batch, name="batch"),
+    path("reports/aging/", aging_report, name="report-aging"),
+    path("reports/collections/", collections_report, name="report-collections"),
+    path("reports/projection/", projection_report, name="report-projection"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,4 +1,75 @@
-import random
+import base64
+import hashlib
+import hmac
+import secrets
+import struct
+import time
+from contextlib import contextmanager
 
-def generate_code():
-    return str(random.randint(100000, 999999))
\ No newline at end of file
+from django.conf import settings
+
+
+# ---------------- OFFLINE UNLOCK CODES (RFC 6238 TOTP) ----------------
+# The device and the dealer app both hold the per-device secret, so either
+# side can derive / verify the current code without calling the server. The
+# server only derives codes (generate_code) and hands out the secret: at
+# registration and from the dealer's admin unlock-code endpoint.
+
+def generate_secret():
+    """Random base32 secret (160 bits, as recommended by RFC 4226)."""
+    return base64.b32encode(secrets.token_bytes(20)).decode("ascii")
+
+
+def _hotp(secret, counter, digits):
+    key = base64.b32decode(secret, casefold=True)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    value = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % (10 ** digits)).zfill(digits)
+
+
+def generate_code(secret, at=None):
+    """Unlock code for the time window containing ``at`` (defaults to now)."""
+    at = time.time() if at is None else at
+    counter = int(at // settings.UNLOCK_CODE_INTERVAL)
+    return _hotp(secret, counter, settings.UNLOCK_CODE_DIGITS)
+
+
+def unlock_code_params():
+    """Parameters the apps need to derive codes offline."""
+    return {
+        "algorithm": "SHA1",
+        "digits": settings.UNLOCK_CODE_DIGITS,
+        "interval": settings.UNLOCK_CODE_INTERVAL,
+        # the device checks codes, not the server: it accepts the current window ± drift
+        "drift": settings.UNLOCK_CODE_DRIFT,
+    }
+
+
+# ---------------- BULK LOADING ----------------
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Make auto_now / auto_now_add keep a value already set on the object, so
+    bulk_create() preserves fixture and back-dated synthetic timestamps
+    instead of stamping the current time. Unset ones are still stamped.
+    """
+    patched = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            auto = getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+            if auto and "pre_save" not in vars(field):  # not already patched by an outer block
+                field.pre_save = _keep_explicit(field, field.pre_save)
+                patched.append(field)
+    try:
+        yield
+    finally:
+        for field in patched:
+            del field.pre_save  # back to the class method
+
+
+def _keep_explicit(field, pre_save):
+    def keep(model_instance, add):
+        value = getattr(model_instance, field.attname)
+        return value if value is not None else pre_save(model_instance, add)
+    return keep
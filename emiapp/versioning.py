@@ -0,0 +1,79 @@
+"""
+Optimistic concurrency for rows with a ``version`` column (Customer, EMI).
+
+Every write bumps the row's version (DirtyFieldsMixin). Instead of locking
+a row for the whole read-modify-write (select_for_update: a no-op on
+SQLite, a lock queue on PostgreSQL), a writer reads freely and then:
+
+- ``claim`` moves the row to the next version only if it is still the one
+  that was read (``UPDATE ... SET version = n + 1 WHERE id = ... AND
+  version = n``) and raises VersionConflict when another writer got there
+  first; the save that follows writes the changed columns.
+- ``retry_on_conflict`` runs the read-claim-save function in a transaction
+  and, when a claim loses, rolls it back and runs it again from a fresh
+  read (jittered backoff, VERSION_CONFLICT_RETRIES attempts).
+- Clients see the version as the ETag and can send it back as If-Match:
+  a stale one gets 412 instead of overwriting a change they never saw.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class VersionConflict(Exception):
+    """The row moved to a newer version after it was read."""
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has changed; fetch it again (If-Match does not match its ETag)."
+    default_code = "precondition_failed"
+
+
+# ---------------- CONDITIONAL WRITES ----------------
+def claim(instance):
+    """Move ``instance``'s row to its next version if nobody else has; the following save() keeps that version."""
+    model = type(instance)
+    read = instance.version
+    if not model._base_manager.using(instance._state.db).filter(pk=instance.pk, version=read).update(version=read + 1):
+        raise VersionConflict(f"{model.__name__} {instance.pk} changed after version {read}")
+    instance.version = read + 1
+
+
+def retry_on_conflict(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` atomically, again from the start on VersionConflict."""
+    attempts = settings.VERSION_CONFLICT_RETRIES
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return fn(*args, **kwargs)
+        except VersionConflict:
+            if attempt == attempts - 1:
+                raise
+            # jitter, so the posters that just collided don't collide again
+            time.sleep(random.uniform(0, settings.VERSION_CONFLICT_BACKOFF * 2 ** attempt))
+
+
+# ---------------- ETAG / IF-MATCH ----------------
+def etag(instance):
+    return f'"{instance.version}"'
+
+
+def if_match(request):
+    """Versions listed in If-Match, or None when the header is absent or "*"."""
+    header = request.headers.get("If-Match", "").strip()
+    if not header or header == "*":
+        return None
+    # strong comparison: W/"n" never matches
+    tags = (tag.strip() for tag in header.split(","))
+    return {int(tag[1:-1]) for tag in tags if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit()}
+
+
+def check_if_match(request, instance):
+    versions = if_match(request)
+    if versions is not None and instance.version not in versions:
+        raise PreconditionFailed()
@@ -1,27 +1,27 @@
 from django.http import JsonResponse
-from django.utils.timezone import now
-from django.db.models import F, Q
-from django.db import transaction
-from rest_framework import viewsets, generics, permissions, status
+from django.conf import settings
+from django.db.models import Case, When
+from rest_framework import viewsets, generics, permissions, serializers, status
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.throttling import ScopedRateThrottle
-from datetime import timedelta
 from django.contrib.auth.models import User
 from django.utils import timezone
-from .fcm_server import send_command 
+from .lockstate import set_lock_state
+from .heartbeat import record_heartbeat
+from . import audit
 import logging
 import traceback
 from rest_framework.views import APIView
-from .models import Device, FCM
-from .utils import generate_code
+from .models import Device
+from .utils import generate_code, unlock_code_params
 from django.shortcuts import get_object_or_404
-from .models import Customer, EMI, Payment, UserProfile, Device, BalanceKey, FCM
+from .models import Customer, EMI, Payment, UserProfile, Device, BalanceKey
 from .serializers import (
     CustomerSerializer,
     EMISerializer,
@@ -38,7 +38,6 @@ from .models import Tutorial
 from .serializers import TutorialSerializer
 from .permissions import IsDeviceAuthenticated
 from rest_framework.generics import ListAPIView
-import uuid
 logger = logging.getLogger(__name__)
 from .models import Policy
 from .serializers import PolicySerializer
@@ -48,6 +47,17 @@ from .serializers import MDMConfigSerializer
 
 from .models import AppVersion
 from .serializers import AppVersionSerializer
+from .models import AuditEvent
+from .serializers import AuditEventSerializer
+from .pagination import AuditEventPagination, CustomerSearchPagination, DevicePagination
+from .search import search_customers
+from .calculator import parse_quotes, quote_response
+from .posting import AlreadyPaid, post_emi
+from .versioning import VersionConflict, check_if_match, claim, etag, retry_on_conflict
+from .fastserializers import (
+    FastListMixin, CustomerFastSerializer, EMIFastSerializer, FleetDeviceFastSerializer, PaymentFastSerializer,
+)
+from . import fleet
 # ---------------- PING TEST ----------------
 def ping(request):
     return JsonResponse({"message": "pong"})
@@ -83,8 +93,9 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 # ---------------- CUSTOMERS ----------------
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = CustomerSerializer
+    fast_serializer_class = CustomerFastSerializer
     permission_classes = [IsAuthenticated]
     queryset = Customer.objects.none()
 
@@ -94,6 +105,47 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    # 🔢 ETag: "<version>"; send it back as If-Match to update / delete only that version
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(self.get_serializer(instance).data, headers={"ETag": etag(instance)})
+
+    def update(self, request, *args, **kwargs):
+        # a write that raced this one: re-read the customer and apply the request again
+        try:
+            response = retry_on_conflict(super().update, request, *args, **kwargs)
+        except VersionConflict:
+            return Response({"error": "Customer is being updated, try again"}, status=409)
+        response["ETag"] = f'"{response.data["version"]}"'
+        return response
+
+    def perform_update(self, serializer):
+        check_if_match(self.request, serializer.instance)
+        claim(serializer.instance)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        check_if_match(self.request, instance)
+        instance.delete()
+
+    # 🔎 /customers/search/?q=  (mobile / IMEI / loan no. prefix, or name)
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        q = request.query_params.get("q", "")
+        if len(q.strip()) < settings.SEARCH_MIN_LENGTH:
+            return Response({"error": f"q must be at least {settings.SEARCH_MIN_LENGTH} characters"}, status=400)
+
+        ids = search_customers(request.user, q)
+        paginator = CustomerSearchPagination()
+        page = paginator.paginate_queryset(ids, request, view=self)
+
+        # fetch only the page, then restore the ranked order
+        serializer = self.get_fast_serializer()
+        if not page:
+            return paginator.get_paginated_response([])
+        ranked = Case(*[When(id=pk, then=position) for position, pk in enumerate(page)])
+        return paginator.get_paginated_response(serializer.serialize(Customer.objects.filter(id__in=page).order_by(ranked)))
+
 # ---------------- UPDATE EMI (ADMIN ONLY) ----------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -101,44 +153,43 @@ def update_emi_payment(request, customer_id):
     if not request.user.is_staff:
         return Response({"detail": "Admin only"}, status=403)
 
+    # ⚡ no row locks: rows are claimed at the version read, losers retry (see posting.py)
+    # If-Match: "<version>" from the customer's ETag refuses to post on a changed plan (412)
     try:
-        with transaction.atomic():
-            # Lock customer row
-            customer = Customer.objects.select_for_update().get(id=customer_id, user=request.user)
-            if customer.paid_months >= (customer.total_months or 0):
-                return Response({"message": "All EMI already paid"}, status=400)
-
-            # Atomic update
-            customer.paid_months = F('paid_months') + 1
-            customer.remaining_months = F('total_months') - F('paid_months') - 1
-            customer.next_payment_date = (
-                customer.next_payment_date + timedelta(days=30)
-                if customer.next_payment_date
-                else now().date() + timedelta(days=30)
-            )
-            customer.save()
-            customer.refresh_from_db()  # 🔄 refresh actual values
-
-            # Lock and update EMI row
-            emi = EMI.objects.select_for_update().filter(customer=customer, is_closed=False).first()
-            if emi:
-                emi.paid_amount += customer.emi_per_month or 0
-                if emi.paid_amount >= emi.total_amount:
-                    emi.is_closed = True
-                emi.save()
-                Payment.objects.create(emi=emi, amount=customer.emi_per_month or 0)
-
-            return Response({
-                "message": "EMI updated",
-                "paid_months": customer.paid_months,
-                "remaining_months": customer.remaining_months
-            })
+        customer, _, _ = post_emi(customer_id, request.user, request)
     except Customer.DoesNotExist:
         return Response({"error": "Customer not found"}, status=404)
+    except AlreadyPaid:
+        return Response({"message": "All EMI already paid"}, status=400)
+    except VersionConflict:
+        return Response({"error": "Customer is being updated, try again"}, status=409)
+
+    # 📝 Audit (queued, written in the background)
+    audit.record(
+        "emi_posted", user=request.user, actor=request.user.username, customer=customer,
+        amount=str(customer.emi_per_month or 0), paid_months=customer.paid_months,
+    )
+
+    return Response({
+        "message": "EMI updated",
+        "paid_months": customer.paid_months,
+        "remaining_months": customer.remaining_months,
+        "version": customer.version,
+    }, headers={"ETag": etag(customer)})
+
+# ---------------- EMI CALCULATOR ----------------
+# 🧮 POST {"principal": 20000, "down_payment": 2000, "rate": [0, 14], "months": [6, 12], "grid": true, "schedule": false}
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def emi_quote(request):
+    principal, down_payment, rate, months = parse_quotes(request.data)
+    quotes = quote_response(principal, down_payment, rate, months, schedules=bool(request.data.get("schedule")))
+    return Response({"quotes": quotes})
 
 # ---------------- PENDING EMI (ADMIN + CUSTOMER) ----------------
-class PendingEMIViewSet(ReadOnlyModelViewSet):
+class PendingEMIViewSet(FastListMixin, ReadOnlyModelViewSet):
     serializer_class = EMISerializer
+    fast_serializer_class = EMIFastSerializer
     permission_classes = [IsAuthenticated]
     queryset = EMI.objects.none()  # required for router
 
@@ -163,97 +214,6 @@ class PendingEMIViewSet(ReadOnlyModelViewSet):
 
         return EMI.objects.filter(customer=device.customer, is_closed=False).order_by("next_due_date")
 
-# ---------------- DEVICE LOCK/UNLOCK ----------------
-@api_view(["POST"])
-@permission_classes([AllowAny])
-def register_device(request):
-    key_value = request.data.get("key", "").strip()
-    imei = request.data.get("imei", "").strip()
-
-    # ✅ Validate inputs
-    if not key_value:
-        return Response({"error": "Balance key is required"}, status=400)
-
-    if not imei or len(imei) not in (15, 16) or not imei.isdigit():
-        return Response({"error": "Valid IMEI required"}, status=400)
-
-    # ✅ Validate UUID format (VERY IMPORTANT)
-    try:
-        uuid.UUID(key_value)
-    except ValueError:
-        return Response({"error": "Invalid balance key format"}, status=400)
-
-    # ✅ Get customer
-    try:
-        customer = Customer.objects.get(Q(imei_1=imei) | Q(imei_2=imei))
-    except Customer.DoesNotExist:
-        return Response({"error": "Customer not found"}, status=404)
-
-    # ✅ Safe query (no crash)
-    balance_key = BalanceKey.objects.filter(key=key_value).first()
-
-    if not balance_key:
-        return Response({"error": "Balance key not found"}, status=400)
-
-    if balance_key.is_used:
-        return Response({"error": "Balance key already used"}, status=400)
-
-    if not balance_key.admin_user:
-        return Response({"error": "Balance key missing admin"}, status=400)
-
-    # ✅ Register device
-    device, created = Device.objects.update_or_create(
-        imei=imei,
-        defaults={
-            "customer": customer,
-            "user": balance_key.admin_user,
-            "is_locked": False,
-            "last_action": "registered",
-            "last_updated": timezone.now()
-        }
-    )
-
-    if not device.device_token:
-        device.device_token = uuid.uuid4()
-        device.save(update_fields=["device_token"])
-
-    # ✅ Mark key used
-    balance_key.is_used = True
-    balance_key.used_by = customer
-    balance_key.used_at = timezone.now()
-    balance_key.save()
-
-    return Response({
-        "message": "Device registered successfully",
-        "device_token": str(device.device_token)
-    }, status=201)
-
-
-# ---------------- GET CUSTOMER DATA (FOR DEVICE) ----------------
-@api_view(["GET"])
-@permission_classes([IsDeviceAuthenticated])
-def device_customer_data(request):
-    device = request.device  # ✅ use authenticated device
-
-    customer = device.customer
-
-    if not customer:
-        return Response({"error": "No customer linked"}, status=404)
-
-    return Response({
-        "id": customer.id,
-        "name": customer.name,
-        "mobile": customer.mobile,
-        "email": customer.email,
-        "total_emi_amount": customer.total_emi_amount,
-        "emi_per_month": customer.emi_per_month,
-        "paid_months": customer.paid_months,
-        "remaining_months": customer.remaining_months,
-        "next_payment_date": customer.next_payment_date,
-        "dealer_contact": customer.dealer_contact,
-        "paid_down_payment": customer.paid_down_payment,
-    })
-
 # ---------------- LOCK DEVICE ----------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -268,33 +228,22 @@ def lock_device(request):
     try:
         device = Device.objects.get(imei=imei,user=request.user)
 
-        # 🔒 Lock device
-        device.is_locked = True
-        device.last_action = "locked"
-        device.last_updated = timezone.now()
-        
+        # 🔒 Lock device (new desired-state version; the push is coalesced and retried, see lockstate.py)
+        version = set_lock_state(device, True, "locked")
 
-        # 🔑 Generate offline unlock code
-        unlock_code = generate_code()
-        device.unlock_code = unlock_code
-
-        device.save()
-        # 📡 Send FCM lock command
-        try:
-            fcm_entry = FCM.objects.get(imei_1=imei)
-            if fcm_entry.fcm_token:
-                result = send_command(fcm_entry.fcm_token, "LOCK")
-                logger.info(f"FCM command result: {result}")
-        except FCM.DoesNotExist:
-            logger.warning(f"No FCM token found for device {imei}")
+        # 🔑 Offline unlock code (derived from the device secret, nothing stored)
+        unlock_code = generate_code(device.unlock_secret)
 
         # 📝 Logging
         logger.info(f"{request.user.username} locked device {imei} at {timezone.now()}")
+        audit.record("device_locked", user=request.user, actor=request.user.username,
+                     device=device, customer=device.customer_id)
 
         return Response({
             "message": "Device locked successfully",
             "imei": imei,
-            "unlock_code": unlock_code
+            "unlock_code": unlock_code,
+            "version": version,
         }, status=200)
 
     except Device.DoesNotExist:
@@ -313,24 +262,15 @@ def unlock_device(request):
     try:
         device = Device.objects.get(imei=imei,user=request.user)
 
-        device.is_locked = False
-        device.last_action = "unlocked"
-        device.last_updated = timezone.now()
-        device.save()
-
-        # Lookup FCM token from FCM table
-        try:
-            fcm_entry = FCM.objects.get(imei_1=imei)
-            if fcm_entry.fcm_token:
-                result = send_command(fcm_entry.fcm_token, "UNLOCK")
-                logger.info(f"FCM command result: {result}")
-        except FCM.DoesNotExist:
-            logger.warning(f"No FCM token found for device {imei}")
+        # New desired-state version; pushed through the device's FCM token (coalesced and retried)
+        version = set_lock_state(device, False, "unlocked")
 
         # Logging
         logger.info(f"{request.user.username} unlocked device {imei} at {timezone.now()}")
+        audit.record("device_unlocked", user=request.user, actor=request.user.username,
+                     device=device, customer=device.customer_id)
 
-        return Response({"message": "Device unlocked successfully"}, status=200)
+        return Response({"message": "Device unlocked successfully", "version": version}, status=200)
 
     except Device.DoesNotExist:
         return Response({"error": "Device not found"}, status=404)
@@ -348,8 +288,9 @@ class BalanceKeyViewSet(viewsets.ModelViewSet):
         serializer.save(admin_user=self.request.user)
 
 # ---------------- EMIs ----------------
-class EMIViewSet(viewsets.ModelViewSet):
+class EMIViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = EMISerializer
+    fast_serializer_class = EMIFastSerializer
     permission_classes = [IsAuthenticated]
     queryset = EMI.objects.none()  # required for router
 
@@ -365,8 +306,9 @@ class EMIViewSet(viewsets.ModelViewSet):
         return EMI.objects.filter(customer=device.customer)
 
 # ---------------- PAYMENTS ----------------
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
+    fast_serializer_class = PaymentFastSerializer
     permission_classes = [IsAuthenticated]
     queryset = Payment.objects.none()  # required for router
 
@@ -381,23 +323,73 @@ class PaymentViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Unauthorized device")
         return Payment.objects.filter(emi__customer=device.customer)
 
-# ---------------- FCM TOKEN ----------------
+# ---------------- DEVICE FLEET ----------------
+class DeviceViewSet(FastListMixin, ReadOnlyModelViewSet):
+    serializer_class = DeviceSerializer
+    fast_serializer_class = FleetDeviceFastSerializer
+    pagination_class = DevicePagination
+    permission_classes = [IsAuthenticated]
+    queryset = Device.objects.none()  # required for router
+
+    def get_queryset(self):
+        # ?status=locked|unlocked|no_fcm_token|lagging&last_seen_before=  (see fleet.py)
+        devices = Device.objects.filter(user=self.request.user).select_related("customer")
+        return fleet.filter_devices(devices, self.request.query_params)
+
+    # 📊 /devices/summary/  per-state counts in one aggregate query
+    @action(detail=False, methods=["get"])
+    def summary(self, request):
+        before = request.query_params.get("last_seen_before")
+        offline_before = fleet.parse_moment(before, "last_seen_before") if before else None
+        return Response(fleet.summary(Device.objects.filter(user=request.user), offline_before))
+
+# ---------------- DEVICE HEARTBEAT ----------------
 @api_view(["POST"])
 @permission_classes([IsDeviceAuthenticated])
-def update_fcm_token(request):
-    device = request.device
-
-    fcm_token = request.data.get("fcm_token")
+def device_heartbeat(request):
+    request._request.pin_to_primary = False  # buffered: nothing written now to read back
+    values = {"last_seen": timezone.now()}
 
-    if not fcm_token:
-        return Response({"error": "fcm_token required"}, status=400)
-
-    FCM.objects.update_or_create(
-        imei_1=device.imei,
-        defaults={"fcm_token": fcm_token}
-    )
+    if "is_locked" in request.data:
+        # form posts send "false" / "0": parse like a serializer BooleanField would
+        try:
+            values["applied_lock_state"] = serializers.BooleanField().to_internal_value(request.data.get("is_locked"))
+        except serializers.ValidationError:
+            return Response({"error": "is_locked must be a boolean"}, status=400)
 
-    return Response({"message": "FCM token updated"})
+    battery = request.data.get("battery_level")
+    if battery is not None:
+        try:
+            battery = int(battery)
+        except (TypeError, ValueError):
+            return Response({"error": "battery_level must be an integer"}, status=400)
+        if not 0 <= battery <= 100:
+            return Response({"error": "battery_level must be between 0 and 100"}, status=400)
+        values["battery_level"] = battery
+
+    app_version = request.data.get("app_version")
+    if app_version is not None:
+        values["app_version"] = str(app_version)[:20]
+
+    # 🎯 desired-state version the phone has applied (see lockstate.py)
+    applied_version = request.data.get("applied_version")
+    if applied_version is not None:
+        try:
+            applied_version = int(applied_version)
+        except (TypeError, ValueError):
+            return Response({"error": "applied_version must be an integer"}, status=400)
+        if applied_version < 0:
+            return Response({"error": "applied_version must not be negative"}, status=400)
+        # never ahead of the server: that would hide the device from the reconciler
+        # (and an oversized int would fail the whole heartbeat flush)
+        if applied_version > request.device.desired_version:
+            return Response({"error": "applied_version is ahead of the desired version"}, status=400)
+        values["applied_version"] = applied_version
+
+    # 💓 Buffered; written in bulk by the per-worker flusher
+    record_heartbeat(request.device.id, **values)
+
+    return Response({"message": "Heartbeat accepted"}, status=202)
 
 #---------------- TUTORIAL ----------------
 
@@ -407,25 +399,6 @@ def TutorialListView(request):
     tutorials = Tutorial.objects.all()
     serializer = TutorialSerializer(tutorials, many=True)
     return Response(serializer.data)
-#---------------- UTILS ----------------
-
-
-
-@api_view(["GET"])
-@permission_classes([IsDeviceAuthenticated])
-def get_unlock_code(request, imei):
-    device = request.device  # from permission
-
-    # 🔒 Ensure device matches IMEI
-    if device.imei != imei:
-        return Response({"error": "Unauthorized device"}, status=403)
-
-    return Response({
-    "imei": device.imei,
-    "unlock_code": device.unlock_code
-    })
-    
-
 #---------------- ADMIN GET UNLOCK CODE ----------------
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])  # ✅ Admin JWT auth
@@ -437,12 +410,12 @@ def admin_get_unlock_code(request, imei):
         if not device.is_locked:
             return Response({"error": "Device is not locked"}, status=400)
 
-        if not device.unlock_code:
-            return Response({"error": "No unlock code available"}, status=404)
-
         return Response({
             "imei": device.imei,
-            "unlock_code": device.unlock_code
+            "unlock_code": generate_code(device.unlock_secret),
+            # 🔑 Lets the dealer app generate codes without connectivity
+            "unlock_secret": device.unlock_secret,
+            "unlock_code_params": unlock_code_params(),
         })
 
     except Device.DoesNotExist:
@@ -519,4 +492,19 @@ class LatestAppVersionView(APIView):
             return Response({"message": "No version found"}, status=404)
 
         serializer = AppVersionSerializer(latest)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+#---------------- AUDIT LOG ----------------
+class AuditEventListView(ListAPIView):
+    """Dealer timeline, or a single device's timeline with ?imei=<imei>."""
+    serializer_class = AuditEventSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = AuditEventPagination
+
+    def get_queryset(self):
+        imei = self.request.query_params.get("imei")
+        if imei:
+            device = get_object_or_404(Device, imei=imei, user=self.request.user)
+            return AuditEvent.objects.filter(device=device)
+        return AuditEvent.objects.filter(user=self.request.user)
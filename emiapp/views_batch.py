@@ -0,0 +1,204 @@
+"""
+Batch endpoint: several API calls in one round trip.
+
+    POST /api/v1/batch/
+    {"requests": [{"id": "profile", "method": "GET", "path": "/api/v1/user-profile/"},
+                  {"method": "GET", "path": "/api/v1/customers/?fields=id,name"},
+                  {"method": "POST", "path": "/api/v1/...", "body": {...}, "headers": {"X-IMEI": "..."}}],
+     "parallel": true}
+
+    -> {"responses": [{"id": "profile", "status": 200, "body": ...}, ...]}
+
+Sub-requests are resolved with the URL resolver and call the views in
+process. They reuse the batch request's authentication, so the JWT is
+checked once. They run in order. With ``parallel``, each run of
+consecutive GETs is fanned out over a thread pool, and a write is a barrier
+between runs. DRF responses are returned as their ``data``, so the batch is
+rendered once, not once per sub-request.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .middleware import ReplicaRoutingMiddleware
+from .routers import choose_replica, read_from
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ("GET", "HEAD")
+METHODS = READ_METHODS + ("POST", "PUT", "PATCH", "DELETE")
+# per-sub-request headers may not replace the shared credentials
+BLOCKED_HEADERS = ("authorization", "cookie", "content-type", "content-length")
+
+
+def _meta_key(header):
+    return "HTTP_" + header.upper().replace("-", "_")
+
+
+def _error(status, message):
+    return {"status": status, "body": {"error": message}}
+
+
+# ---------------- SUB-REQUESTS ----------------
+def _build_request(batch_request, spec):
+    outer = batch_request._request
+    url = urlsplit(spec["path"])
+    body = b""
+    if spec.get("body") is not None:
+        body = json.dumps(spec["body"]).encode()
+
+    request = HttpRequest()
+    request.method = spec["method"]
+    request.path = request.path_info = url.path
+    # the outer headers (Host, X-Forwarded-*, ...) carry over, so absolute URLs
+    # come out as on a direct call; the item's own headers are applied on top
+    blocked = {_meta_key(name) for name in BLOCKED_HEADERS}
+    request.META = {
+        key: value for key, value in outer.META.items()
+        if not key.startswith(("wsgi.", "CONTENT_")) and key not in blocked
+    }
+    request.META.update({
+        "REQUEST_METHOD": request.method,
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "HTTP_ACCEPT": "application/json",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+    })
+    for name, value in (spec.get("headers") or {}).items():
+        if name.lower() not in BLOCKED_HEADERS:
+            request.META[_meta_key(name)] = str(value)
+    request.GET = QueryDict(url.query)
+    request.COOKIES = outer.COOKIES
+    request._body = body
+    request._stream = BytesIO(body)
+    request._read_started = False
+
+    # 🔐 one authentication pass: DRF views use these instead of re-running authenticators
+    request.user = batch_request.user
+    request._force_auth_user = batch_request.user
+    request._force_auth_token = batch_request.auth
+    return request
+
+
+def _dispatch(batch_request, spec):
+    try:
+        request = _build_request(batch_request, spec)
+        match = resolve(request.path_info)
+    except Resolver404:
+        return _error(404, "Not found")
+    if match.func is batch:
+        return _error(400, "Batches cannot be nested")
+
+    try:
+        if iscoroutinefunction(match.func):
+            response = async_to_sync(match.func)(request, *match.args, **match.kwargs)
+        else:
+            response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        return _error(404, "Not found")
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", spec["method"], spec["path"])
+        return _error(500, "Internal server error")
+
+    if isinstance(response, Response):
+        body = response.data  # rendered once, with the batch
+    elif getattr(response, "streaming", False):
+        body = None
+    else:
+        if hasattr(response, "render"):
+            response.render()
+        content = response.content.decode(response.charset or "utf-8")
+        if "json" in response.get("Content-Type", ""):
+            body = json.loads(content) if content else None
+        else:
+            body = content
+    return {"status": response.status_code, "body": body}
+
+
+def _in_thread(batch_request, spec):
+    try:
+        return _dispatch(batch_request, spec)
+    finally:
+        connections.close_all()  # this thread's connections only
+
+
+def _validate(spec):
+    if not isinstance(spec, dict):
+        return "Each request must be an object"
+    if spec.get("method", "GET") not in METHODS:
+        return f"method must be one of {', '.join(METHODS)}"
+    path = spec.get("path")
+    if not isinstance(path, str) or not path.startswith("/"):
+        return "path must be an absolute path"
+    if not isinstance(spec.get("headers") or {}, dict):
+        return "headers must be an object"
+    return None
+
+
+# ---------------- BATCH ----------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def batch(request):
+    specs = request.data.get("requests") if isinstance(request.data, dict) else None
+    if not isinstance(specs, list) or not specs:
+        return Response({"error": "requests must be a non-empty list"}, status=400)
+    if len(specs) > settings.BATCH_MAX_REQUESTS:
+        return Response({"error": f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"}, status=400)
+    parallel = bool(request.data.get("parallel"))
+
+    # replica routing: the batch is a POST, but only its writes should pin the client
+    pinned = bool(settings.DATABASE_REPLICAS) and ReplicaRoutingMiddleware.is_pinned(request._request)
+    wrote = False
+
+    results = [None] * len(specs)
+    pending = []  # consecutive reads: (index, spec)
+
+    def flush():
+        alias = None if (pinned or wrote) else choose_replica()
+        with read_from(alias):
+            if parallel and len(pending) > 1:
+                workers = min(len(pending), settings.BATCH_MAX_WORKERS)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    # copy_context: threads see the read alias chosen above
+                    futures = [(i, pool.submit(copy_context().run, _in_thread, request, spec)) for i, spec in pending]
+                    for i, future in futures:
+                        results[i] = future.result()
+            else:
+                for i, spec in pending:
+                    results[i] = _dispatch(request, spec)
+        pending.clear()
+
+    for index, spec in enumerate(specs):
+        problem = _validate(spec)
+        if problem:
+            results[index] = _error(400, problem)
+            continue
+        spec = {**spec, "method": spec.get("method", "GET")}
+        if spec["method"] in READ_METHODS:
+            pending.append((index, spec))
+            continue
+        flush()
+        with read_from(None):
+            results[index] = _dispatch(request, spec)
+        wrote = True
+    flush()
+
+    responses = [
+        {"id": spec["id"], **result} if isinstance(spec, dict) and "id" in spec else result
+        for spec, result in zip(specs, results)
+    ]
+    request._request.pin_to_primary = wrote
+    return Response({"responses": responses})
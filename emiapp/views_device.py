@@ -0,0 +1,208 @@
+"""
+Device-facing endpoints as native async views.
+
+These are the highest-volume endpoints (every enrolled phone polls them), so
+they skip DRF and use Django's async ORM directly: served by the Procfile's
+optional ``device`` process (Uvicorn workers, see gunicorn.conf.py), a
+request waiting on the database no longer ties up a whole worker. The sync
+web workers serve them too.
+Responses keep the same JSON shape as the previous DRF views.
+"""
+import json
+import uuid
+from io import BytesIO
+
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import audit
+from .lockstate import command_for
+from .models import BalanceKey, Customer, Device, FCM
+from .parsers import MessagePackParser
+from .permissions import device_authenticated
+from .renderers import MessagePackRenderer
+from .utils import generate_code, unlock_code_params
+
+
+def _response(request, data, status=200):
+    # same content negotiation as the DRF views: MessagePack when asked for
+    if MessagePackRenderer.media_type in request.headers.get("Accept", ""):
+        response = HttpResponse(MessagePackRenderer().render(data), status=status,
+                                content_type=MessagePackRenderer.media_type)
+    else:
+        # same encoder / compact separators as DRF's JSONRenderer
+        response = JsonResponse(
+            data, status=status, encoder=JSONEncoder, safe=False,
+            json_dumps_params={"separators": (",", ":"), "ensure_ascii": False},
+        )
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def _request_data(request):
+    if request.content_type in ("application/json", MessagePackParser.media_type):
+        try:
+            if request.content_type == MessagePackParser.media_type:
+                data = MessagePackParser().parse(BytesIO(request.body))
+            else:
+                data = json.loads(request.body or b"{}")
+        except (ValueError, ParseError):
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+# ---------------- DEVICE REGISTER ----------------
+@csrf_exempt
+@require_POST
+async def register_device(request):
+    data = _request_data(request)
+    if data is None:
+        return _response(request, {"detail": "Request body parse error"}, status=400)
+
+    key_value = str(data.get("key", "")).strip()
+    imei = str(data.get("imei", "")).strip()
+
+    # ✅ Validate inputs
+    if not key_value:
+        return _response(request, {"error": "Balance key is required"}, status=400)
+
+    if not imei or len(imei) not in (15, 16) or not imei.isdigit():
+        return _response(request, {"error": "Valid IMEI required"}, status=400)
+
+    # ✅ Validate UUID format (VERY IMPORTANT)
+    try:
+        uuid.UUID(key_value)
+    except ValueError:
+        return _response(request, {"error": "Invalid balance key format"}, status=400)
+
+    # ✅ Get customer
+    try:
+        customer = await Customer.objects.aget(Q(imei_1=imei) | Q(imei_2=imei))
+    except Customer.DoesNotExist:
+        return _response(request, {"error": "Customer not found"}, status=404)
+
+    # ✅ Safe query (no crash)
+    balance_key = await BalanceKey.objects.filter(key=key_value).afirst()
+
+    if not balance_key:
+        return _response(request, {"error": "Balance key not found"}, status=400)
+
+    if balance_key.is_used:
+        return _response(request, {"error": "Balance key already used"}, status=400)
+
+    if not balance_key.admin_user_id:
+        return _response(request, {"error": "Balance key missing admin"}, status=400)
+
+    # ✅ Register device
+    device, created = await Device.objects.aupdate_or_create(
+        imei=imei,
+        defaults={
+            "customer": customer,
+            "user_id": balance_key.admin_user_id,
+            "is_locked": False,
+            "last_action": "registered",
+            "last_updated": timezone.now()
+        }
+    )
+
+    if not device.device_token:
+        device.device_token = uuid.uuid4()
+        await device.asave(update_fields=["device_token"])
+
+    # ✅ Mark key used
+    balance_key.is_used = True
+    balance_key.used_by = customer
+    balance_key.used_at = timezone.now()
+    await balance_key.asave()
+
+    audit.record("device_registered", user=balance_key.admin_user_id, actor="device", device=device,
+                 customer=customer, balance_key=str(balance_key.key))
+
+    return _response(request, {
+        "message": "Device registered successfully",
+        "device_token": str(device.device_token),
+        # 🔑 Seed for deriving unlock codes offline
+        "unlock_secret": device.unlock_secret,
+        "unlock_code_params": unlock_code_params(),
+    }, status=201)
+
+
+# ---------------- GET CUSTOMER DATA (FOR DEVICE) ----------------
+@require_GET
+@device_authenticated
+async def device_customer_data(request):
+    customer = request.device.customer  # fetched with the device
+
+    if not customer:
+        return _response(request, {"error": "No customer linked"}, status=404)
+
+    return _response(request, {
+        "id": customer.id,
+        "name": customer.name,
+        "mobile": customer.mobile,
+        "email": customer.email,
+        "total_emi_amount": customer.total_emi_amount,
+        "emi_per_month": customer.emi_per_month,
+        "paid_months": customer.paid_months,
+        "remaining_months": customer.remaining_months,
+        "next_payment_date": customer.next_payment_date,
+        "dealer_contact": customer.dealer_contact,
+        "paid_down_payment": customer.paid_down_payment,
+    })
+
+
+# ---------------- DESIRED LOCK STATE (FOR DEVICE) ----------------
+@require_GET
+@device_authenticated
+async def device_state(request):
+    # fetched after a push or on start-up; the phone applies it if the version is newer
+    device = request.device
+    return _response(request, {
+        "command": command_for(device.is_locked),
+        "is_locked": device.is_locked,
+        "version": device.desired_version,
+    })
+
+
+# ---------------- UNLOCK CODE (FOR DEVICE) ----------------
+@require_GET
+@device_authenticated
+async def get_unlock_code(request, imei):
+    device = request.device
+
+    # 🔒 Ensure device matches IMEI
+    if device.imei != imei:
+        return _response(request, {"error": "Unauthorized device"}, status=403)
+
+    # Kept for older app builds; new builds derive the code offline
+    return _response(request, {
+        "imei": device.imei,
+        "unlock_code": generate_code(device.unlock_secret)
+    })
+
+
+# ---------------- FCM TOKEN ----------------
+@csrf_exempt
+@require_POST
+@device_authenticated
+async def update_fcm_token(request):
+    data = _request_data(request)
+    fcm_token = data.get("fcm_token") if data is not None else None
+
+    if not fcm_token:
+        return _response(request, {"error": "fcm_token required"}, status=400)
+
+    # a freshly reported token starts with a clean health record
+    await FCM.objects.aupdate_or_create(
+        imei_1=request.device.imei,
+        defaults={"fcm_token": fcm_token, "is_valid": True, "history": 1, "last_error": ""}
+    )
+
+    return _response(request, {"message": "FCM token updated"})
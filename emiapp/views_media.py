@@ -0,0 +1,89 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import HASHED_NAME_RE
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _RangeFile:
+    """File wrapper that yields at most ``length`` bytes from ``start``."""
+
+    def __init__(self, path, start, length, chunk_size=64 * 1024):
+        self.file = open(path, "rb")
+        self.file.seek(start)
+        self.remaining = length
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.file.read(min(self.chunk_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+# ---------------- MEDIA FILES ----------------
+@require_safe
+def serve_media(request, path):
+    """
+    Serves MEDIA_ROOT in every environment (not just DEBUG), with single
+    byte-range support. Content-hashed image variants never change, so they
+    are marked immutable; anything else gets a short max-age.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except ValueError:
+        raise Http404("Invalid path")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    stat = os.stat(full_path)
+    if HASHED_NAME_RE.search(path):
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+    modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    if modified_since is not None and int(stat.st_mtime) <= modified_since:
+        response = HttpResponseNotModified()
+        response["Cache-Control"] = cache_control
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    size = stat.st_size
+    match = RANGE_RE.match(request.headers.get("Range", "").strip())
+
+    if match and match.group(1) + match.group(2):
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+        else:  # suffix range: last N bytes
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        response = FileResponse(_RangeFile(full_path, start, end - start + 1), status=206,
+                                content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        response["Content-Length"] = str(size)
+
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = cache_control
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
@@ -0,0 +1,31 @@
+"""
+Payment-gateway / UPI callbacks (staged and applied in emiapp/payments.py).
+
+    POST /payments/webhook/<provider>/   signed callback -> 200 once staged
+"""
+import orjson
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from . import payments
+
+
+@api_view(["POST"])
+@authentication_classes([])  # the HMAC signature is the authentication
+@permission_classes([AllowAny])
+def payment_webhook(request, provider):
+    # ⚡ verify, one INSERT, answer: posting happens in the apply_payments worker
+    request._request.pin_to_primary = False  # the gateway never reads back
+    body = request.body
+    if not payments.verify_signature(provider, body, request.headers.get(payments.SIGNATURE_HEADER)):
+        return Response({"error": "Invalid signature"}, status=401)
+    try:
+        event = payments.parse_callback(provider, orjson.loads(body))
+    except orjson.JSONDecodeError:
+        return Response({"error": "Invalid JSON"}, status=400)
+    except payments.InvalidCallback as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    payments.stage(event)  # a replay is dropped by the unique index; acknowledge it all the same
+    return Response({"status": "accepted"})
@@ -0,0 +1,60 @@
+"""
+Dealer portfolio reports (computed and cached in emiapp/reports.py).
+
+    GET /reports/aging/                 overdue buckets and PAR30
+    GET /reports/collections/?months=12 monthly collections and this month's efficiency
+    GET /reports/projection/?months=24&default_rates=0,0.05,0.15
+                                        expected collections per month (emiapp/projection.py)
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import reports
+from .projection import project_cashflow
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def aging_report(request):
+    today = timezone.localdate()  # part of the key: buckets move at midnight
+    return Response(reports.cached("aging", request.user, lambda: reports.aging(request.user, today), today))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def collections_report(request):
+    try:
+        months = int(request.query_params.get("months", settings.REPORT_DEFAULT_MONTHS))
+    except ValueError:
+        months = 0
+    if not 1 <= months <= settings.REPORT_MAX_MONTHS:
+        return Response({"error": f"months must be between 1 and {settings.REPORT_MAX_MONTHS}"}, status=400)
+
+    today = timezone.localdate()
+    return Response(reports.cached(
+        "collections", request.user, lambda: reports.collections(request.user, months, today), today, months,
+    ))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def projection_report(request):
+    try:
+        months = int(request.query_params.get("months", settings.PROJECTION_DEFAULT_MONTHS))
+        raw = request.query_params.get("default_rates")
+        rates = [float(r) for r in raw.split(",")] if raw else list(settings.PROJECTION_DEFAULT_RATES)
+    except ValueError:
+        return Response({"error": "months must be an integer and default_rates comma-separated numbers"}, status=400)
+    if not 1 <= months <= settings.PROJECTION_MAX_MONTHS:
+        return Response({"error": f"months must be between 1 and {settings.PROJECTION_MAX_MONTHS}"}, status=400)
+    if not 1 <= len(rates) <= settings.PROJECTION_MAX_SCENARIOS or any(not 0 <= r < 1 for r in rates):
+        return Response({"error": f"default_rates: 1 to {settings.PROJECTION_MAX_SCENARIOS} rates in [0, 1)"}, status=400)
+
+    today = timezone.localdate()
+    return Response(reports.cached(
+        "projection", request.user, lambda: project_cashflow(request.user, months, rates, today),
+        today, months, ",".join(map(str, rates)),
+    ))
@@ -0,0 +1,122 @@
+"""
+Delta sync for the dealer app: GET /sync/?since=<cursor>
+
+Every synced model carries an indexed ``updated_at``; deletes leave a
+Tombstone. Each stream is read as a keyset page on (updated_at, id) after
+the position stored in the cursor, so a refresh costs what changed, not
+the size of the portfolio. Without ``since`` the same loop does the
+initial download.
+
+    {"customers": [...], "emis": [...], "payments": [...], "devices": [...],
+     "deleted": {"customer": [ids], ...}, "cursor": "...", "has_more": false}
+
+The client stores ``cursor`` and calls again while ``has_more`` is true.
+Rows newer than SYNC_SETTLE_SECONDS are held back for the next call: a
+transaction stamps ``updated_at`` before it commits, and must not become
+visible behind a cursor that has already moved past it. For the same reason
+sync always reads the primary: a replica may apply a commit later still.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .fastserializers import CustomerFastSerializer, DeviceFastSerializer, EMIFastSerializer, PaymentFastSerializer
+from .models import EMI, Customer, Device, Payment, Tombstone
+from .routers import use_primary
+
+# stream name -> (serializer, rows owned by the dealer)
+STREAMS = {
+    "customers": (CustomerFastSerializer, lambda user: Customer.objects.filter(user=user)),
+    "emis": (EMIFastSerializer, lambda user: EMI.objects.filter(customer__user=user)),
+    "payments": (PaymentFastSerializer, lambda user: Payment.objects.filter(emi__customer__user=user)),
+    "devices": (DeviceFastSerializer, lambda user: Device.objects.filter(user=user)),
+}
+DELETED = "deleted"
+
+
+# ---------------- CURSOR ----------------
+def encode_cursor(positions):
+    raw = {name: [ts.isoformat(), pk] for name, (ts, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        positions = {name: (datetime.fromisoformat(ts), int(pk)) for name, (ts, pk) in raw.items()}
+        if any(timezone.is_naive(ts) for ts, _ in positions.values()):
+            raise ValueError("naive timestamp")
+    except (ValueError, TypeError, AttributeError):
+        raise ValidationError({"since": ["Invalid cursor"]})
+    return positions
+
+
+# ---------------- QUERIES ----------------
+def _changes(queryset, time_field, position, until, lookups, limit):
+    """Up to ``limit + 1`` rows after ``position`` = (timestamp, id), oldest first."""
+    queryset = queryset.filter(**{f"{time_field}__lt": until})
+    if position is not None:
+        ts, pk = position
+        # (t, id) > (ts, pk), written so the index range starts at ts
+        queryset = queryset.filter(**{f"{time_field}__gte": ts}).filter(
+            Q(**{f"{time_field}__gt": ts}) | Q(id__gt=pk)
+        )
+    return list(queryset.order_by(time_field, "id").values_list(*lookups, time_field, "id")[:limit + 1])
+
+
+def _advance(rows, limit, until):
+    """New position for a stream, and whether it has more rows."""
+    if len(rows) > limit:
+        return tuple(rows[limit - 1][-2:]), True
+    # caught up: everything before ``until`` has been sent
+    return (until, 0), False
+
+
+# ---------------- SYNC ----------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    now = timezone.now()
+    until = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    limit = settings.SYNC_PAGE_SIZE
+
+    since = request.query_params.get("since")
+    if since:
+        positions = decode_cursor(since)
+        deleted_from = positions.get(DELETED)
+        if deleted_from is None or deleted_from[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            # deletes older than the retention window are gone; only a full download is safe
+            return Response({"error": "Cursor expired, sync again without since"}, status=410)
+    else:
+        # initial download: no row the client has could have been deleted yet
+        positions = {DELETED: (until, 0)}
+
+    data, cursor, has_more = {}, {}, False
+    with use_primary():
+        for name, (serializer_class, owned) in STREAMS.items():
+            serializer = serializer_class()
+            rows = _changes(owned(request.user), "updated_at", positions.get(name), until, serializer.lookups, limit)
+            cursor[name], more = _advance(rows, limit, until)
+            has_more |= more
+            data[name] = serializer.serialize_rows(rows[:limit])
+
+        rows = _changes(Tombstone.objects.filter(user=request.user), "deleted_at", positions[DELETED], until,
+                        ("model", "object_id"), limit)
+    cursor[DELETED], more = _advance(rows, limit, until)
+    has_more |= more
+    deleted = {}
+    for model, object_id, *_ in rows[:limit]:
+        deleted.setdefault(model, []).append(object_id)
+
+    data[DELETED] = deleted
+    data["cursor"] = encode_cursor(cursor)
+    data["has_more"] = has_more
+    return Response(data)
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import json
 import os
 from pathlib import Path
 import dj_database_url
@@ -52,12 +53,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'emiapp.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'emiapp.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'emiapp.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,8 +79,11 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-db-pin',  # read-your-writes pin, see emiapp/middleware.py
 ]
 
+CORS_EXPOSE_HEADERS = ['x-db-pin']
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -127,6 +133,51 @@ else:
         }
     }
 
+# Read replicas: comma-separated URLs in DATABASE_REPLICA_URLS. For local
+# testing, SQLITE_REPLICA_PATH adds a second SQLite file as the replica.
+for i, replica_url in enumerate(u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u):
+    DATABASES[f'replica_{i}'] = dj_database_url.parse(replica_url, conn_max_age=600)
+if not os.environ.get("DATABASE_URL") and os.environ.get("SQLITE_REPLICA_PATH"):
+    DATABASES['replica_0'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ["SQLITE_REPLICA_PATH"],
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+
+# SQLite with concurrent workers: pragmas on every connection and IMMEDIATE
+# write transactions (see emiapp/sqlite.py). SQLITE_CONCURRENT=0 restores the defaults.
+SQLITE_CONCURRENT = os.environ.get('SQLITE_CONCURRENT', '1') == '1'
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 10000)),  # ms a writer waits for the lock
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -32768,  # KiB per connection
+} if SQLITE_CONCURRENT else {}
+if SQLITE_CONCURRENT:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            database.setdefault('OPTIONS', {}).setdefault('transaction_mode', 'IMMEDIATE')
+
+DATABASE_ROUTERS = ['emiapp.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))  # read-your-writes window
+
+# One cache shared by every gunicorn worker and management command: a report
+# version bumped by apply_payments must reach the web workers (see
+# emiapp/reports.py). Replica pins are not kept here: they ride on a signed
+# cookie / X-DB-Pin header (see emiapp/middleware.py).
+# The table comes with migrate (0047).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},  # a version and a few reports per dealer
+    }
+}
+
 
 
 
@@ -176,4 +227,98 @@ REST_FRAMEWORK = {
          'rest_framework.authentication.SessionAuthentication', 
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'emiapp.renderers.ORJSONRenderer',
+        'emiapp.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'emiapp.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
+
+# Responses at least this large are brotli/gzip compressed (see emiapp/middleware.py)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = 5  # good ratio at a fraction of quality 11's CPU cost
+
+# Offline unlock codes (TOTP, see emiapp/utils.py)
+UNLOCK_CODE_DIGITS = 6
+UNLOCK_CODE_INTERVAL = int(os.environ.get('UNLOCK_CODE_INTERVAL', 900))  # seconds per code window
+UNLOCK_CODE_DRIFT = 1  # windows of clock drift accepted either side
+
+# Device heartbeats are buffered per worker and flushed in bulk (see emiapp/heartbeat.py)
+HEARTBEAT_FLUSH_INTERVAL = float(os.environ.get('HEARTBEAT_FLUSH_INTERVAL', 5))  # seconds
+HEARTBEAT_MAX_PENDING = 1000  # flush early once this many devices are pending
+
+# Versioned lock state pushes (see emiapp/lockstate.py)
+LOCK_PUSH_DELAY = float(os.environ.get('LOCK_PUSH_DELAY', 1))  # seconds; toggles within this window cost one push
+LOCK_PUSH_MAX_PENDING = 500
+LOCK_RETRY_AFTER = int(os.environ.get('LOCK_RETRY_AFTER', 120))  # seconds before a lagging device is pushed again
+LOCK_RECONCILE_BATCH = 500
+
+# Device fleet list / summary (see emiapp/fleet.py)
+DEVICE_OFFLINE_AFTER = int(os.environ.get('DEVICE_OFFLINE_AFTER', 24 * 3600))  # seconds without a heartbeat
+
+# Audit events are queued in process and written with bulk_create (see emiapp/audit.py)
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2))  # seconds
+AUDIT_MAX_PENDING = 500
+
+# Uploaded profile / QR images (see emiapp/images.py)
+IMAGE_VARIANT_SIZES = {'sm': 128, 'md': 512, 'lg': 1024}  # longest edge in px; 'lg' bounds the stored image
+IMAGE_DEFAULT_VARIANT = 'md'
+IMAGE_WEBP_QUALITY = 80
+IMAGE_WORKERS = 4
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # bytes
+MEDIA_MAX_AGE = 3600  # seconds, for media that is not content-hashed
+
+# FCM HTTP v1 delivery (see emiapp/fcm_server.py)
+FCM_BASE_URL = os.environ.get('FCM_BASE_URL', 'https://fcm.googleapis.com')
+FCM_MAX_CONNECTIONS = 2  # HTTP/2 connections per worker; sends are multiplexed on them
+FCM_CONCURRENCY = 32  # in-flight sends per fan-out
+FCM_TIMEOUT = 10  # seconds
+
+# Customer search (see emiapp/search.py)
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_RESULTS = 500
+
+# Delta sync (see emiapp/views_sync.py)
+SYNC_PAGE_SIZE = 500  # rows per stream per call
+# hold back rows this fresh: their transaction may not have committed yet. Must
+# outlast the longest write transaction (apply_payments: PAYMENT_APPLY_MAX_SECONDS)
+SYNC_SETTLE_SECONDS = 10
+SYNC_TOMBSTONE_RETENTION_DAYS = 90  # prune_tombstones; older cursors get 410 and re-download
+
+# Batched API calls (see emiapp/views_batch.py)
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4  # threads for "parallel": true reads; each may hold a DB connection
+
+# Dealer portfolio reports, cached per dealer (see emiapp/reports.py)
+REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 3600))  # seconds; customer / payment changes invalidate sooner
+REPORT_DEFAULT_MONTHS = 12
+REPORT_MAX_MONTHS = 36
+
+# Cash-flow projection, NumPy (see emiapp/projection.py)
+PROJECTION_DEFAULT_MONTHS = 24
+PROJECTION_MAX_MONTHS = 60
+PROJECTION_DEFAULT_RATES = [0.0, 0.05, 0.15]  # annual default rates, one scenario each
+PROJECTION_MAX_SCENARIOS = 10
+PROJECTION_WRITE_OFF_DAYS = 90  # plans overdue longer are projected at zero
+PROJECTION_CHUNK_SIZE = 50000  # rows per fetch; bounds memory for whole-portfolio runs
+
+# Optimistic concurrency on Customer / EMI versions (see emiapp/versioning.py)
+VERSION_CONFLICT_RETRIES = 5  # attempts before answering 409
+VERSION_CONFLICT_BACKOFF = 0.01  # seconds; the jitter window doubles per retry
+
+# Payment-gateway / UPI callbacks (see emiapp/payments.py)
+# {"provider": "secret"}; the provider is the last part of /payments/webhook/<provider>/
+PAYMENT_WEBHOOK_SECRETS = json.loads(os.environ.get('PAYMENT_WEBHOOK_SECRETS', '{}'))
+PAYMENT_APPLY_BATCH = 200  # events posted per transaction by apply_payments
+PAYMENT_APPLY_MAX_SECONDS = 3  # a batch commits early after this; keep well under SYNC_SETTLE_SECONDS
+
+# EMI calculator, NumPy (see emiapp/calculator.py)
+CALCULATOR_MAX_QUOTES = 5000  # per request, after "grid" expansion
+CALCULATOR_MAX_MONTHS = 120
+CALCULATOR_MAX_RATE = 60  # annual %
@@ -0,0 +1,18 @@
+# Gunicorn settings (loaded via `gunicorn -c gunicorn.conf.py`, see Procfile)
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+# Sync workers serve the app (web in the Procfile). Under a Uvicorn worker
+# every sync DRF view goes through sync_to_async, one at a time per worker,
+# and benchmarks/bench_async_views.py has the sync worker ahead (193 vs 123
+# req/s at 10 connections). The optional ``device`` process runs
+# emibackend.asgi under Uvicorn for the async device views
+# (emiapp/views_device.py); route only their paths to it, and only once a
+# benchmark on the target hardware shows a gain.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5